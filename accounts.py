@@ -0,0 +1,166 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from playwright.sync_api import sync_playwright
+from waits import resolve_timeouts
+from ledger import DEFAULT_LEDGER_PATH, JobLedger
+from scheduler import DEFAULT_DAILY_QUOTA, QuotaScheduler
+from session import load_session, save_session
+from submission import launch_browser, open_page, open_alphafold, login
+
+# 多账号模式下，每个账号的登录状态缓存保存为 accounts/<账号>.json
+DEFAULT_ACCOUNTS_DIR = 'accounts'
+
+# 一个账号：名称与登录状态缓存路径
+Account = namedtuple('Account', ['name', 'session_path'])
+
+
+def account_session_path(name, accounts_dir=DEFAULT_ACCOUNTS_DIR):
+    return os.path.join(accounts_dir, f"{name}.json")
+
+
+def load_accounts(accounts_dir=DEFAULT_ACCOUNTS_DIR):
+    """读取 accounts_dir 中登录状态有效的账号，按名称排序；登录状态失效的账号跳过"""
+    if not os.path.isdir(accounts_dir):
+        print(f"错误：找不到账号目录 {accounts_dir}，请先运行 python accounts.py add <账号名称>")
+        return []
+    accounts = []
+    for file_name in sorted(os.listdir(accounts_dir)):
+        name, extension = os.path.splitext(file_name)
+        if extension != '.json':
+            continue
+        path = os.path.join(accounts_dir, file_name)
+        if load_session(path) is None:
+            print(f"账号 {name} 的登录状态无效，跳过；可运行 python accounts.py add {name} 重新登录")
+            continue
+        accounts.append(Account(name, path))
+    return accounts
+
+
+class AccountShards:
+    """把待提交的任务分配给多个账号：每个账号有自己的每日配额，
+    任务优先分给剩余配额最多的账号，相同时分给网站上未完成任务最少的账号。
+    """
+
+    def __init__(self, accounts, ledger, daily_quota=DEFAULT_DAILY_QUOTA):
+        self.accounts = accounts
+        self.ledger = ledger
+        self.schedulers = {
+            account.name: QuotaScheduler(ledger, daily_quota, account=account.name)
+            for account in accounts
+        }
+
+    def assign(self, now=None):
+        """从台账取出待提交的任务并分配给各账号，返回 [(账号, [(名称, 序列)])]"""
+        capacity = {name: scheduler.remaining_quota(now) for name, scheduler in self.schedulers.items()}
+        unlimited = any(quota is None for quota in capacity.values())
+        limit = None if unlimited else sum(capacity.values())
+        if limit == 0:
+            return []
+        load = {account.name: self.ledger.count_active(account.name) for account in self.accounts}
+        batches = {account.name: [] for account in self.accounts}
+
+        def priority(name):
+            assigned = len(batches[name])
+            left = float('inf') if capacity[name] is None else capacity[name] - assigned
+            return left, -(load[name] + assigned)
+
+        for job in self.ledger.queued(limit=limit):
+            available = [name for name in batches
+                         if capacity[name] is None or len(batches[name]) < capacity[name]]
+            if not available:
+                break
+            batches[max(available, key=priority)].append(job)
+        return [(account, batches[account.name]) for account in self.accounts if batches[account.name]]
+
+    def run(self, submit, now=None):
+        """各账号在自己的线程和浏览器中并行提交本窗口的任务
+
+        submit(account, batch) 返回是否成功；返回 (提交的任务数量, 是否全部成功)。
+        """
+        assignments = self.assign(now)
+        results = {}
+
+        def work(account, batch):
+            try:
+                results[account.name] = submit(account, batch)
+            except Exception as e:
+                print(f"[账号 {account.name}] 提交时出错: {e}")
+                results[account.name] = False
+
+        threads = []
+        for account, batch in assignments:
+            print(f"[账号 {account.name}] 本次提交 {len(batch)} 个任务")
+            thread = threading.Thread(target=work, args=(account, batch),
+                                      name=f"account-{account.name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return sum(len(batch) for _, batch in assignments), all(results.values())
+
+    def report(self, now=None):
+        """打印各账号的配额使用情况"""
+        for name, scheduler in self.schedulers.items():
+            quota = "不限" if scheduler.daily_quota is None else scheduler.daily_quota
+            print(f"[账号 {name}] 当前配额窗口已使用 {scheduler.used(now)}/{quota}，"
+                  f"网站上未完成 {self.ledger.count_active(name)} 个")
+        print(f"待提交 {self.ledger.count_queued()} 个任务")
+
+
+def add_account(name, accounts_dir=DEFAULT_ACCOUNTS_DIR):
+    """用空白的浏览器配置打开 AlphaFold Server，手动登录后保存该账号的登录状态"""
+    if not sys.stdin.isatty():
+        print("错误：添加账号需要手动登录，请在可交互的终端中运行")
+        return False
+    os.makedirs(accounts_dir, exist_ok=True)
+    timeouts = resolve_timeouts()
+    profile_dir = tempfile.mkdtemp(prefix="chrome_account_")
+    try:
+        with sync_playwright() as p:
+            context = launch_browser(p, profile_dir)
+            try:
+                page = open_page(context)
+                open_alphafold(page, timeouts)
+                if not login(page, timeouts):
+                    print("错误：未能登录 AlphaFold Server")
+                    return False
+                save_session(context.storage_state(), account_session_path(name, accounts_dir))
+                return True
+            finally:
+                context.close()
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def list_accounts(accounts_dir=DEFAULT_ACCOUNTS_DIR, ledger_path=DEFAULT_LEDGER_PATH,
+                  daily_quota=DEFAULT_DAILY_QUOTA):
+    """打印登录状态有效的账号及其配额和任务数量"""
+    accounts = load_accounts(accounts_dir)
+    if not accounts:
+        return
+    with JobLedger(ledger_path) as ledger:
+        AccountShards(accounts, ledger, daily_quota).report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="管理多账号提交使用的账号登录状态")
+    parser.add_argument('--accounts', default=DEFAULT_ACCOUNTS_DIR,
+                        help=f"账号目录，默认 {DEFAULT_ACCOUNTS_DIR}")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_parser = commands.add_parser('add', help="登录一个新账号（或重新登录已有账号）并保存登录状态")
+    add_parser.add_argument('name', help="账号名称，用作登录状态缓存的文件名")
+    list_parser = commands.add_parser('list', help="列出账号及其配额使用情况")
+    list_parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH,
+                             help=f"任务台账路径，默认 {DEFAULT_LEDGER_PATH}")
+    list_parser.add_argument('--daily-quota', type=int, default=DEFAULT_DAILY_QUOTA,
+                             help=f"每个账号每日可提交的任务数量，默认 {DEFAULT_DAILY_QUOTA}，0 表示不限制")
+    args = parser.parse_args()
+    if args.command == 'add':
+        add_account(args.name, args.accounts)
+    else:
+        list_accounts(args.accounts, args.ledger, args.daily_quota or None)
@@ -0,0 +1,244 @@
+import argparse
+import csv
+import difflib
+import json
+import os
+import re
+import zipfile
+import numpy as np
+from preflight import read_jobs
+
+DEFAULT_DOWNLOADS_DIR = 'downloads'
+# 每个任务解析出的逐残基 pLDDT 与 PAE 数组缓存在这里，之后以内存映射方式读取
+DEFAULT_CACHE_DIR = 'analysis_cache'
+DEFAULT_OUTPUT_DIR = 'analysis'
+
+# 使用排序第一的模型
+CIF_PATTERN = re.compile(r'_model_0\.cif$')
+FULL_DATA_PATTERN = re.compile(r'_full_data_0\.json$')
+
+# 每批读入内存的变体数量；每个变体约占 4·L² 字节（L 为母本长度）的 ΔPAE
+DEFAULT_BATCH_SIZE = 64
+
+
+def _read_member(archive, pattern):
+    for member in archive.namelist():
+        if pattern.search(member):
+            with archive.open(member) as f:
+                return f.read().decode('utf-8')
+    raise FileNotFoundError(f"压缩包中没有匹配 {pattern.pattern} 的文件")
+
+
+def parse_ca_plddt(cif_text):
+    """从模型 CIF 的 atom_site 表中取出每个残基 CA 原子的 pLDDT（存放在 B 因子列）"""
+    columns = []
+    values = []
+    in_loop = False
+    for line in cif_text.splitlines():
+        if line.startswith('_atom_site.'):
+            columns.append(line.split('.', 1)[1].strip())
+            in_loop = True
+            continue
+        if not in_loop or not columns:
+            continue
+        if line.startswith(('#', 'loop_', '_')):
+            break
+        values.append(line.split())
+    atom = columns.index('label_atom_id')
+    bfactor = columns.index('B_iso_or_equiv')
+    return np.array([float(row[bfactor]) for row in values if row[atom] == 'CA'], dtype=np.float32)
+
+
+def _cache_paths(cache_dir, job):
+    return (os.path.join(cache_dir, f"{job}.plddt.npy"),
+            os.path.join(cache_dir, f"{job}.pae.npy"))
+
+
+def load_confidences(job, downloads_dir=DEFAULT_DOWNLOADS_DIR, cache_dir=DEFAULT_CACHE_DIR):
+    """返回任务的 (逐残基 pLDDT, PAE 矩阵)，均为只读的内存映射数组
+
+    第一次读取时从结果压缩包中解析并写入缓存目录，之后直接映射缓存文件。
+    """
+    plddt_path, pae_path = _cache_paths(cache_dir, job)
+    if not (os.path.exists(plddt_path) and os.path.exists(pae_path)):
+        with zipfile.ZipFile(os.path.join(downloads_dir, f"{job}.zip")) as archive:
+            plddt = parse_ca_plddt(_read_member(archive, CIF_PATTERN))
+            full_data = json.loads(_read_member(archive, FULL_DATA_PATTERN))
+        pae = np.asarray(full_data['pae'], dtype=np.float32)
+        if pae.shape != (len(plddt), len(plddt)):
+            raise ValueError(f"{job} 的 PAE 矩阵 {pae.shape} 与残基数 {len(plddt)} 不一致")
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(plddt_path, plddt)
+        np.save(pae_path, pae)
+    return np.load(plddt_path, mmap_mode='r'), np.load(pae_path, mmap_mode='r')
+
+
+def align_to_parent(parent, variant):
+    """返回长度等于母本的下标数组：母本每个位置对应的变体残基下标，缺失为 -1
+
+    等长序列逐位对应；含插入或缺失时按 difflib 的匹配区段对应。
+    """
+    if len(parent) == len(variant):
+        return np.arange(len(parent))
+    index = np.full(len(parent), -1)
+    matcher = difflib.SequenceMatcher(None, parent, variant, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        # 等长替换区段同样逐位对应，视为点突变
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            index[i1:i2] = np.arange(j1, j2)
+    return index
+
+
+def describe_mutations(parent, variant, index):
+    """用母本编号描述变体的突变，例如 A106W、D108del"""
+    parent_codes = np.frombuffer(parent.encode('ascii'), dtype='S1')
+    variant_codes = np.frombuffer(variant.encode('ascii'), dtype='S1')
+    present = index >= 0
+    aligned = np.where(present, variant_codes[np.clip(index, 0, None)], b'-')
+    changed = np.flatnonzero(aligned != parent_codes)
+    labels = [
+        f"{parent[i]}{i + 1}{'del' if aligned[i] == b'-' else aligned[i].decode()}"
+        for i in changed
+    ]
+    # 母本中没有对应位置的插入残基
+    inserted = np.setdiff1d(np.arange(len(variant)), index[present]).size
+    if inserted:
+        labels.append(f"ins{inserted}")
+    return labels
+
+
+def _align_batch(parent_plddt, parent_pae, indices, plddts, paes):
+    """把一批变体按母本编号对齐并减去母本，返回 (ΔpLDDT, ΔPAE)"""
+    # 先补一个 NaN 位，缺失位置（-1）正好指向它
+    index = np.stack(indices)
+    rows = np.arange(len(indices))[:, None]
+    padded_plddt = np.full((len(indices), max(len(p) for p in plddts) + 1), np.nan, dtype=np.float32)
+    padded_pae = np.full((len(indices),) + (padded_plddt.shape[1],) * 2, np.nan, dtype=np.float32)
+    for i, (plddt, pae) in enumerate(zip(plddts, paes)):
+        padded_plddt[i, :len(plddt)] = plddt
+        padded_pae[i, :len(plddt), :len(plddt)] = pae
+    aligned_plddt = padded_plddt[rows, index]
+    aligned_pae = padded_pae[rows[:, :, None], index[:, :, None], index[:, None, :]]
+    return (aligned_plddt - np.asarray(parent_plddt)[None, :],
+            aligned_pae - np.asarray(parent_pae)[None, :, :])
+
+
+def compare_family(parent_name, jobs, downloads_dir=DEFAULT_DOWNLOADS_DIR, cache_dir=DEFAULT_CACHE_DIR,
+                   delta_pae_path=None, batch_size=DEFAULT_BATCH_SIZE):
+    """把每个变体对齐到母本，计算 ΔpLDDT (变体数, L)、ΔPAE (变体数, L, L) 及每个变体的平均 |ΔPAE|
+
+    jobs 为 {名称: 序列}，必须包含母本；没有下载结果的变体跳过。
+    每次只把 batch_size 个变体读入内存；给出 delta_pae_path 时 ΔPAE 直接写入该 .npy 文件并以内存映射返回，
+    内存占用不随家族大小增长。
+    返回 (变体名称列表, 突变描述列表, ΔpLDDT, ΔPAE, 平均 |ΔPAE|)，母本中没有对应残基的位置为 NaN。
+    """
+    parent = jobs[parent_name]
+    parent_plddt, parent_pae = load_confidences(parent_name, downloads_dir, cache_dir)
+    length = len(parent_plddt)
+    if length != len(parent):
+        raise ValueError(f"母本 {parent_name} 的残基数 {length} 与序列长度 {len(parent)} 不一致")
+
+    # 先确认哪些变体有结果；内存映射只读取文件头
+    names, mutations, indices = [], [], []
+    for name, sequence in jobs.items():
+        if name == parent_name:
+            continue
+        try:
+            load_confidences(name, downloads_dir, cache_dir)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"跳过 {name}: {e}")
+            continue
+        index = align_to_parent(parent, sequence)
+        names.append(name)
+        mutations.append(describe_mutations(parent, sequence, index))
+        indices.append(index)
+
+    shape = (len(names), length, length)
+    if delta_pae_path:
+        delta_pae = np.lib.format.open_memmap(delta_pae_path, mode='w+', dtype=np.float32, shape=shape)
+    else:
+        delta_pae = np.empty(shape, dtype=np.float32)
+    delta_plddt = np.empty((len(names), length), dtype=np.float32)
+    mean_abs_dpae = np.empty(len(names), dtype=np.float32)
+    for start in range(0, len(names), batch_size):
+        stop = min(start + batch_size, len(names))
+        confidences = [load_confidences(name, downloads_dir, cache_dir) for name in names[start:stop]]
+        batch_plddt, batch_pae = _align_batch(parent_plddt, parent_pae, indices[start:stop],
+                                              [plddt for plddt, _ in confidences],
+                                              [pae for _, pae in confidences])
+        delta_plddt[start:stop] = batch_plddt
+        delta_pae[start:stop] = batch_pae
+        mean_abs_dpae[start:stop] = np.nanmean(np.abs(batch_pae), axis=(1, 2))
+    if delta_pae_path:
+        delta_pae.flush()
+    return names, mutations, delta_plddt, delta_pae, mean_abs_dpae
+
+
+def rank_by_impact(names, mutations, delta_plddt, mean_abs_dpae):
+    """按结构影响排序：逐残基 |ΔpLDDT| 与 |ΔPAE| 的平均值之和，从大到小"""
+    mean_dplddt = np.nanmean(np.abs(delta_plddt), axis=1)
+    min_dplddt = np.nanmin(delta_plddt, axis=1)
+    score = mean_dplddt + mean_abs_dpae
+    order = np.argsort(-score)
+    return [
+        {
+            'job': names[i],
+            'mutations': ';'.join(mutations[i]),
+            'impact': round(float(score[i]), 3),
+            'mean_abs_dplddt': round(float(mean_dplddt[i]), 3),
+            'max_plddt_drop': round(float(-min_dplddt[i]), 3),
+            'mean_abs_dpae': round(float(mean_abs_dpae[i]), 3),
+        }
+        for i in order
+    ]
+
+
+def analyze_family(parent_name, sequences_path='JUNCE.txt', downloads_dir=DEFAULT_DOWNLOADS_DIR,
+                   cache_dir=DEFAULT_CACHE_DIR, output_dir=DEFAULT_OUTPUT_DIR, batch_size=DEFAULT_BATCH_SIZE):
+    """比较整个突变家族与母本的置信度差异，写出排序表与 ΔpLDDT/ΔPAE 矩阵；
+    batch_size 为每批读入内存的变体数量"""
+    # 与提交时相同地读取和预检（不去重），同名任务只保留第一个；离线分析不导入依赖浏览器的 main.py
+    sequences, _ = read_jobs(sequences_path, dedupe=False, report_path=None)
+    jobs = dict(sequences)
+    if parent_name not in jobs:
+        print(f"错误：{sequences_path} 中没有母本 {parent_name}")
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    names, mutations, delta_plddt, _, mean_abs_dpae = compare_family(
+        parent_name, jobs, downloads_dir, cache_dir, os.path.join(output_dir, 'delta_pae.npy'), batch_size)
+    if not names:
+        print("没有可比较的变体")
+        return []
+    ranking = rank_by_impact(names, mutations, delta_plddt, mean_abs_dpae)
+
+    np.save(os.path.join(output_dir, 'delta_plddt.npy'), delta_plddt)
+    with open(os.path.join(output_dir, 'variants.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(names) + '\n')
+    with open(os.path.join(output_dir, 'impact.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(ranking[0]))
+        writer.writeheader()
+        writer.writerows(ranking)
+
+    print(f"\n比较了 {len(names)} 个变体，结构影响最大的前 10 个：")
+    for row in ranking[:10]:
+        print(f"- {row['job']} ({row['mutations']}): {row['impact']}")
+    print(f"结果已写入 {output_dir}")
+    return ranking
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较突变家族中每个变体与母本的逐残基 pLDDT 和 PAE")
+    parser.add_argument('parent', help="母本在 JUNCE.txt 中的名称")
+    parser.add_argument('--sequences', default='JUNCE.txt',
+                        help="序列文件，默认 JUNCE.txt")
+    parser.add_argument('--downloads', default=DEFAULT_DOWNLOADS_DIR,
+                        help=f"结果压缩包所在目录，默认 {DEFAULT_DOWNLOADS_DIR}")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR,
+                        help=f"数组缓存目录，默认 {DEFAULT_CACHE_DIR}")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR,
+                        help=f"输出目录，默认 {DEFAULT_OUTPUT_DIR}")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"每批读入内存的变体数量，默认 {DEFAULT_BATCH_SIZE}")
+    args = parser.parse_args()
+    analyze_family(args.parent, args.sequences, args.downloads, args.cache, args.output,
+                   max(1, args.batch_size))
@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+from waits import resolve_timeouts, wait_logged_in
+from sequence_entry import INPUT_STRATEGIES
+from submission import open_page, prepare_form
+from recovery import RetryQueue, process_queue, collect_results
+from submit_pool import find_free_port, run_pool
+from ledger import JobLedger
+from download import (
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+    DOWNLOAD_MODES,
+    filter_tasks,
+    download_tasks,
+    fetch_tasks,
+)
+from mock_server import DEFAULT_LATENCY, MockAlphaFoldServer
+from lean_mode import browser_args, block_resources_async
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+# 基准测试结果追加写入的文件，每行一个 JSON，便于比较不同改动前后的吞吐量
+DEFAULT_RESULTS_PATH = 'benchmark_results.jsonl'
+
+
+def make_sequences(count, length, seed=0):
+    """生成 count 个随机的 (名称, 序列)"""
+    rng = random.Random(seed)
+    return [
+        (f"bench_{i:04d}", ''.join(rng.choice(AMINO_ACIDS) for _ in range(length)))
+        for i in range(count)
+    ]
+
+
+def _bench_submit(url, sequences, timeouts, input_strategy, concurrency, ledger, profile_dir, lean):
+    """在无头 Chromium 中向模拟服务器提交全部序列，返回 (成功数量, 耗时秒数)"""
+    with sync_playwright() as p:
+        debug_port = find_free_port() if concurrency > 1 else None
+        extra = [f'--remote-debugging-port={debug_port}'] if debug_port else []
+        args = browser_args(True, extra) if lean else extra
+        context = p.chromium.launch_persistent_context(profile_dir, headless=True, args=args)
+        try:
+            page = open_page(context, lean, url)
+            page.goto(url)
+            if not wait_logged_in(page, timeouts['page_ready']):
+                raise RuntimeError("模拟服务器页面未能加载")
+
+            started = time.perf_counter()
+            if concurrency > 1:
+                results = run_pool(f"http://127.0.0.1:{debug_port}", sequences, concurrency,
+                                   timeouts, input_strategy, ledger, url, lean=lean)
+            else:
+                # 与 main.py 相同，经过重试队列和页面恢复
+                baseline_inputs = prepare_form(page, timeouts)
+                if baseline_inputs is None:
+                    raise RuntimeError("模拟服务器的表单未能准备好")
+                tasks = RetryQueue(sequences)
+                process_queue(page, tasks, timeouts, baseline_inputs, input_strategy, ledger)
+                results = collect_results(tasks)
+            succeeded = sum(1 for result in results if result.ok)
+            return succeeded, time.perf_counter() - started
+        finally:
+            context.close()
+
+
+async def _bench_download(url, jobs, downloads_dir, ledger, concurrency, mode, lean):
+    """在无头 Chromium 中下载全部结果，返回 (下载数量, 耗时秒数)"""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=browser_args(True) if lean else [])
+        try:
+            context = await browser.new_context(accept_downloads=True)
+            if lean:
+                await block_resources_async(context, url)
+            page = await context.new_page()
+            await page.goto(url, wait_until='networkidle')
+
+            started = time.perf_counter()
+            await filter_tasks(page)
+            remaining = jobs
+            if mode == 'http':
+                remaining = await fetch_tasks(page, remaining, downloads_dir, ledger, concurrency)
+            if remaining:
+                await download_tasks(page, remaining, downloads_dir, ledger, concurrency)
+            elapsed = time.perf_counter() - started
+        finally:
+            await browser.close()
+    downloaded = sum(1 for name in jobs if os.path.exists(os.path.join(downloads_dir, f"{name}.zip")))
+    return downloaded, elapsed
+
+
+def run_benchmark(jobs=20, length=120, concurrency=1, download_concurrency=DEFAULT_DOWNLOAD_CONCURRENCY,
+                  input_strategy='fill', mode='ui', latency=DEFAULT_LATENCY, job_duration=1.0,
+                  results_path=DEFAULT_RESULTS_PATH, lean=False):
+    """启动模拟服务器，测量提交与下载的吞吐量（个/分钟），结果追加到 results_path；
+    lean 为 True 时使用精简模式的启动参数和请求拦截"""
+    timeouts = resolve_timeouts()
+    sequences = make_sequences(jobs, length)
+    work_dir = tempfile.mkdtemp(prefix="af_bench_")
+    downloads_dir = os.path.join(work_dir, 'downloads')
+    os.makedirs(downloads_dir)
+    try:
+        with MockAlphaFoldServer(latency=latency, job_duration=job_duration) as server, \
+                JobLedger(os.path.join(work_dir, 'ledger.sqlite3')) as ledger:
+            ledger.register(sequences)
+            print(f"模拟服务器: {server.url}")
+
+            submitted, submit_seconds = _bench_submit(
+                server.url, sequences, timeouts, input_strategy, concurrency, ledger,
+                os.path.join(work_dir, 'profile'), lean)
+
+            # 等待模拟服务器上的任务全部完成，这段时间不计入下载耗时
+            while not server.all_done():
+                time.sleep(0.2)
+
+            downloaded, download_seconds = asyncio.run(_bench_download(
+                server.url, dict(sequences), downloads_dir, ledger, download_concurrency, mode, lean))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'jobs': jobs,
+        'length': length,
+        'concurrency': concurrency,
+        'download_concurrency': download_concurrency,
+        'input_strategy': input_strategy,
+        'mode': mode,
+        'latency': latency,
+        'lean': lean,
+        'submitted': submitted,
+        'submit_seconds': round(submit_seconds, 2),
+        'submissions_per_min': round(submitted / submit_seconds * 60, 2) if submit_seconds else None,
+        'downloaded': downloaded,
+        'download_seconds': round(download_seconds, 2),
+        'downloads_per_min': round(downloaded / download_seconds * 60, 2) if download_seconds else None,
+    }
+    print(f"\n提交：{submitted}/{jobs} 个，用时 {report['submit_seconds']} 秒，"
+          f"{report['submissions_per_min']} 个/分钟")
+    print(f"下载：{downloaded}/{jobs} 个，用时 {report['download_seconds']} 秒，"
+          f"{report['downloads_per_min']} 个/分钟")
+    if results_path:
+        with open(results_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {results_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="使用本地模拟服务器测量提交和下载的吞吐量")
+    parser.add_argument('--jobs', type=int, default=20, help="任务数量，默认 20")
+    parser.add_argument('--length', type=int, default=120, help="随机序列长度，默认 120")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="同时提交的标签页数量，默认 1")
+    parser.add_argument('--download-concurrency', type=int, default=DEFAULT_DOWNLOAD_CONCURRENCY,
+                        help=f"同时进行中的下载数量上限，默认 {DEFAULT_DOWNLOAD_CONCURRENCY}")
+    parser.add_argument('--input-strategy', choices=INPUT_STRATEGIES, default='fill',
+                        help="序列输入方式，默认 fill")
+    parser.add_argument('--mode', choices=DOWNLOAD_MODES, default='ui',
+                        help="下载方式，默认 ui")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help=f"模拟服务器每个请求的延迟（秒），默认 {DEFAULT_LATENCY}")
+    parser.add_argument('--job-duration', type=float, default=1.0,
+                        help="模拟任务从提交到完成的时间（秒），默认 1")
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH,
+                        help=f"结果追加写入的文件，默认 {DEFAULT_RESULTS_PATH}")
+    parser.add_argument('--lean', action='store_true',
+                        help="使用精简模式的启动参数和请求拦截")
+    args = parser.parse_args()
+    run_benchmark(jobs=args.jobs, length=args.length, concurrency=max(1, args.concurrency),
+                  download_concurrency=max(1, args.download_concurrency),
+                  input_strategy=args.input_strategy, mode=args.mode, latency=args.latency,
+                  job_duration=args.job_duration, results_path=args.results, lean=args.lean)
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import time
+import urllib.request
+from playwright.sync_api import sync_playwright
+from waits import resolve_timeouts
+from session import DEFAULT_SESSION_PATH, discard_session, load_session, save_session
+from submission import ALPHAFOLD_URL, launch_browser, restore_session, open_page, open_alphafold, login
+
+# 常驻浏览器写出的连接信息，main.py 和 download.py 据此通过 CDP 连接
+DEFAULT_ENDPOINT_FILE = 'browser_endpoint.json'
+DEFAULT_DEBUG_PORT = 9222
+# 常驻浏览器使用固定的配置目录，重启后仍保留缓存
+DEFAULT_PROFILE_DIR = 'browser_profile'
+# 保活检查间隔（秒）：刷新预热页面、确认仍处于登录状态并更新登录状态缓存
+KEEPALIVE_INTERVAL = 600
+
+
+def daemon_endpoint(path=DEFAULT_ENDPOINT_FILE):
+    """返回正在运行的常驻浏览器的 CDP 地址，没有可用的常驻浏览器时返回 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            endpoint = json.load(f)['endpoint']
+        # 探测 CDP 端口，残留的连接信息文件不会被当成可用的浏览器
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=2) as response:
+            response.read()
+        return endpoint
+    except Exception:
+        return None
+
+
+def _write_endpoint(path, endpoint):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'endpoint': endpoint, 'pid': os.getpid(), 'started_at': time.time()}, f)
+
+
+def run_daemon(port=DEFAULT_DEBUG_PORT, profile_dir=DEFAULT_PROFILE_DIR,
+               session_path=DEFAULT_SESSION_PATH, endpoint_file=DEFAULT_ENDPOINT_FILE, lean=False):
+    """启动常驻浏览器并保持登录状态，直到按 Ctrl+C 退出；lean 为 True 时使用无头精简模式"""
+    timeouts = resolve_timeouts()
+    endpoint = f"http://127.0.0.1:{port}"
+    if daemon_endpoint(endpoint_file):
+        print(f"常驻浏览器已在运行: {endpoint}")
+        return False
+
+    session_state = load_session(session_path)
+    if lean and not session_state:
+        # 无头浏览器中无法手动登录
+        print("错误：精简模式需要有效的登录状态缓存，请先以普通模式运行一次完成登录")
+        return False
+
+    os.makedirs(profile_dir, exist_ok=True)
+    with sync_playwright() as p:
+        browser = launch_browser(p, os.path.abspath(profile_dir), debug_port=port, lean=lean)
+        try:
+            if session_state:
+                restore_session(browser, session_state)
+
+            # 保留一个已经打开并登录的页面，保持缓存和登录状态处于预热状态
+            page = open_page(browser, lean)
+            open_alphafold(page, timeouts)
+            if not login(page, timeouts):
+                print("错误：未能登录 AlphaFold Server")
+                if session_state:
+                    discard_session(session_path)
+                return False
+            save_session(browser.storage_state(), session_path)
+
+            _write_endpoint(endpoint_file, endpoint)
+            print(f"\n常驻浏览器已就绪: {endpoint}")
+            print("main.py 和 download.py 会自动连接，按 Ctrl+C 退出")
+
+            while True:
+                # 用 wait_for_timeout 而不是 time.sleep 等待：同步 API 只在 Playwright 调用中执行请求拦截回调，
+                # 精简模式下预热页面的后台请求需要本线程持续处理
+                page.wait_for_timeout(KEEPALIVE_INTERVAL * 1000)
+                try:
+                    page.goto(ALPHAFOLD_URL, timeout=60000)
+                    if login(page, timeouts):
+                        save_session(browser.storage_state(), session_path)
+                    else:
+                        print("警告：常驻浏览器的登录状态已失效")
+                        discard_session(session_path)
+                except Exception as e:
+                    print(f"保活检查出错: {e}")
+        except KeyboardInterrupt:
+            print("\n正在关闭常驻浏览器...")
+        finally:
+            if os.path.exists(endpoint_file):
+                os.remove(endpoint_file)
+            browser.close()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动常驻浏览器，供 main.py 和 download.py 连接")
+    parser.add_argument('--port', type=int, default=DEFAULT_DEBUG_PORT,
+                        help=f"CDP 调试端口，默认 {DEFAULT_DEBUG_PORT}")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE_DIR,
+                        help=f"浏览器配置目录，默认 {DEFAULT_PROFILE_DIR}")
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH,
+                        help=f"登录状态缓存路径，默认 {DEFAULT_SESSION_PATH}")
+    parser.add_argument('--lean', action='store_true',
+                        help="精简模式：无头 Chromium，拦截非必要资源与第三方请求（需要登录状态缓存）")
+    args = parser.parse_args()
+    run_daemon(port=args.port, profile_dir=args.profile, session_path=args.session, lean=args.lean)
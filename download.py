@@ -1,8 +1,59 @@
 import os
-import time
+import sys
+import argparse
+import asyncio
 import tempfile
 import shutil
-from playwright.sync_api import sync_playwright
+import threading
+import http.client
+import http.cookiejar
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+from playwright.async_api import async_playwright
+from ledger import (
+    DEFAULT_LEDGER_PATH,
+    RUNNING,
+    DONE,
+    DOWNLOADED,
+    FAILED,
+    JobLedger,
+    sequence_hash,
+)
+from browser_daemon import daemon_endpoint
+from preflight import read_jobs
+from waits import (
+    CHIP_SELECTOR,
+    DEFAULT_TIMEOUTS,
+    TABLE_PAGE_STATE_SCRIPT,
+    wait_page_ready_async,
+    wait_logged_in_async,
+    wait_job_table_async,
+    wait_chip_deselected_async,
+    wait_table_page_changed_async,
+)
+from accounts import account_session_path
+from submission import ALPHAFOLD_URL
+from lean_mode import chrome_executable, browser_args, block_resources_async
+from job_feed import JobFeed
+from result_cache import DEFAULT_RESULT_CACHE_DIR, ResultCache
+from selector_registry import get_registry, save_registry
+from session import (
+    DEFAULT_SESSION_PATH,
+    discard_session,
+    load_session,
+    save_session,
+    session_cookies,
+    local_storage_script,
+)
+
+# 同时进行中的下载数量上限
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+
+# 下载方式：ui 通过操作菜单触发浏览器下载，http 收集下载地址后直接请求
+DOWNLOAD_MODES = ('ui', 'http')
+
+# 任务列表来源：table 解析页面表格，network 解析前端拉取任务列表的网络响应
+JOB_SOURCES = ('table', 'network')
 
 def get_chrome_user_data_dir():
     """获取 Chrome 用户数据目录"""
@@ -29,59 +80,52 @@ def create_temp_profile(original_profile):
     
     return temp_dir
 
-def read_sequences(file_path):
-    """读取序列文件中的名称"""
-    with open(file_path, 'r') as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
-    
-    # 解析序列名称
-    names = []
-    i = 0
-    while i < len(lines):
-        name = lines[i]
-        if i + 1 < len(lines):
-            names.append(name)
-            i += 2
-        else:
-            print(f"\n警告：第 {i+1} 行没有对应的序列")
-            break
-    
-    print(f"\n从文件中读取到 {len(names)} 个任务名称")
-    return names
-
-def launch_browser(temp_dir):
-    """启动 Chrome 浏览器"""
-    print("启动 Chrome 浏览器...")
-    with sync_playwright() as p:
-        browser = p.chromium.launch_persistent_context(
-            user_data_dir=temp_dir,
-            executable_path=r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-            headless=False,
-            ignore_default_args=["--enable-automation"],
-            args=[
-                '--start-maximized',
-                '--no-first-run',
-                '--no-default-browser-check',
-                '--disable-blink-features=AutomationControlled'
-            ]
-        )
-        return browser
-
-def login(page):
-    """登录 AlphaFold Server"""
+async def launch_browser(p, user_data_dir, downloads_dir, lean=False):
+    """启动 Chrome 浏览器；lean 为 True 时使用无头精简模式（见 submission.launch_browser）"""
+    print("启动无头 Chromium（精简模式）..." if lean else "启动 Chrome 浏览器...")
+    context = await p.chromium.launch_persistent_context(
+        user_data_dir=user_data_dir,
+        executable_path=None if lean else chrome_executable(),
+        headless=lean,
+        ignore_default_args=["--enable-automation"],
+        accept_downloads=True,
+        args=browser_args(lean, [
+            f'--download.default_directory={downloads_dir}',
+            '--download.prompt_for_download=false',
+            '--disable-download-notification',
+            '--allow-file-access-from-files',  # 允许访问本地文件
+            '--allow-file-access',  # 允许文件访问
+            '--allow-running-insecure-content'  # 允许不安全内容
+        ])
+    )
+    if lean:
+        await block_resources_async(context, ALPHAFOLD_URL)
+    return context
+
+async def login(page):
+    """登录 AlphaFold Server，返回是否已登录"""
     print("等待登录...")
     login_button = page.locator('span:has-text("Continue with Google")')
-    if login_button.is_visible():
-        login_button.click()
+    if await login_button.is_visible():
+        if not sys.stdin.isatty():
+            print("错误：需要重新登录，但当前没有可交互的终端")
+            return False
+        await login_button.click()
         print("\n请在浏览器中完成 Google 登录。")
         print("完成后请按回车键继续...")
-        input()
-        time.sleep(3)  # 给页面更多加载时间
-    else:
-        print("已经登录，继续执行...")
+        await asyncio.to_thread(input)
+
+    # 等待页面加载完成
+    return await wait_logged_in_async(page, DEFAULT_TIMEOUTS['page_ready'])
+
+async def chip_selected(chip):
+    """chip 元素是否处于选中状态"""
+    if await chip.get_attribute('aria-selected') == 'true':
+        return True
+    return 'mdc-evolution-chip--selected' in (await chip.get_attribute('class') or '').split()
 
-def filter_tasks(page):
-    """过滤任务"""
+async def filter_tasks(page):
+    """过滤任务，返回前等待任务列表表格出现"""
     print("点击过滤按钮...")
     filter_buttons = [
         'Saved draft',
@@ -89,150 +133,608 @@ def filter_tasks(page):
         'Examples',
         'Failed'
     ]
+    registry = get_registry()
     for button_text in filter_buttons:
-        try:
+        async def click_script():
             # 使用JavaScript点击，因为按钮可能有复杂的嵌套结构
-            page.evaluate(f'''() => {{
+            # 过滤按钮是切换式的，只点击当前处于选中状态的按钮，重复运行不会反转过滤结果
+            return await page.evaluate(f'''() => {{
                 const buttons = Array.from(document.querySelectorAll('span.mdc-evolution-chip__text-label'));
                 const button = buttons.find(b => b.textContent.trim().includes('{button_text}'));
-                if (button) {{
-                    button.click();
-                    console.log('Clicked {button_text}');
-                }} else {{
+                if (!button) {{
                     console.log('Button not found: {button_text}');
+                    return null;
                 }}
+                const chip = button.closest('{CHIP_SELECTOR}');
+                const selected = chip && (chip.getAttribute('aria-selected') === 'true' ||
+                    chip.classList.contains('mdc-evolution-chip--selected'));
+                // 找不到按钮所在的 chip 时无法判断状态，保持原来的点击行为
+                if (chip && !selected) return 'skipped';
+                button.click();
+                console.log('Clicked {button_text}');
+                return 'clicked';
             }}''')
-            print(f"点击 {button_text} 按钮")
-            time.sleep(1)  # 等待过滤效果
+
+        async def click_locator():
+            # 常规方式点击，与 click_script 一样只点击处于选中状态的按钮
+            button = page.locator(f'span.mdc-evolution-chip__text-label:has-text("{button_text}")')
+            if not await button.first.is_visible():
+                return None
+            chips = await page.locator(CHIP_SELECTOR).filter(has=button).all()
+            if chips and not any([await chip_selected(chip) for chip in chips]):
+                return 'skipped'
+            await button.first.click()
+            return 'clicked'
+
+        try:
+            outcome = await registry.attempt_async(
+                'filter_chip', [('script', click_script), ('locator', click_locator)])
         except Exception as e:
             print(f"点击 {button_text} 按钮时出错: {e}")
-            # 尝试使用常规方式点击
-            try:
-                button = page.locator(f'span.mdc-evolution-chip__text-label:has-text("{button_text}")')
-                if button.is_visible(timeout=2000):
-                    button.click()
-                    print(f"使用常规方式点击 {button_text} 按钮")
-                    time.sleep(1)
-            except Exception as e:
-                print(f"常规点击也失败: {e}")
+            continue
+        if outcome == 'skipped':
+            print(f"{button_text} 按钮未选中，无需点击")
+        elif outcome == 'clicked':
+            print(f"点击 {button_text} 按钮")
+            # 等待按钮变为未选中，即过滤已经生效
+            if not await wait_chip_deselected_async(page, button_text, DEFAULT_TIMEOUTS['chip_toggled']):
+                print(f"{button_text} 按钮点击后仍处于选中状态")
+        else:
+            print(f"未找到 {button_text} 按钮")
+    if not await wait_job_table_async(page, DEFAULT_TIMEOUTS['job_table']):
+        print("任务列表表格未出现")
+
+# 一次 evaluate 读出当前页所有行：名称、状态、日期、下载地址及其在 tbody 中的位置
+EXTRACT_ROWS_SCRIPT = '''() => {
+    const pick = (cells, keys) => {
+        for (const key of keys) {
+            if (cells[key]) return cells[key];
+        }
+        return '';
+    };
+    return Array.from(document.querySelectorAll('table.mat-mdc-table tbody tr')).map((row, index) => {
+        const cells = {};
+        for (const cell of row.querySelectorAll('td')) {
+            const match = Array.from(cell.classList).join(' ').match(/mat-column-(\\S+)/);
+            if (!match) continue;
+            const labelled = cell.querySelector('[aria-label], [mattooltip]');
+            cells[match[1].toLowerCase()] = cell.textContent.trim()
+                || (labelled && (labelled.getAttribute('aria-label') || labelled.getAttribute('mattooltip')))
+                || '';
+        }
+        const anchor = row.querySelector('a[download][href]');
+        return {
+            index,
+            name: cells['name'] || '',
+            status: pick(cells, ['status', 'state']),
+            date: pick(cells, ['date', 'created', 'creation-date', 'submitted', 'submission-date']),
+            link: anchor ? new URL(anchor.getAttribute('href'), location.href).href : null,
+        };
+    }).filter(record => record.name);
+}'''
+
+# 任务列表状态文字中的关键字与台账状态的对应关系，按顺序匹配
+STATUS_KEYWORDS = (
+    ('fail', FAILED),
+    ('error', FAILED),
+    ('succeed', DONE),
+    ('complete', DONE),
+    ('done', DONE),
+    ('running', RUNNING),
+    ('progress', RUNNING),
+    ('pending', RUNNING),
+    ('queue', RUNNING),
+)
+
+def classify_status(status_text):
+    """把任务列表中的状态文字映射为台账状态，无法识别时返回 None"""
+    text = status_text.lower()
+    for keyword, state in STATUS_KEYWORDS:
+        if keyword in text:
+            return state
+    return None
+
+async def _goto_next_page(page):
+    """点击分页器的下一页，没有下一页或翻页未生效时返回 False"""
+    next_button = page.locator('button.mat-mdc-paginator-navigation-next')
+    if not await next_button.count() or await next_button.is_disabled():
+        return False
+    previous = await page.evaluate(TABLE_PAGE_STATE_SCRIPT)
+    await next_button.click()
+    # 等待分页范围切换到下一页
+    if not await wait_table_page_changed_async(page, previous, DEFAULT_TIMEOUTS['page_changed']):
+        print("点击下一页后任务列表没有变化，停止翻页")
+        return False
+    return True
 
-def get_task_names(page):
-    """获取任务名称"""
+async def _goto_first_page(page):
+    """回到分页器的第一页"""
+    first_button = page.locator('button.mat-mdc-paginator-navigation-first')
+    previous_button = page.locator('button.mat-mdc-paginator-navigation-previous')
+    if await first_button.count() and not await first_button.is_disabled():
+        await first_button.click()
+    else:
+        while await previous_button.count() and not await previous_button.is_disabled():
+            await previous_button.click()
+    await page.wait_for_load_state()
+
+async def iter_table_pages(page):
+    """逐页遍历任务列表，每页 yield (页码, 当前页所有行的记录)
+
+    调用方在拿到某一页的记录后可以直接操作该页的行，遍历完再翻到下一页。
+    """
     task_table = page.locator('table.mat-mdc-table')
-    task_table.wait_for(state='visible', timeout=10000)
-    rows = task_table.locator('tbody tr')
-    row_count = rows.count()
-    print(f"找到 {row_count} 个任务")
-    print("\n表格中的任务名称：")
-    task_names = []
-    for i in range(row_count):
-        try:
-            row = rows.nth(i)
-            task_name_cell = row.locator('td.mat-column-name')
-            if task_name_cell.is_visible(timeout=2000):
-                task_name = task_name_cell.text_content().strip()
-                task_names.append(task_name)
-                print(f"- {task_name}")
-        except Exception as e:
-            print(f"获取第 {i+1} 行任务名称时出错: {e}")
-    return task_names
+    await task_table.wait_for(state='visible', timeout=10000)
+    page_no = 1
+    while True:
+        records = await page.evaluate(EXTRACT_ROWS_SCRIPT)
+        yield page_no, records
+        if not await _goto_next_page(page):
+            break
+        page_no += 1
+
+async def get_task_names(page):
+    """读取所有分页中的任务，返回 {任务名称: 行记录}，记录中包含所在页码"""
+    index = {}
+    async for page_no, records in iter_table_pages(page):
+        for record in records:
+            record['page'] = page_no
+            index.setdefault(record['name'], record)
+    if any(record['page'] > 1 for record in index.values()):
+        await _goto_first_page(page)
+    print(f"找到 {len(index)} 个任务")
+    print("\n表格中的任务：")
+    for record in index.values():
+        print(f"- {record['name']}  {record['status']}  {record['date']}")
+    return index
+
+def sync_statuses(table_index, jobs, ledger):
+    """把任务列表中识别出的状态写入台账，状态未变化的任务不重复写入"""
+    states = ledger.states()
+    for name, sequence in jobs.items():
+        record = table_index.get(name)
+        state = classify_status(record['status']) if record else None
+        if state is None or states.get((name, sequence_hash(sequence))) == state:
+            continue
+        error = f"网站上的任务状态: {record['status']}" if state == FAILED else None
+        ledger.set_state(name, sequence, state, error)
+
+async def start_download(page, row, task_name):
+    """打开任务的操作菜单并点击下载，返回 Download 对象，失败返回 None"""
+    # 首先点击更多操作按钮（三个点的图标按钮）
+    more_button = row.locator('button.mat-mdc-menu-trigger.fold-actions')
+    if not await more_button.is_visible(timeout=2000):
+        print(f"任务 {task_name} 的更多操作按钮不可见")
+        return None
+    await more_button.click()
+    
+    # 等待下载按钮出现并点击
+    download_button = page.locator('a.mat-mdc-menu-item[download]')
+    try:
+        await download_button.wait_for(state='visible', timeout=2000)
+    except Exception:
+        print(f"找不到任务 {task_name} 的下载按钮")
+        await page.keyboard.press('Escape')  # 关闭菜单，避免挡住下一行
+        return None
+    
+    async with page.expect_download() as download_info:
+        await download_button.click()
+    return await download_info.value
+
+def fan_out_aliases(path, alias_names):
+    """把结果复制给序列相同的其他任务名称，已存在的文件不覆盖"""
+    directory = os.path.dirname(path)
+    for alias in alias_names:
+        alias_path = os.path.join(directory, f"{alias}.zip")
+        if not os.path.exists(alias_path):
+            shutil.copyfile(path, alias_path)
+            print(f"已复制结果给同序列任务: {alias}")
 
-def download_tasks(page, task_names):
-    """下载任务"""
+async def save_download(download, path, task_name, sequence, semaphore, ledger, alias_names=()):
+    """等待下载完成并保存文件，完成后释放并发名额并更新台账"""
+    try:
+        print(f"等待下载 {task_name}...")
+        # 先写入临时文件再改名，中途中断不会留下看似完整的 zip
+        partial_path = path + '.part'
+        await download.save_as(partial_path)
+        os.replace(partial_path, path)
+        print(f"已下载: {task_name}")
+        fan_out_aliases(path, alias_names)
+        ledger.set_state(task_name, sequence, DOWNLOADED)
+        return True
+    except Exception as e:
+        print(f"保存任务 {task_name} 时出错: {e}")
+        # 任务在网站上已完成，只是下载失败，下次运行重新下载
+        ledger.set_state(task_name, sequence, DONE, str(e))
+        return False
+    finally:
+        semaphore.release()
+
+async def download_tasks(page, jobs, downloads_dir, ledger,
+                         concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, aliases=None):
+    """下载任务：逐页读取任务列表，依次触发需要的行的下载，最多 concurrency 个下载同时进行；
+    jobs 为 {名称: 序列}，本地已有结果的任务直接跳过；
+    aliases 为 {名称: [同序列的其他名称]}，下载后结果复制给这些名称"""
+    aliases = aliases or {}
     print("\n开始处理任务...")
-    rows = page.locator('tbody tr')
-    row_count = rows.count()
-    for i in range(row_count):
-        try:
-            row = rows.nth(i)
-            task_name_cell = row.locator('td.mat-column-name')
-            if not task_name_cell.is_visible(timeout=2000):
-                print(f"第 {i+1} 行的任务名称单元格不可见")
-                continue
-            task_name = task_name_cell.text_content().strip()
-            if task_name not in task_names:
-                print(f"跳过任务 {task_name}，因为不在JUNCE.txt中")
+    semaphore = asyncio.Semaphore(concurrency)
+    saving = []
+    found = set()
+    rows = page.locator('table.mat-mdc-table tbody tr')
+    async for page_no, records in iter_table_pages(page):
+        for record in records:
+            task_name = record['name']
+            if task_name not in jobs or task_name in found:
                 continue
+            found.add(task_name)
+            try:
+                sequence = jobs[task_name]
+                path = os.path.join(downloads_dir, f"{task_name}.zip")
+                if os.path.exists(path):
+                    print(f"跳过任务 {task_name}，结果已存在")
+                    if ledger.state_of(task_name, sequence) != DOWNLOADED:
+                        ledger.set_state(task_name, sequence, DOWNLOADED)
+                    fan_out_aliases(path, aliases.get(task_name, ()))
+                    continue
                 
-            print(f"处理任务: {task_name}")
-            
-            # 首先点击更多操作按钮（三个点的图标按钮）
-            more_button = row.locator('button.mat-mdc-menu-trigger.fold-actions')
-            if more_button.is_visible(timeout=2000):
-                more_button.click()
-                time.sleep(1)  # 等待菜单出现
+                print(f"处理任务: {task_name}（第 {page_no} 页）")
                 
-                # 等待下载按钮出现并点击
-                download_button = page.locator('a.mat-mdc-menu-item[download]')
-                if download_button.is_visible(timeout=2000):
-                    # 开始下载
-                    with page.expect_download() as download_info:
-                        download_button.click()
-                        download = download_info.value
-                        
-                        # 等待下载完成
-                        print(f"等待下载 {task_name}...")
-                        download.save_as(os.path.join(downloads_dir, f"{task_name}.zip"))
-                        print(f"已下载: {task_name}")
-                        time.sleep(2)  # 等待文件保存
-                else:
-                    print(f"找不到任务 {task_name} 的下载按钮")
-            else:
-                print(f"任务 {task_name} 的更多操作按钮不可见")
+                # 菜单同一时间只能打开一个，因此触发下载是串行的；文件的传输和保存并发进行
+                await semaphore.acquire()
+                try:
+                    download = await start_download(page, rows.nth(record['index']), task_name)
+                except Exception:
+                    semaphore.release()
+                    raise
+                if download is None:
+                    semaphore.release()
+                    continue
+                saving.append(asyncio.create_task(
+                    save_download(download, path, task_name, sequence, semaphore, ledger,
+                                  aliases.get(task_name, ()))))
+            except Exception as e:
+                print(f"处理任务 {task_name} 时出错: {e}")
+    
+    missing = len(jobs) - len(found)
+    if missing:
+        print(f"\n有 {missing} 个任务不在任务列表中")
+    results = await asyncio.gather(*saving)
+    print(f"\n成功下载 {sum(results)} 个，失败 {len(results) - sum(results)} 个")
+    return results
+
+# HTTP 下载时边接收边写盘，每块的大小
+WRITE_CHUNK_SIZE = 1 << 20
+
+# HTTP 下载的超时时间（秒），指连接和两次收到数据之间的最长间隔
+FETCH_TIMEOUT = 120
+
+# HTTP 下载最多跟随的重定向次数
+MAX_REDIRECTS = 5
+
+async def harvest_download_links(page, jobs):
+    """逐页遍历任务列表，收集 {任务名称: 下载地址}
+
+    行内已有下载链接的任务直接取自整页提取的记录；没有的再打开操作菜单读取 href，
+    读取后按 Escape 关闭菜单，不触发实际下载。拿不到可直接请求的地址的任务不在结果中。
+    """
+    links = {}
+    rows = page.locator('table.mat-mdc-table tbody tr')
+    async for page_no, records in iter_table_pages(page):
+        for record in records:
+            name = record['name']
+            if name not in jobs or name in links:
+                continue
+            if record['link']:
+                links[name] = record['link']
+                continue
+            try:
+                await rows.nth(record['index']).locator(
+                    'button.mat-mdc-menu-trigger.fold-actions').click(timeout=2000)
+                anchor = page.locator('a.mat-mdc-menu-item[download]')
+                await anchor.wait_for(state='visible', timeout=2000)
+                links[name] = await anchor.evaluate('(a) => a.href')
+            except Exception as e:
+                print(f"获取任务 {name} 的下载地址时出错: {e}")
+            finally:
+                await page.keyboard.press('Escape')
+    await _goto_first_page(page)
+    # blob: 等页面内地址无法通过 HTTP 请求获取，这些任务仍需通过界面下载
+    return {
+        name: url for name, url in links.items()
+        if url and url.startswith(('http://', 'https://'))
+    }
+
+def _jar_cookie(cookie):
+    """把 Playwright 的 Cookie 转为 http.cookiejar.Cookie，保留域名、路径、secure 与过期时间，
+    由 CookieJar 像浏览器一样按请求地址选择要发送的 Cookie"""
+    domain = cookie['domain']
+    expires = cookie.get('expires', -1)
+    return http.cookiejar.Cookie(
+        version=0, name=cookie['name'], value=cookie['value'], port=None, port_specified=False,
+        # 以 . 开头的是域 Cookie，可发往子域名；否则只发往该主机
+        domain=domain, domain_specified=domain.startswith('.'), domain_initial_dot=domain.startswith('.'),
+        path=cookie.get('path') or '/', path_specified=True, secure=cookie.get('secure', False),
+        expires=None if expires is None or expires < 0 else int(expires), discard=expires is None or expires < 0,
+        comment=None, comment_url=None, rest={'HttpOnly': None} if cookie.get('httpOnly') else {},
+    )
+
+
+class ResultFetcher:
+    """直接请求结果文件：按主机复用 HTTP 连接，Cookie 来自浏览器上下文并由一个共用的 CookieJar 按地址选择
+
+    多个下载线程共用同一个实例；空闲的连接按 (协议, 主机, 端口) 放回连接池，下一个请求直接复用，
+    不必为每个文件重新建立 TCP 与 TLS 连接。
+    """
+
+    def __init__(self, cookies, user_agent):
+        self.user_agent = user_agent
+        self.jar = http.cookiejar.CookieJar()
+        for cookie in cookies:
+            self.jar.set_cookie(_jar_cookie(cookie))
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    async def from_page(cls, page):
+        """沿用页面所在浏览器上下文的全部 Cookie 与 User-Agent"""
+        return cls(await page.context.cookies(), await page.evaluate('navigator.userAgent'))
+
+    def _connect(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=FETCH_TIMEOUT), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def close(self):
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def _request(self, url, headers):
+        """发送 GET 请求，返回 (连接的键, 连接, 响应)；复用的连接已被服务器关闭时换一个新连接重试一次"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request = urllib.request.Request(url)
+        self.jar.add_cookie_header(request)
+        headers = dict(headers, **{'User-Agent': self.user_agent})
+        if request.has_header('Cookie'):
+            headers['Cookie'] = request.get_header('Cookie')
+        while True:
+            connection, reused = self._connect(key)
+            try:
+                connection.request('GET', target, headers=headers)
+                response = connection.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            self.jar.extract_cookies(response, request)
+            return key, connection, response
+
+    def _finish(self, key, connection, response):
+        """读完响应后把连接放回连接池，服务器要求关闭时直接关闭"""
+        response.read()
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+
+    def stream_to_file(self, url, partial_path, redirects=MAX_REDIRECTS):
+        """请求 url 并把响应边接收边追加到 partial_path；.part 文件已有内容时用 Range 请求剩余部分，
+        传输中断后留下的 .part 文件下次可以继续"""
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        key, connection, response = self._request(url, headers)
+        if response.status in (301, 302, 303, 307, 308) and response.getheader('Location') and redirects:
+            location = urljoin(url, response.getheader('Location'))
+            self._finish(key, connection, response)
+            return self.stream_to_file(location, partial_path, redirects - 1)
+        if response.status == 416 and offset:
+            # 临时文件已经完整
+            self._finish(key, connection, response)
+            return
+        if response.status >= 400:
+            self._finish(key, connection, response)
+            raise RuntimeError(f"HTTP {response.status}")
+        try:
+            # 服务器忽略 Range 时返回 200，需要从头写入
+            append = response.status == 206 and offset > 0
+            with open(partial_path, 'ab' if append else 'wb') as f:
+                shutil.copyfileobj(response, f, WRITE_CHUNK_SIZE)
+        except Exception:
+            connection.close()
+            raise
+        self._finish(key, connection, response)
+
+async def fetch_result(fetcher, url, path, task_name, sequence, semaphore, ledger, alias_names=()):
+    """用浏览器上下文的登录状态直接请求结果文件，边下载边写入 .part 文件，支持断点续传"""
+    partial_path = path + '.part'
+    async with semaphore:
+        try:
+            await asyncio.to_thread(fetcher.stream_to_file, url, partial_path)
+            os.replace(partial_path, path)
+            print(f"已下载: {task_name}")
+            fan_out_aliases(path, alias_names)
+            ledger.set_state(task_name, sequence, DOWNLOADED)
+            return True
         except Exception as e:
-            print(f"处理第 {i+1} 个任务时出错: {e}")
+            print(f"下载任务 {task_name} 时出错: {e}")
+            ledger.set_state(task_name, sequence, DONE, str(e))
+            return False
+
+async def fetch_tasks(page, jobs, downloads_dir, ledger,
+                      concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, aliases=None):
+    """直接请求结果文件：先收集下载地址，再并发下载；返回拿不到地址、需要通过界面下载的任务"""
+    print("\n收集下载地址...")
+    links = await harvest_download_links(page, jobs)
+    print(f"获取到 {len(links)} 个下载地址")
+    return await fetch_links(page, links, jobs, downloads_dir, ledger, concurrency, aliases)
 
-def download_results():
-    # 读取需要下载的任务名称
-    task_names = read_sequences('JUNCE.txt')
-    if not task_names:
+async def fetch_links(page, links, jobs, downloads_dir, ledger,
+                      concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, aliases=None):
+    """按已知的下载地址 {名称: 地址} 并发下载；返回没有地址的任务"""
+    aliases = aliases or {}
+    semaphore = asyncio.Semaphore(concurrency)
+    fetcher = await ResultFetcher.from_page(page)
+    fetching = [
+        fetch_result(fetcher, url, os.path.join(downloads_dir, f"{name}.zip"),
+                     name, jobs[name], semaphore, ledger, aliases.get(name, ()))
+        for name, url in links.items()
+    ]
+    try:
+        results = await asyncio.gather(*fetching)
+    finally:
+        fetcher.close()
+    print(f"\n成功下载 {sum(results)} 个，失败 {len(results) - sum(results)} 个")
+    return {name: sequence for name, sequence in jobs.items() if name not in links}
+
+async def download_from_feed(page, feed, jobs, downloads_dir, ledger,
+                             concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, aliases=None):
+    """根据网络响应中的任务列表同步状态，并直接下载带有结果地址的已完成任务；
+    返回仍需通过表格处理的任务"""
+    feed_index = await feed.wait(jobs)
+    print(f"从网络响应中解析到 {len(feed_index)} 个任务")
+    sync_statuses(feed_index, jobs, ledger)
+
+    links = {}
+    for name in jobs:
+        record = feed_index.get(name)
+        if record and record.get('link') and classify_status(record['status']) in (DONE, None):
+            links[name] = record['link']
+    if not links:
+        return jobs
+    print(f"其中 {len(links)} 个任务带有结果地址，直接下载")
+    return await fetch_links(page, links, jobs, downloads_dir, ledger, concurrency, aliases)
+
+async def _download_results(concurrency, ledger_path, session_path, use_daemon, mode, source,
+                            result_cache_dir, lean, accounts_dir):
+    # 读取需要下载的任务，与提交时相同地预检和去重：
+    # 序列相同的任务只提交过一次，下载后把结果复制给其他名称
+    unique, aliases = read_jobs('JUNCE.txt')
+    jobs = dict(unique)
+    if not jobs:
         print("错误：无法读取任务名称")
         return False
     
-    # 获取 Chrome 用户数据目录
-    original_profile = get_chrome_user_data_dir()
-    if not os.path.exists(original_profile):
-        print("错误：找不到 Chrome 用户数据目录")
-        return False
-    
     # 创建下载目录
-    global downloads_dir
     downloads_dir = os.path.join(os.getcwd(), 'downloads')
     os.makedirs(downloads_dir, exist_ok=True)
     print(f"下载目录: {downloads_dir}")
     
+    # 跳过台账中已下载且本地文件仍存在的任务
+    ledger = JobLedger(ledger_path)
+    ledger.register(jobs.items())
+    states = ledger.states()
+    remaining = {}
+    for name, sequence in jobs.items():
+        path = os.path.join(downloads_dir, f"{name}.zip")
+        if states.get((name, sequence_hash(sequence))) == DOWNLOADED and os.path.exists(path):
+            fan_out_aliases(path, aliases.get(name, ()))
+        else:
+            remaining[name] = sequence
+    if not remaining:
+        print("台账中所有任务均已下载，无需启动浏览器")
+        ledger.close()
+        return True
+    print(f"需要下载 {len(remaining)} 个任务（共 {len(jobs)} 个）")
+    
+    # 用多个账号提交时，每个任务到提交它的账号下下载；未记录账号的任务使用默认的登录状态
+    groups = {}
+    submitted_by = ledger.accounts() if accounts_dir else {}
+    for name, sequence in remaining.items():
+        groups.setdefault(submitted_by.get(name), {})[name] = sequence
+    downloads = []
+    for account, group in groups.items():
+        if account is None:
+            downloads.append(_download_with_session(
+                group, aliases, downloads_dir, ledger, concurrency, session_path,
+                use_daemon, mode, source, lean))
+        else:
+            print(f"[账号 {account}] 需要下载 {len(group)} 个任务")
+            downloads.append(_download_with_session(
+                group, aliases, downloads_dir, ledger, concurrency,
+                account_session_path(account, accounts_dir), False, mode, source, lean,
+                account=account))
+    try:
+        ok = all(await asyncio.gather(*downloads))
+        
+        # 新下载的结果存入结果缓存，之后再提交相同的序列时直接使用
+        if result_cache_dir:
+            ResultCache(result_cache_dir).ingest(jobs, downloads_dir, ledger)
+    finally:
+        ledger.close()
+    
+    if ok:
+        print("\n所有下载任务完成！")
+        print(f"文件已下载到: {downloads_dir}")
+    return ok
+
+async def _download_with_session(remaining, aliases, downloads_dir, ledger, concurrency,
+                                 session_path, use_daemon, mode, source, lean, account=None):
+    """用一个登录状态打开浏览器并下载 remaining 中的任务，返回是否成功；
+    account 为该登录状态对应的账号，给出时不回退到本机 Chrome 配置，也不等待回车关闭浏览器"""
+    prefix = f"[账号 {account}] " if account else ""
+    
+    # 常驻浏览器在运行时直接连接；否则有可用的登录状态缓存时使用空白的临时配置，
+    # 都没有时使用实际的 Chrome 用户配置
+    endpoint = daemon_endpoint() if use_daemon else None
+    session_state = None if endpoint else load_session(session_path)
+    if endpoint:
+        print(f"连接常驻浏览器: {endpoint}")
+    elif session_state:
+        print(f"{prefix}使用缓存的登录状态")
+        user_data_dir = tempfile.mkdtemp(prefix="chrome_temp_")
+    elif account:
+        # 本机 Chrome 配置登录的不一定是该账号
+        print(f"错误：账号 {account} 的登录状态无效，请运行 python accounts.py add {account} 重新登录")
+        return False
+    elif lean:
+        # 无头浏览器中无法手动登录
+        print("错误：精简模式需要有效的登录状态缓存，请先以普通模式运行一次完成登录")
+        return False
+    else:
+        user_data_dir = get_chrome_user_data_dir()
+        if not os.path.exists(user_data_dir):
+            print("错误：找不到 Chrome 用户数据目录")
+            return False
+    
     try:
-        with sync_playwright() as p:
-            # 启动 Chrome 浏览器
-            print("启动 Chrome 浏览器...")
-            browser = p.chromium.launch_persistent_context(
-                user_data_dir=original_profile,  # 使用实际的用户配置
-                executable_path=r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                headless=False,
-                ignore_default_args=["--enable-automation"],
-                accept_downloads=True,
-                args=[
-                    '--start-maximized',
-                    '--no-first-run',
-                    '--no-default-browser-check',
-                    '--disable-blink-features=AutomationControlled',
-                    f'--download.default_directory={downloads_dir}',
-                    '--download.prompt_for_download=false',
-                    '--disable-download-notification',
-                    '--allow-file-access-from-files',  # 允许访问本地文件
-                    '--allow-file-access',  # 允许文件访问
-                    '--allow-running-insecure-content'  # 允许不安全内容
-                ]
-            )
+        async with async_playwright() as p:
+            if endpoint:
+                # 通过 CDP 连接常驻浏览器，close 时只断开连接
+                browser = await p.chromium.connect_over_cdp(endpoint)
+                context = browser.contexts[0]
+            else:
+                # 启动 Chrome 浏览器
+                browser = context = await launch_browser(p, user_data_dir, downloads_dir, lean)
             
             try:
+                # 恢复缓存的登录状态
+                if session_state:
+                    await context.add_cookies(session_cookies(session_state))
+                    await context.add_init_script(local_storage_script(session_state))
+                
                 # 创建新页面并设置权限
-                page = browser.new_page()
-                context = browser
-                context.grant_permissions(['geolocation'])
+                page = await context.new_page()
+                if endpoint and lean:
+                    await block_resources_async(page, ALPHAFOLD_URL)
+                await context.grant_permissions(['geolocation'])
                 
                 # 修改 navigator.webdriver
-                page.add_init_script("""
+                await page.add_init_script("""
                     Object.defineProperty(navigator, 'webdriver', {
                         get: () => undefined
                     });
@@ -244,38 +746,108 @@ def download_results():
                     });
                 """)
                 
-                # 访问 AlphaFold Server
-                print("正在访问 AlphaFold Server...")
-                page.goto("https://alphafoldserver.com/", wait_until='networkidle')
-                time.sleep(3)
+                # network 模式需要在打开页面之前开始监听，才能捕获首次加载的任务列表
+                feed = None
+                if source == 'network':
+                    feed = JobFeed()
+                    feed.attach(page)
                 
-                # 登录
-                login(page)
-                time.sleep(3)
+                # 访问 AlphaFold Server
+                print(f"{prefix}正在访问 AlphaFold Server...")
+                await page.goto(ALPHAFOLD_URL, wait_until='networkidle')
+                await wait_page_ready_async(page, DEFAULT_TIMEOUTS['page_ready'])
                 
-                # 过滤任务
-                filter_tasks(page)
-                time.sleep(2)
+                # 登录，登录成功后刷新登录状态缓存
+                if not await login(page):
+                    if session_state:
+                        discard_session(session_path)
+                    return False
+                save_session(await context.storage_state(), session_path)
                 
-                # 获取任务名称
-                table_task_names = get_task_names(page)
+                # network 模式：直接使用前端拉取的任务列表，带有结果地址的任务直接下载
+                if feed is not None:
+                    remaining = await download_from_feed(page, feed, remaining, downloads_dir,
+                                                         ledger, concurrency, aliases)
                 
-                # 下载任务
-                download_tasks(page, task_names)
+                if remaining:
+                    # 过滤任务
+                    await filter_tasks(page)
+                    
+                    # 获取所有分页中的任务，并把网站上的状态同步到台账
+                    table_index = await get_task_names(page)
+                    sync_statuses(table_index, remaining, ledger)
+                    
+                    # 下载任务；http 模式下拿不到下载地址的任务仍通过界面下载
+                    if mode == 'http':
+                        remaining = await fetch_tasks(page, remaining, downloads_dir, ledger,
+                                                      concurrency, aliases)
+                    if remaining:
+                        await download_tasks(page, remaining, downloads_dir, ledger, concurrency, aliases)
                 
-                print("\n所有下载任务完成！")
-                print(f"文件已下载到: {downloads_dir}")
-                print("按回车键关闭浏览器...")
-                input()
+                if endpoint:
+                    # 只关闭自己的标签页，常驻浏览器继续运行
+                    await page.close()
+                elif not account:
+                    print("按回车键关闭浏览器...")
+                    await asyncio.to_thread(input)
                 
             finally:
-                browser.close()
+                await browser.close()
                 
     except Exception as e:
-        print(f"运行过程中出错: {e}")
+        print(f"{prefix}运行过程中出错: {e}")
         return False
+    finally:
+        if session_state:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
         
     return True
 
+def download_results(concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, ledger_path=DEFAULT_LEDGER_PATH,
+                     session_path=DEFAULT_SESSION_PATH, use_daemon=True, mode='ui', source='table',
+                     result_cache_dir=DEFAULT_RESULT_CACHE_DIR, lean=False, accounts_dir=None):
+    """下载 JUNCE.txt 中任务的结果，concurrency 为同时进行中的下载数量上限；
+    use_daemon 为 True 且 browser_daemon.py 正在运行时连接常驻浏览器；
+    mode 为下载方式（见 DOWNLOAD_MODES），source 为任务列表来源（见 JOB_SOURCES）；
+    result_cache_dir 为结果缓存目录，None 表示不把下载的结果存入缓存；
+    lean 为 True 时使用无头精简模式，需要有效的登录状态缓存；
+    accounts_dir 为多账号提交时的账号目录（见 accounts.py），给出时每个任务用提交它的账号下载"""
+    if mode not in DOWNLOAD_MODES:
+        raise ValueError(f"未知的下载方式: {mode}，可选: {', '.join(DOWNLOAD_MODES)}")
+    if source not in JOB_SOURCES:
+        raise ValueError(f"未知的任务列表来源: {source}，可选: {', '.join(JOB_SOURCES)}")
+    try:
+        return asyncio.run(_download_results(concurrency, ledger_path, session_path, use_daemon,
+                                             mode, source, result_cache_dir, lean,
+                                             accounts_dir))
+    finally:
+        save_registry()
+
 if __name__ == "__main__":
-    download_results()
+    parser = argparse.ArgumentParser(description="下载 JUNCE.txt 中已提交任务的结果")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_DOWNLOAD_CONCURRENCY,
+                        help=f"同时进行中的下载数量上限，默认 {DEFAULT_DOWNLOAD_CONCURRENCY}")
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH,
+                        help=f"任务台账路径，默认 {DEFAULT_LEDGER_PATH}")
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH,
+                        help=f"登录状态缓存路径，默认 {DEFAULT_SESSION_PATH}")
+    parser.add_argument('--no-daemon', action='store_true',
+                        help="即使常驻浏览器正在运行，也启动独立的浏览器")
+    parser.add_argument('--mode', choices=DOWNLOAD_MODES, default='ui',
+                        help="下载方式：ui 通过操作菜单下载（默认），http 收集下载地址后直接并发请求")
+    parser.add_argument('--source', choices=JOB_SOURCES, default='table',
+                        help="任务列表来源：table 解析页面表格（默认），network 解析前端接口返回的任务列表")
+    parser.add_argument('--result-cache', default=DEFAULT_RESULT_CACHE_DIR,
+                        help=f"结果缓存目录，默认 {DEFAULT_RESULT_CACHE_DIR}")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="不把下载的结果存入结果缓存")
+    parser.add_argument('--lean', action='store_true',
+                        help="精简模式：无头 Chromium，拦截非必要资源与第三方请求（需要登录状态缓存）")
+    parser.add_argument('--accounts', metavar='DIR',
+                        help="多账号模式：每个任务使用该目录中提交它的账号的登录状态下载（见 accounts.py）")
+    args = parser.parse_args()
+    download_results(concurrency=max(1, args.concurrency), ledger_path=args.ledger,
+                     session_path=args.session, use_daemon=not args.no_daemon, mode=args.mode,
+                     source=args.source,
+                     result_cache_dir=None if args.no_result_cache else args.result_cache,
+                     lean=args.lean, accounts_dir=args.accounts)
@@ -0,0 +1,43 @@
+from collections import namedtuple
+
+# 一个任务可以包含多条链：实体之间用 ":" 分隔，"N*" 前缀表示该实体的拷贝数，
+# 例如 SEQA:2*SEQB 为一条 SEQA 与两条 SEQB 组成的复合物；不含这两个符号的序列是单链任务。
+ENTITY_SEPARATOR = ':'
+COPIES_SEPARATOR = '*'
+
+# 蛋白质实体及其拷贝数
+Entity = namedtuple('Entity', ['sequence', 'copies'])
+
+
+def is_multi_entity(text):
+    """序列文本是否使用了多实体写法"""
+    return ENTITY_SEPARATOR in text or COPIES_SEPARATOR in text
+
+
+def parse_entities(text):
+    """把序列文本解析为 [Entity]，忽略空白与大小写，保持书写顺序；
+    同一序列出现多次时合并为一个实体并累加拷贝数。格式错误时抛出 ValueError"""
+    merged = {}
+    for part in ''.join(text.split()).upper().split(ENTITY_SEPARATOR):
+        copies, separator, sequence = part.rpartition(COPIES_SEPARATOR)
+        if not separator:
+            copies = '1'
+        if not sequence or not sequence.isalpha():
+            raise ValueError(f"无法解析的实体: {part!r}")
+        if not copies.isdigit() or int(copies) < 1:
+            raise ValueError(f"拷贝数必须是正整数: {part!r}")
+        merged[sequence] = merged.get(sequence, 0) + int(copies)
+    return [Entity(sequence, copies) for sequence, copies in merged.items()]
+
+
+def format_entities(entities):
+    """把实体写回文本；实体按序列排序，使书写顺序不同的同一复合物得到相同的规范形式"""
+    return ENTITY_SEPARATOR.join(
+        f"{entity.copies}{COPIES_SEPARATOR}{entity.sequence}" if entity.copies > 1 else entity.sequence
+        for entity in sorted(entities)
+    )
+
+
+def count_tokens(entities):
+    """任务的 token 数：蛋白质每个残基计 1 个 token，乘以拷贝数"""
+    return sum(len(entity.sequence) * entity.copies for entity in entities)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import time
+
+# 识别任务记录时使用的字段名（不区分大小写，忽略下划线）
+NAME_KEYS = ('name', 'jobname', 'displayname', 'title')
+STATUS_KEYS = ('status', 'state', 'jobstatus', 'jobstate')
+ID_KEYS = ('id', 'jobid', 'uuid', 'key')
+
+# 结果文件地址中常见的片段
+ARTIFACT_HINTS = ('download', '.zip', 'result', 'archive', 'storage.googleapis.com')
+
+# Google 前端接口常用的防 JSON 劫持前缀；较长的前缀在前，避免只去掉一部分
+XSSI_PREFIXES = (")]}',", ")]}'")
+
+
+def _normalize_key(key):
+    return key.replace('_', '').replace('-', '').lower()
+
+
+def parse_json_payload(text):
+    """解析响应内容，去掉防劫持前缀，不是 JSON 时返回 None"""
+    text = text.lstrip()
+    for prefix in XSSI_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _first_value(record, keys):
+    for key, value in record.items():
+        if _normalize_key(key) in keys and isinstance(value, (str, int)) and value != '':
+            return value
+    return None
+
+
+def _artifact_urls(value, depth=0):
+    """在记录中查找结果文件地址（最多向下查找两层）"""
+    if depth > 2:
+        return []
+    if isinstance(value, str):
+        lowered = value.lower()
+        if lowered.startswith(('http://', 'https://')) and any(hint in lowered for hint in ARTIFACT_HINTS):
+            return [value]
+        return []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        urls = []
+        for item in value:
+            urls.extend(_artifact_urls(item, depth + 1))
+        return urls
+    return []
+
+
+def extract_job_records(payload):
+    """从任意 JSON 结构中找出同时带有名称和状态字段的对象，作为任务记录返回"""
+    records = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        name = _first_value(node, NAME_KEYS)
+        status = _first_value(node, STATUS_KEYS)
+        if isinstance(name, str) and status is not None:
+            urls = _artifact_urls(node)
+            records.append({
+                'id': _first_value(node, ID_KEYS),
+                'name': name.strip(),
+                'status': str(status),
+                'link': urls[0] if urls else None,
+            })
+        else:
+            stack.extend(node.values())
+    return records
+
+
+class JobFeed:
+    """监听页面的网络响应，从前端拉取的任务列表 JSON 中直接解析任务
+
+    必须在 page.goto 之前调用 attach，才能捕获页面首次加载时的任务列表请求。
+    不依赖过滤按钮的状态、表格渲染或分页。
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.last_update = None
+
+    def attach(self, page):
+        page.on('response', self._on_response)
+
+    def reset(self):
+        """清空已收到的任务；重新加载页面之前调用，wait 才会等待新的响应而不是返回上一次的状态"""
+        self.jobs = {}
+        self.last_update = None
+
+    async def _on_response(self, response):
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        content_type = response.headers.get('content-type', '')
+        if 'json' not in content_type and 'text/plain' not in content_type:
+            return
+        try:
+            payload = parse_json_payload(await response.text())
+        except Exception:
+            return
+        if payload is None:
+            return
+        records = extract_job_records(payload)
+        for record in records:
+            # 同一个任务可能出现在多个响应中，后到的非空字段覆盖先到的
+            merged = self.jobs.setdefault(record['name'], {})
+            merged.update({key: value for key, value in record.items() if value is not None})
+        if records:
+            self.last_update = time.monotonic()
+
+    async def wait(self, expected_names=(), timeout=15, quiet=2):
+        """等待任务列表：期望的任务全部出现，或有数据后 quiet 秒内没有新数据，最多等待 timeout 秒"""
+        expected = set(expected_names)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if expected and expected <= self.jobs.keys():
+                break
+            if self.last_update is not None and time.monotonic() - self.last_update >= quiet:
+                break
+            await asyncio.sleep(0.2)
+        return self.jobs
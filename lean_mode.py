@@ -0,0 +1,97 @@
+import os
+from urllib.parse import urlsplit
+
+# 本机安装的 Chrome；不存在时（例如在 Linux 服务器上）使用 Playwright 自带的 Chromium
+CHROME_PATH = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+
+# 精简模式下直接拦截的资源类型：页面交互与判断都不依赖它们
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+
+# 精简模式下允许访问的站点（含子域名），其余第三方主机（统计、广告、字体 CDN 等）一律拦截。
+# googleapis.com 用于结果文件下载，accounts.google.com 与 gstatic.com 用于登录状态校验。
+ALLOWED_HOST_SUFFIXES = ('alphafoldserver.com', 'google.com', 'gstatic.com', 'googleapis.com')
+
+# 精简模式的 Chromium 启动参数：关闭与自动化无关的后台功能，减少渲染进程占用
+LEAN_ARGS = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--disable-dev-shm-usage',
+    '--mute-audio',
+    '--blink-settings=imagesEnabled=false',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+]
+
+
+def chrome_executable():
+    """返回本机 Chrome 的路径，没有安装时返回 None（使用 Playwright 自带的 Chromium）"""
+    return CHROME_PATH if os.path.exists(CHROME_PATH) else None
+
+
+def browser_args(lean, extra=()):
+    """启动参数：普通模式保持原有的有界面设置，精简模式使用 LEAN_ARGS"""
+    if lean:
+        return LEAN_ARGS + list(extra)
+    return [
+        '--start-maximized',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--disable-blink-features=AutomationControlled',
+    ] + list(extra)
+
+
+def _allowed_hosts(site_url):
+    host = urlsplit(site_url).hostname or ''
+    return ALLOWED_HOST_SUFFIXES + ((host,) if host else ())
+
+
+def should_block(resource_type, url, allowed_hosts):
+    """判断请求是否应被拦截：非必要的资源类型，或不在白名单中的第三方主机"""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        return False
+    host = parts.hostname or ''
+    return not any(host == suffix or host.endswith('.' + suffix) for suffix in allowed_hosts)
+
+
+def block_resources(page, site_url):
+    """在标签页上安装请求拦截（同步 API）
+
+    同步 API 只有在安装拦截的线程正处于 Playwright 调用中时才会执行回调，
+    因此每个线程只在自己使用的标签页上安装，不在共用的浏览器上下文上安装，
+    否则其他线程或 CDP 连接打开的标签页的请求会一直等待。"""
+    allowed_hosts = _allowed_hosts(site_url)
+
+    def handle(route):
+        request = route.request
+        if should_block(request.resource_type, request.url, allowed_hosts):
+            route.abort()
+        else:
+            route.continue_()
+
+    page.route('**/*', handle)
+
+
+async def block_resources_async(target, site_url):
+    """在浏览器上下文或标签页上安装请求拦截（异步 API）
+
+    异步 API 由事件循环执行回调，可以安装在整个上下文上；连接常驻浏览器时只安装在自己的标签页上，
+    不影响其他连接的标签页。"""
+    allowed_hosts = _allowed_hosts(site_url)
+
+    async def handle(route):
+        request = route.request
+        if should_block(request.resource_type, request.url, allowed_hosts):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await target.route('**/*', handle)
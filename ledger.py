@@ -0,0 +1,340 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from entities import is_multi_entity, parse_entities, format_entities
+
+DEFAULT_LEDGER_PATH = 'ledger.sqlite3'
+
+# 任务状态
+PENDING = 'pending'        # 已登记，尚未提交
+SUBMITTED = 'submitted'    # 已在网站上提交
+RUNNING = 'running'        # 网站上正在运行
+DONE = 'done'              # 网站上已完成，结果可下载
+DOWNLOADED = 'downloaded'  # 结果已下载到本地
+FAILED = 'failed'          # 提交或下载失败，下次运行会重试
+
+STATES = (PENDING, SUBMITTED, RUNNING, DONE, DOWNLOADED, FAILED)
+
+# 处于这些状态的任务不需要再次提交
+SUBMITTED_STATES = frozenset({SUBMITTED, RUNNING, DONE, DOWNLOADED})
+
+# 按 (名称, 序列哈希) 批量查询时每条 SQL 的键数量，不超过 SQLite 的参数个数上限
+LOOKUP_BATCH_SIZE = 400
+
+
+def compact_sequence(sequence):
+    """去掉所有空白并转为大写，保持实体的书写顺序；台账中保存、提交时使用的就是这种形式"""
+    return ''.join(sequence.split()).upper()
+
+
+def canonical_sequence(sequence):
+    """规范化序列：在 compact_sequence 的基础上把多实体任务的实体按序列排序（见 entities），
+    只用于计算哈希，书写顺序不同的同一复合物得到相同的哈希"""
+    compact = compact_sequence(sequence)
+    if is_multi_entity(compact):
+        try:
+            return format_entities(parse_entities(compact))
+        except ValueError:
+            # 格式错误的任务由预检拒绝，这里保持原样
+            return compact
+    return compact
+
+
+def sequence_hash(sequence):
+    """规范化序列的 SHA-256 摘要"""
+    return hashlib.sha256(canonical_sequence(sequence).encode('ascii')).hexdigest()
+
+
+def apply_diff(parent, diff):
+    """把 ((位置, 替换残基), ...) 形式的差异应用到母本上，位置按母本编号从 1 开始，替换残基为空表示删除"""
+    pieces = []
+    last = 0
+    for position, replacement in diff:
+        pieces.append(parent[last:position - 1])
+        pieces.append(replacement)
+        last = position
+    pieces.append(parent[last:])
+    return ''.join(pieces)
+
+
+def encode_diff(diff):
+    """差异的文本形式，例如 59:,106:W"""
+    return ','.join(f"{position}:{replacement}" for position, replacement in diff)
+
+
+def decode_diff(text):
+    return tuple((int(position), replacement)
+                 for position, replacement in (item.split(':') for item in text.split(',')))
+
+
+def dedupe_sequences(sequences):
+    """按规范化序列去重
+
+    返回 (unique, aliases)：unique 为每种序列第一次出现的 (名称, 序列)，保持原有顺序；
+    aliases 为 {保留的名称: [与其序列相同的其他名称]}，只包含确实有重复的任务。
+    """
+    primary_by_hash = {}
+    unique = []
+    aliases = {}
+    for name, sequence in sequences:
+        digest = sequence_hash(sequence)
+        primary = primary_by_hash.get(digest)
+        if primary is None:
+            primary_by_hash[digest] = name
+            unique.append((name, sequence))
+        elif name != primary:
+            aliases.setdefault(primary, []).append(name)
+    return unique, aliases
+
+
+class JobLedger:
+    """本地 SQLite 任务台账，以 (任务名称, 序列哈希) 为键记录每个任务的状态
+
+    提交和下载两个入口都读写同一个台账，重启后跳过已完成的工作。
+    连接允许跨线程使用（多标签页提交时由工作线程写入），写操作由锁串行化。
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    name TEXT NOT NULL,
+                    seq_hash TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (name, seq_hash)
+                )
+            ''')
+            # 突变体文库的母本序列，文库中的任务只保存母本哈希与差异（见 mutants）
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS parents (
+                    seq_hash TEXT PRIMARY KEY,
+                    sequence TEXT NOT NULL
+                )
+            ''')
+            self._ensure_columns()
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_submitted_at ON jobs (submitted_at)')
+
+    # 后续版本新增的列，旧台账打开时自动补齐
+    _EXTRA_COLUMNS = (
+        ('sequence', 'sequence TEXT'),
+        ('priority', 'priority INTEGER NOT NULL DEFAULT 0'),
+        ('submitted_at', 'submitted_at REAL'),
+        ('account', 'account TEXT'),
+        ('parent_hash', 'parent_hash TEXT'),
+        ('diff', 'diff TEXT'),
+        ('seed_settings', 'seed_settings TEXT'),
+    )
+
+    def _ensure_columns(self):
+        existing = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        for column, ddl in self._EXTRA_COLUMNS:
+            if column not in existing:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {ddl}')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def register(self, sequences, priorities=None, origins=None):
+        """登记 (名称, 序列) 列表，已存在的任务保持原状态
+
+        priorities 为 {名称: 优先级}，给出时同时更新这些任务的优先级（数值越大越先提交）。
+        origins 为 {名称: (母本序列, 差异)}，其中的任务只保存母本哈希与差异，不保存完整序列。
+        """
+        now = time.time()
+        origins = origins or {}
+        parents = {}
+        rows = []
+        for name, sequence in sequences:
+            origin = origins.get(name)
+            if origin is None:
+                rows.append((name, sequence_hash(sequence), compact_sequence(sequence),
+                             None, None, PENDING, now, now))
+                continue
+            parent, diff = origin
+            if parent not in parents:
+                parents[parent] = sequence_hash(parent)
+            rows.append((name, sequence_hash(sequence), None, parents[parent], encode_diff(diff),
+                         PENDING, now, now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO parents (seq_hash, sequence) VALUES (?, ?)',
+                [(digest, compact_sequence(parent)) for parent, digest in parents.items()],
+            )
+            self._conn.executemany(
+                '''INSERT INTO jobs (name, seq_hash, sequence, parent_hash, diff, state,
+                                   created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (name, seq_hash) DO UPDATE SET
+                       sequence = COALESCE(jobs.sequence, excluded.sequence),
+                       parent_hash = COALESCE(jobs.parent_hash, excluded.parent_hash),
+                       diff = COALESCE(jobs.diff, excluded.diff)''',
+                rows,
+            )
+            if priorities:
+                self._conn.executemany(
+                    'UPDATE jobs SET priority = ? WHERE name = ?',
+                    [(priority, name) for name, priority in priorities.items()],
+                )
+
+    def states(self):
+        """一次性读出全部任务状态：{(名称, 序列哈希): 状态}"""
+        with self._lock:
+            return {
+                (name, seq_hash): state
+                for name, seq_hash, state in self._conn.execute('SELECT name, seq_hash, state FROM jobs')
+            }
+
+    def states_of(self, sequences):
+        """只查询给出的 (名称, 序列)：{(名称, 序列哈希): 状态}，未登记的任务不在结果中"""
+        return self._lookup(sequences, 'state')
+
+    def seed_settings_of(self, sequences):
+        """给出的 (名称, 序列) 提交时的种子设置：{(名称, 序列哈希): 种子设置}，未记录时为 None"""
+        return self._lookup(sequences, 'seed_settings')
+
+    def _lookup(self, sequences, column):
+        keys = [(name, sequence_hash(sequence)) for name, sequence in sequences]
+        values = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ', '.join(['(?, ?)'] * len(batch))
+                # 用 JOIN 而不是 (name, seq_hash) IN (...)，后者不走主键索引，会扫描整个台账
+                rows = self._conn.execute(
+                    f'''WITH keys (name, seq_hash) AS (VALUES {placeholders})
+                        SELECT jobs.name, jobs.seq_hash, jobs.{column} FROM keys
+                        JOIN jobs ON jobs.name = keys.name AND jobs.seq_hash = keys.seq_hash''',
+                    [value for key in batch for value in key],
+                )
+                values.update(((name, seq_hash), value) for name, seq_hash, value in rows)
+        return values
+
+    def state_of(self, name, sequence):
+        """查询单个任务的状态，未登记返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT state FROM jobs WHERE name = ? AND seq_hash = ?',
+                (name, sequence_hash(sequence)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, name, sequence, state, error=None, account=None, seed_settings=None):
+        """更新任务状态，任务未登记时自动登记；account 为提交该任务的账号（见 accounts），
+        给出时记录下来，之后下载时使用该账号的登录状态；seed_settings 为提交时的种子设置（见 result_cache）"""
+        if state not in STATES:
+            raise ValueError(f"未知的任务状态: {state}")
+        now = time.time()
+        submitted_at = now if state == SUBMITTED else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''INSERT INTO jobs (name, seq_hash, sequence, state, attempts, error,
+                                   created_at, updated_at, submitted_at, account, seed_settings)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (name, seq_hash) DO UPDATE SET
+                       state = excluded.state,
+                       attempts = jobs.attempts + excluded.attempts,
+                       error = excluded.error,
+                       updated_at = excluded.updated_at,
+                       submitted_at = COALESCE(excluded.submitted_at, jobs.submitted_at),
+                       account = COALESCE(excluded.account, jobs.account),
+                       seed_settings = COALESCE(excluded.seed_settings, jobs.seed_settings)''',
+                (name, sequence_hash(sequence), compact_sequence(sequence), state,
+                 1 if state == FAILED else 0, error, now, now, submitted_at, account, seed_settings),
+            )
+
+    def remaining(self, sequences):
+        """过滤出还需要提交的序列，保持原有顺序；只查询这些序列，不读出整个台账"""
+        states = self.states_of(sequences)
+        return [
+            (name, sequence) for name, sequence in sequences
+            if states.get((name, sequence_hash(sequence))) not in SUBMITTED_STATES
+        ]
+
+    # 取出任务的完整序列：文库中的任务由母本序列与差异还原
+    _SELECT_SEQUENCES = (
+        'SELECT jobs.name, jobs.sequence, parents.sequence, jobs.diff FROM jobs '
+        'LEFT JOIN parents ON parents.seq_hash = jobs.parent_hash '
+    )
+
+    @staticmethod
+    def _with_sequences(rows):
+        return [
+            (name, sequence if sequence is not None else apply_diff(parent, decode_diff(diff)))
+            for name, sequence, parent, diff in rows
+        ]
+
+    def queued(self, limit=None):
+        """按优先级（高优先）和登记顺序取出待提交的任务 (名称, 序列)，包括之前失败的任务"""
+        sql = (
+            self._SELECT_SEQUENCES +
+            'WHERE jobs.state IN (?, ?) AND (jobs.sequence IS NOT NULL OR jobs.diff IS NOT NULL) '
+            'ORDER BY jobs.priority DESC, jobs.rowid'
+        )
+        params = [PENDING, FAILED]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return self._with_sequences(self._conn.execute(sql, params))
+
+    def downloaded(self):
+        """已下载的任务 (名称, 序列)"""
+        with self._lock:
+            return self._with_sequences(self._conn.execute(
+                self._SELECT_SEQUENCES +
+                'WHERE jobs.state = ? AND (jobs.sequence IS NOT NULL OR jobs.diff IS NOT NULL)',
+                (DOWNLOADED,),
+            ))
+
+    def count_queued(self):
+        """待提交的任务数量"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE state IN (?, ?) '
+                'AND (sequence IS NOT NULL OR diff IS NOT NULL)',
+                (PENDING, FAILED),
+            ).fetchone()[0]
+
+    def count_submitted_since(self, timestamp, account=None):
+        """某时刻之后提交的任务数量，给出 account 时只统计该账号"""
+        sql = 'SELECT COUNT(*) FROM jobs WHERE submitted_at >= ?'
+        params = [timestamp]
+        if account is not None:
+            sql += ' AND account = ?'
+            params.append(account)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def count_active(self, account):
+        """某账号已提交、尚未完成的任务数量"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE account = ? AND state IN (?, ?)',
+                (account, SUBMITTED, RUNNING),
+            ).fetchone()[0]
+
+    def accounts(self):
+        """记录了提交账号的任务：{任务名称: 账号}"""
+        with self._lock:
+            return dict(self._conn.execute('SELECT name, account FROM jobs WHERE account IS NOT NULL'))
+
+    def count_by_state(self):
+        """各状态的任务数量"""
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
@@ -1,8 +1,33 @@
 from playwright.sync_api import sync_playwright
-import time
+import argparse
 import os
+import time
+import datetime
 import tempfile
 import shutil
+from waits import resolve_timeouts
+from sequence_entry import INPUT_STRATEGIES
+from submission import (
+    launch_browser,
+    restore_session,
+    open_page,
+    open_alphafold,
+    login,
+    prepare_form,
+    print_results,
+)
+from submit_pool import find_free_port, run_pool
+from ledger import DEFAULT_LEDGER_PATH, DOWNLOADED, JobLedger
+from scheduler import DEFAULT_DAILY_QUOTA, QuotaScheduler, read_priorities
+from session import DEFAULT_SESSION_PATH, discard_session, load_session, save_session
+from browser_daemon import daemon_endpoint
+from result_cache import DEFAULT_RESULT_CACHE_DIR, ResultCache
+from selector_registry import save_registry
+from preflight import read_jobs
+from mutants import read_library, iter_variants, chunked
+from accounts import AccountShards, load_accounts
+from recovery import MAX_ATTEMPTS, RetryQueue, process_queue, collect_results
+import profiling
 
 def get_chrome_user_data_dir():
     """获取 Chrome 用户数据目录"""
@@ -29,392 +54,303 @@ def create_temp_profile(original_profile):
     
     return temp_dir
 
-def read_sequences(file_path):
-    """读取序列文件"""
-    # 读取序列文件
-    with open(file_path, 'r') as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]  # 去除空行
-    
-    print(f"读取到 {len(lines)} 行非空数据")
+def submit_sequences(timeouts=None, input_strategy='fill', concurrency=1,
+                     ledger_path=DEFAULT_LEDGER_PATH, daily_quota=DEFAULT_DAILY_QUOTA,
+                     priorities_path=None, keep_running=False, session_path=DEFAULT_SESSION_PATH,
+                     use_daemon=True, result_cache_dir=DEFAULT_RESULT_CACHE_DIR,
+                     timings=False, trace_slow=None, lean=False, max_attempts=MAX_ATTEMPTS,
+                     library_path=None, accounts_dir=None):
+    """提交序列；timeouts 可覆盖 waits.DEFAULT_TIMEOUTS 中的等待上限（毫秒），
+    input_strategy 为序列输入方式（见 sequence_entry.INPUT_STRATEGIES），
+    concurrency 为同时提交的标签页数量，ledger_path 为任务台账路径。
+
+    每次只提交不超过当日剩余配额（daily_quota，None 表示不限制）的一批任务，
+    按优先级文件 priorities_path 中的优先级排序，其余任务留在台账中；
+    keep_running 为 True 时等待下一个配额窗口继续提交，直到队列清空。
+    session_path 为登录状态缓存，有效时直接复用，不再需要手动登录；
+    use_daemon 为 True 且 browser_daemon.py 正在运行时连接常驻浏览器，不再启动新的浏览器。
+    result_cache_dir 为结果缓存目录，之前预测过的序列直接从缓存复制结果，不再提交；None 表示不使用缓存。
+    timings 为 True 时记录每个步骤的耗时，运行结束后写出 JSON 记录并打印 p50/p95 汇总表；
+    trace_slow 为秒数时，为耗时超过该值或失败的任务保存 Playwright trace（仅单标签页提交）；
+    lean 为 True 时使用无头精简模式（见 submission.launch_browser），需要有效的登录状态缓存；
+    max_attempts 为每个任务最多尝试的次数，失败后先重置页面，按指数退避稍后重试（见 recovery）；
+    library_path 为突变体文库文件（见 mutants），给出时代替 JUNCE.txt，变体逐块展开登记到台账；
+    accounts_dir 为账号目录（见 accounts），给出时按各账号的剩余配额和负载分配任务，
+    每个账号在独立的浏览器中并行提交，daily_quota 为每个账号的配额，不使用常驻浏览器。"""
+    timeouts = resolve_timeouts(timeouts)
+    if timings:
+        profiling.start_profiling()
+    try:
+        return _submit_sequences(timeouts, input_strategy, concurrency, ledger_path, daily_quota,
+                                 priorities_path, keep_running, session_path, use_daemon,
+                                 result_cache_dir, trace_slow, lean, max_attempts, library_path,
+                                 accounts_dir)
+    finally:
+        profiling.stop_profiling()
+        save_registry()
+
+
+def _submit_sequences(timeouts, input_strategy, concurrency, ledger_path, daily_quota,
+                      priorities_path, keep_running, session_path, use_daemon,
+                      result_cache_dir, trace_slow, lean, max_attempts, library_path, accounts_dir):
+    priorities = read_priorities(priorities_path) if priorities_path else None
+    if accounts_dir:
+        accounts = load_accounts(accounts_dir)
+        if not accounts:
+            print("错误：没有可用的账号")
+            return False
+        print(f"使用 {len(accounts)} 个账号提交: {', '.join(account.name for account in accounts)}")
     
-    # 解析序列和名称
-    sequences = []
-    i = 0
-    while i < len(lines):
-        name = lines[i]
-        if i + 1 < len(lines):
-            sequence = lines[i + 1]
-            print(f"\n发现序列 {len(sequences) + 1}:")
-            print(f"名称: {name}")
-            print(f"序列: {sequence[:20]}...")  # 只打印前20个字符
-            sequences.append((name, sequence))
-            i += 2
+    with JobLedger(ledger_path) as ledger:
+        scheduler = QuotaScheduler(ledger, daily_quota)
+        cache = ResultCache(result_cache_dir) if result_cache_dir else None
+        if cache:
+            # 先把已下载的结果存入缓存，之后相同的序列也能命中；每次运行只做一次
+            os.makedirs('downloads', exist_ok=True)
+            cache.ingest(dict(ledger.downloaded()), 'downloads', ledger)
+        if library_path:
+            # 文库逐块展开后登记到台账，内存中只保留一块变体的完整序列，台账中只保存母本与差异
+            families = read_library(library_path)
+            print(f"文库中共有 {sum(map(len, families))} 个变体")
+            for chunk in chunked(iter_variants(families)):
+                _enqueue([(name, sequence) for name, sequence, _ in chunk], ledger, scheduler, cache,
+                         priorities, {name: origin for name, _, origin in chunk})
         else:
-            print(f"\n警告：第 {i+1} 行没有对应的序列")
-            break
-    
-    print(f"\n从文件中读取到 {len(sequences)} 个序列")
-    return sequences
+            # 读取序列文件
+            sequences, _ = read_jobs('JUNCE.txt')
+            _enqueue(sequences, ledger, scheduler, cache, priorities)
+        shards = AccountShards(accounts, ledger, daily_quota) if accounts_dir else None
+        # 当前配额窗口内已经尝试过的任务：失败后回到队列，本窗口内不再立即重试
+        attempted = set()
+        
+        while True:
+            if shards:
+                if not _submit_sharded(shards, timeouts, input_strategy, concurrency, ledger,
+                                       trace_slow, lean, max_attempts):
+                    return False
+            else:
+                batch = scheduler.next_batch(exclude=attempted)
+                if batch:
+                    attempted.update(name for name, _ in batch)
+                    print(f"本次提交 {len(batch)} 个任务")
+                    endpoint = daemon_endpoint() if use_daemon else None
+                    if not _submit_remaining(batch, timeouts, input_strategy, concurrency, ledger,
+                                             session_path, wait_before_close=not keep_running,
+                                             endpoint=endpoint, trace_slow=trace_slow, lean=lean,
+                                             max_attempts=max_attempts):
+                        return False
+                elif not ledger.count_queued():
+                    print("没有需要提交的序列")
+                elif scheduler.remaining_quota() == 0:
+                    print("当前配额窗口的配额已用完")
+                else:
+                    print("队列中的任务本配额窗口内都已尝试过，等到下一个窗口再重试")
+                scheduler.report()
+            
+            if not keep_running or not ledger.count_queued():
+                return True
+            if not shards and batch and scheduler.remaining_quota() != 0:
+                # 本批有任务失败、没有用掉配额，立即提交队列中尚未尝试的任务，不必等到下一个窗口
+                print("配额仍有剩余，继续提交队列中的其他任务")
+                continue
+            # 等到下一个配额窗口再继续
+            seconds = (scheduler.next_window() - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            print(f"等待 {seconds / 3600:.1f} 小时后继续提交...")
+            time.sleep(max(0, seconds) + 60)
+            attempted.clear()
 
-def submit_sequences():
-    # 读取序列文件
-    sequences = read_sequences('JUNCE.txt')
-    
-    print(f"从文件中读取到 {len(sequences)} 个序列")
-    
-    # 获取 Chrome 用户数据目录
-    original_profile = get_chrome_user_data_dir()
-    if not os.path.exists(original_profile):
-        print("错误：找不到 Chrome 用户数据目录")
-        return False
-    
-    # 创建临时配置文件
-    temp_dir = create_temp_profile(original_profile)
+def _submit_sharded(shards, timeouts, input_strategy, concurrency, ledger, trace_slow, lean,
+                    max_attempts):
+    """按账号分配本配额窗口的任务，各账号在独立的浏览器中并行提交"""
+    def submit_account(account, batch):
+        return _submit_remaining(batch, timeouts, input_strategy, concurrency, ledger,
+                                 account.session_path, wait_before_close=False,
+                                 trace_slow=trace_slow, lean=lean,
+                                 max_attempts=max_attempts, account=account.name)
+
+    submitted, ok = shards.run(submit_account)
+    if not submitted:
+        print("所有账号当前配额窗口的配额已用完" if ledger.count_queued() else "没有需要提交的序列")
+    shards.report()
+    return ok
+
+def _enqueue(sequences, ledger, scheduler, cache, priorities, origins=None):
+    """根据台账跳过已经提交过的序列，缓存命中的直接使用缓存结果，其余加入待提交队列；
+    origins 见 JobLedger.register"""
+    remaining = ledger.remaining(sequences)
+    skipped = len(sequences) - len(remaining)
+    if skipped:
+        print(f"台账中已有 {skipped} 个序列提交过，本次跳过")
+    if cache:
+        sequences = _use_cached_results(remaining, cache, ledger)
+    scheduler.enqueue(sequences, priorities, origins)
+
+def _use_cached_results(sequences, cache, ledger, downloads_dir='downloads'):
+    """缓存中已有结果的序列直接复制到下载目录并记为已下载，返回仍需提交的序列"""
+    os.makedirs(downloads_dir, exist_ok=True)
+    remaining = []
+    hits = 0
+    for name, sequence in sequences:
+        if cache.materialize(sequence, os.path.join(downloads_dir, f"{name}.zip")):
+            ledger.set_state(name, sequence, DOWNLOADED)
+            hits += 1
+        else:
+            remaining.append((name, sequence))
+    if hits:
+        print(f"结果缓存命中 {hits} 个序列，已直接复制到 {downloads_dir}，不再提交")
+    return remaining
+
+def _submit_remaining(sequences, timeouts, input_strategy, concurrency, ledger,
+                      session_path=DEFAULT_SESSION_PATH, wait_before_close=True, endpoint=None,
+                      trace_slow=None, lean=False, max_attempts=MAX_ATTEMPTS, account=None):
+    """提交尚未完成的序列，每个任务的最终结果即时写入台账；
+    endpoint 为常驻浏览器的 CDP 地址，给出时直接连接，不再启动新的浏览器；
+    account 为 session_path 对应的账号名称，与结果一起记入台账；
+    trace_slow、lean 与 max_attempts 见 submit_sequences"""
+    temp_dir = None
+    session_state = None
+    if endpoint:
+        print(f"连接常驻浏览器: {endpoint}")
+    else:
+        session_state = load_session(session_path)
+        if session_state:
+            # 有可用的登录状态缓存时不需要复制 Chrome 配置
+            print("使用缓存的登录状态")
+            temp_dir = tempfile.mkdtemp(prefix="chrome_temp_")
+        elif account:
+            # 不能回退到本机 Chrome 配置，否则会用错账号提交
+            print(f"错误：账号 {account} 的登录状态无效，请运行 python accounts.py add {account} 重新登录")
+            return False
+        elif lean:
+            # 无头浏览器中无法手动登录
+            print("错误：精简模式需要有效的登录状态缓存，请先以普通模式运行一次完成登录")
+            return False
+        else:
+            # 获取 Chrome 用户数据目录
+            original_profile = get_chrome_user_data_dir()
+            if not os.path.exists(original_profile):
+                print("错误：找不到 Chrome 用户数据目录")
+                return False
+            
+            # 创建临时配置文件
+            temp_dir = create_temp_profile(original_profile)
     
     try:
         with sync_playwright() as p:
             try:
-                # 启动 Chrome 浏览器
-                print("启动 Chrome 浏览器...")
-                browser = p.chromium.launch_persistent_context(
-                    user_data_dir=temp_dir,
-                    executable_path=r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                    headless=False,
-                    ignore_default_args=["--enable-automation"],
-                    args=[
-                        '--start-maximized',
-                        '--no-first-run',
-                        '--no-default-browser-check',
-                        '--disable-blink-features=AutomationControlled'
-                    ]
-                )
-                
-                page = browser.new_page()
-                
-                # 修改 navigator.webdriver
-                page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    });
-                """)
-                
-                # 访问网站
-                print("正在访问 AlphaFold Server...")
-                page.goto("https://alphafoldserver.com/", timeout=60000)
-                time.sleep(2)
-                
-                # 等待并点击登录按钮
-                print("等待登录...")
-                login_button = page.locator('span:has-text("Continue with Google")')
-                if login_button.is_visible():
-                    login_button.click()
-                    print("\n请在浏览器中完成 Google 登录。")
-                    print("完成后请按回车键继续...")
-                    input()
-                    time.sleep(3)  # 给页面更多加载时间
-                
-                # 等待页面加载完成
-                print("等待页面加载完成...")
-                time.sleep(2)
+                if endpoint:
+                    # 常驻浏览器已经登录，只需打开一个新的标签页
+                    browser = p.chromium.connect_over_cdp(endpoint)
+                    context = browser.contexts[0]
+                    pool_endpoint = endpoint
+                else:
+                    # 多标签页模式下开放 CDP 端口，工作线程通过它共用同一个登录上下文
+                    debug_port = find_free_port() if concurrency > 1 else None
+                    browser = context = launch_browser(p, temp_dir, debug_port, lean)
+                    if session_state:
+                        restore_session(context, session_state)
+                    pool_endpoint = f"http://127.0.0.1:{debug_port}" if debug_port else None
+                page = open_page(context, lean)
                 
-                # 先点击 Clear 按钮清除可能存在的序列
-                print("尝试清除现有序列...")
-                try:
-                    clear_button = page.locator('button:has-text("Clear")')
-                    if clear_button.is_visible(timeout=5000):
-                        clear_button.click()
-                        print("已点击 Clear 按钮")
-                        time.sleep(1)
-                except Exception as e:
-                    print(f"点击 Clear 按钮时出错: {e}")
-                    # 尝试使用JavaScript点击
-                    try:
-                        page.evaluate('''() => {
-                            const buttons = Array.from(document.querySelectorAll('button'));
-                            const clearButton = buttons.find(button => 
-                                button.querySelector('.mdc-button__label')?.textContent.trim() === 'Clear'
-                            );
-                            if (clearButton) clearButton.click();
-                        }''')
-                        print("已通过JavaScript点击 Clear 按钮")
-                        time.sleep(1)
-                    except Exception as e:
-                        print(f"JavaScript点击也失败: {e}")
-                
-                # 检查 Add entity 按钮
-                print("检查 Add entity 按钮...")
-                add_button = page.locator('button:has-text("Add entity")')
-                try:
-                    add_button.wait_for(state='visible', timeout=5000)
-                except Exception as e:
-                    print(f"错误：无法找到 Add entity 按钮 - {e}")
+                # 访问网站并登录，登录成功后刷新登录状态缓存
+                open_alphafold(page, timeouts)
+                if not login(page, timeouts):
+                    print("错误：未能登录 AlphaFold Server")
+                    if session_state:
+                        discard_session(session_path)
                     return False
+                save_session(context.storage_state(), session_path)
                 
-                print("找到 Add entity 按钮！")
-                
-                # 提交每个序列
-                for name, sequence in sequences:
-                    print(f"\n开始提交序列: {name}")
+                if concurrency > 1:
+                    if trace_slow is not None:
+                        print("警告：多标签页提交时不支持保存 Playwright trace，已忽略 --trace-slow")
+                    results = run_pool(pool_endpoint, sequences, concurrency, timeouts,
+                                       input_strategy, ledger, max_attempts=max_attempts,
+                                       account=account, lean=lean)
+                    recovered = True
+                else:
+                    baseline_inputs = prepare_form(page, timeouts)
+                    if baseline_inputs is None:
+                        return False
                     
+                    # 提交每个序列，失败的任务重置页面后稍后重试
+                    tracer = profiling.JobTracer(context, trace_slow) if trace_slow is not None else None
+                    tasks = RetryQueue(sequences, max_attempts)
                     try:
-                        # 点击 Add entity 按钮
-                        add_button = page.locator('button:has-text("Add entity")')
-                        if not add_button.is_visible(timeout=5000):
-                            print(f"错误：无法找到 Add entity 按钮")
-                            continue
-                        
-                        add_button.click()
-                        time.sleep(1)
-                        
-                        # 等待新的序列输入框出现并定位到最后一个
-                        sequence_input = page.locator('textarea.sequence-input').last
-                        if not sequence_input.is_visible(timeout=5000):
-                            print(f"错误：无法找到序列输入框 - {name}")
-                            continue
-                        
-                        save_button = page.locator('button:has-text("Save job")')
-                        print("检查 Save job 按钮状态...")
-                        
-                        def is_button_enabled():
-                            # 检查按钮是否有 disabled 属性
-                            return not save_button.get_attribute('disabled')
-                        
-                        def input_sequence(retry=False):
-                            nonlocal save_button  # 使用外部的 save_button 变量
-                            
-                            if retry:
-                                print("重试：清除并重新输入序列...")
-                                # 点击 Clear 按钮
-                                clear_button = page.locator('button:has-text("Clear")')
-                                if clear_button.is_visible():
-                                    clear_button.click()
-                                    time.sleep(1)
-                            
-                            # 先输入前4个字符，模拟手动输入
-                            print("输入前4个字符...")
-                            sequence_input.click()  # 确保焦点在正确的输入框上
-                            
-                            # 一个一个字符输入，模拟真实输入速度
-                            for i in range(4):
-                                sequence_input.type(sequence[i], delay=200)  # 每个字符输入延迟200ms
-                                print(f"已输入: {sequence[i]}")
-                                time.sleep(0.3)  # 字符之间额外等待0.3秒
-                            
-                            time.sleep(1)  # 等待序列验证
-                            
-                            # 检查 Save job 按钮状态
-                            if not is_button_enabled():
-                                if not retry:  # 如果是第一次尝试，就重试一次
-                                    return input_sequence(retry=True)
-                                return False
-                            
-                            # 输入剩余序列，也模拟手动输入
-                            print("输入剩余序列...")
-                            sequence_input.click()  # 再次确保焦点
-                            remaining_sequence = sequence[4:]
-                            
-                            # 分批输入剩余序列，每批10个字符
-                            chunk_size = 10
-                            for i in range(0, len(remaining_sequence), chunk_size):
-                                chunk = remaining_sequence[i:i+chunk_size]
-                                # sequence_input.type(chunk, delay=100)  # 每个字符延迟100ms
-                                sequence_input.type(chunk)# 每个字符延迟100ms
-                                # time.sleep(0.2)  # 每个块之间等待0.2秒
-                            
-                            time.sleep(1)  # 等待序列验证
-                            return True
-                        
-                        # 输入序列
-                        print(f"正在输入序列...")
-                        
-                        # 等待新的序列输入框出现并定位到最后一个
-                        sequence_input = page.locator('textarea.sequence-input').last
-                        if not sequence_input.is_visible(timeout=5000):
-                            print(f"错误：无法找到序列输入框 - {name}")
-                            continue
-                        
-                        # 尝试输入序列
-                        if not input_sequence():
-                            print("错误：无法启用 Save job 按钮")
-                            continue
-                        
-                        print("Save job 按钮已可用")
-                        time.sleep(1)
-                        
-                        try:
-                            # 点击第一个 Save job 按钮
-                            # save_button.click(timeout=5000)
-                            # print("已点击第一个 Save job 按钮")
-
-                            continue_button = page.locator('span:has-text(" Continue and preview job ")')
-                            continue_button.click()
-                            
-                            # 等待对话框出现
-                            dialog = page.locator('gdm-af-preview-dialog')
-                            dialog.wait_for(state='visible', timeout=5000)
-                            print("对话框已出现")
-                            
-                            # 等待对话框中的输入框加载完成
-                            print("等待输入框加载...")
-                            try:
-                                # 先尝试简单的选择器
-                                job_name_input = dialog.locator('input[required]')
-                                job_name_input.wait_for(state='visible', timeout=10000)
-                                print("找到 Job name 输入框")
-                            except Exception as e:
-                                print(f"使用简单选择器失败: {e}")
-                                # 如果失败，尝试使用JavaScript定位
-                                print("尝试使用JavaScript定位输入框...")
-                                page.evaluate('''() => {
-                                    const inputs = Array.from(document.querySelectorAll('input'));
-                                    const jobInput = inputs.find(input => 
-                                        input.hasAttribute('required') && 
-                                        input.classList.contains('mat-mdc-input-element')
-                                    );
-                                    if (jobInput) {
-                                        jobInput.scrollIntoView();
-                                        jobInput.focus();
-                                    }
-                                }''')
-                                time.sleep(1)
-                                
-                                # 重新尝试定位已聚焦的输入框
-                                job_name_input = dialog.locator('input:focus')
-                                job_name_input.wait_for(state='visible', timeout=5000)
-                                print("通过JavaScript找到输入框")
-                            
-                            # 生成作业名称（使用序列名称）
-                            job_name = name
-                            print(f"使用作业名称: {job_name}")
-                            
-                            # 先清除输入框
-                            job_name_input.clear()
-                            time.sleep(0.5)
-                            
-                            # 输入作业名称，使用type模拟真实输入
-                            job_name_input.type(job_name, delay=100)
-                            print(f"已输入作业名称: {job_name}")
-                            time.sleep(1)
-                            
-                            # 点击 Seed 滑动开关
-                            seed_toggle = dialog.locator('button.mdc-switch[role="switch"]')
-                            seed_toggle.wait_for(state='visible', timeout=5000)
-                            print("找到 Seed 滑动开关")
-                            
-                            # 检查当前状态
-                            is_checked = seed_toggle.get_attribute('aria-checked') == 'true'
-                            if not is_checked:
-                                seed_toggle.click()
-                                print("已启用 Seed 开关")
-                                time.sleep(1)
-                            
-                            # # 等待输入框变为可用
-                            # seed_input = dialog.locator('input[type="number"].seed-input')
-                            # seed_input.wait_for(state='visible', timeout=5000)
-                            
-                            # # 输入种子值（如果需要的话）
-                            # if seed_input.is_enabled():
-                            #     seed_value = "1"  # 或者其他你想要的种子值
-                            #     seed_input.fill(seed_value)
-                            #     print(f"已输入种子值: {seed_value}")
-                            #     time.sleep(1)
-                            
-                            # 点击对话框中的 Save job 按钮
-                            # confirm_button = dialog.locator('button:has-text("Save job")')
-                            # confirm_button.wait_for(state='visible', timeout=5000)
-                            confirm_button = page.locator('span:has-text(" Confirm and submit job ")')
-                            print("找到确认按钮")
-                            
-                            # 尝试直接点击
-                            try:
-                                confirm_button.click()
-                                print("已点击确认按钮")
-                            except Exception as e:
-                                print(f"直接点击失败: {e}")
-                                # print("尝试使用JavaScript点击...")
-                                # # 使用JavaScript点击，通过文本内容定位按钮
-                                # page.evaluate('''() => {
-                                #     const buttons = Array.from(document.querySelectorAll('button'));
-                                #     const saveButton = buttons.find(button => 
-                                #         button.querySelector('.mdc-button__label')?.textContent.trim() === 'Save job'
-                                #     );
-                                #     if (saveButton) saveButton.click();
-                                # }''')
-                                # print("已通过JavaScript点击确认按钮")
-                        
-                        except Exception as e:
-                            print(f"保存作业过程中出错: {e}")
-                            continue
-                        
-                        time.sleep(6)
-                        
-                        # 等待对话框消失
-                        dialog.wait_for(state='hidden', timeout=5000)
-                        print("对话框已消失")
-                        
-                        print(f"序列 {name} 已保存")
-                        
-                        # 等待2秒
-                        print("等待2秒...")
-                        time.sleep(6)
-                        
-                        # 点击 Clear 按钮
-                        print("点击 Clear 按钮...")
-                        try:
-                            clear_button = page.locator('button:has-text("Clear")')
-                            clear_button.wait_for(state='visible', timeout=5000)
-                            clear_button.click()
-                            print("已点击 Clear 按钮")
-                            
-                            # 等待序列输入框清空
-                            # time.sleep(1)
-                            # sequence_input = page.locator('textarea.sequence-input').last
-                            # if sequence_input.is_visible():
-                            #     text = sequence_input.input_value()
-                            #     if text:
-                            #         print("警告：序列输入框未清空，尝试重新点击")
-                            #         clear_button.click()
-                            #         time.sleep(1)
-                        except Exception as e:
-                            print(f"点击 Clear 按钮时出错: {e}")
-                            # 尝试使用JavaScript点击
-                            try:
-                                page.evaluate('''() => {
-                                    const buttons = Array.from(document.querySelectorAll('button'));
-                                    const clearButton = buttons.find(button => 
-                                        button.querySelector('.mdc-button__label')?.textContent.trim() === 'Clear'
-                                    );
-                                    if (clearButton) clearButton.click();
-                                }''')
-                                print("已通过JavaScript点击 Clear 按钮")
-                                time.sleep(1)
-                            except Exception as e:
-                                print(f"JavaScript点击也失败: {e}")
-                        
-                        # 再等待1秒确保清除完成
-                        time.sleep(3)
-                    
-                    except Exception as e:
-                        print(f"发生错误: {e}")
-                        continue
-                    
+                        recovered = process_queue(page, tasks, timeouts, baseline_inputs,
+                                                  input_strategy, ledger, tracer=tracer,
+                                                  account=account)
+                    finally:
+                        if tracer:
+                            tracer.close()
+                    results = collect_results(tasks)
+                
+                print_results(results)
+                if not recovered:
+                    print("\n错误：页面无法恢复，其余序列未提交，下次运行时继续")
+                    return False
                 print("\n所有序列已提交完成！")
-                print("按回车键关闭浏览器...")
-                input()
+                if endpoint:
+                    # 只关闭自己的标签页，常驻浏览器继续运行
+                    page.close()
+                elif wait_before_close:
+                    print("按回车键关闭浏览器...")
+                    input()
                 return True
                 
             except Exception as e:
                 print(f"发生错误: {e}")
                 return False
             finally:
+                # 通过 CDP 连接时 close 只断开连接，不会关闭常驻浏览器
                 if 'browser' in locals():
                     browser.close()
     finally:
         # 清理临时目录
-        try:
-            shutil.rmtree(temp_dir)
-        except:
-            pass
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 if __name__ == "__main__":
-    submit_sequences()
+    parser = argparse.ArgumentParser(description="根据 JUNCE.txt 自动提交 AlphaFold Server 任务")
+    parser.add_argument('--input-strategy', choices=INPUT_STRATEGIES, default='fill',
+                        help="序列输入方式，默认 fill；Save job 未启用时自动回退到 type")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="同时提交的标签页数量，默认 1")
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH,
+                        help=f"任务台账路径，默认 {DEFAULT_LEDGER_PATH}")
+    parser.add_argument('--daily-quota', type=int, default=DEFAULT_DAILY_QUOTA,
+                        help=f"每日可提交的任务数量，默认 {DEFAULT_DAILY_QUOTA}，0 表示不限制")
+    parser.add_argument('--priorities',
+                        help="优先级文件，每行 \"任务名称 优先级\"，数值越大越先提交")
+    parser.add_argument('--keep-running', action='store_true',
+                        help="配额用完后等待下一个配额窗口继续提交，直到全部提交完成")
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH,
+                        help=f"登录状态缓存路径，默认 {DEFAULT_SESSION_PATH}")
+    parser.add_argument('--no-daemon', action='store_true',
+                        help="即使常驻浏览器正在运行，也启动独立的浏览器")
+    parser.add_argument('--result-cache', default=DEFAULT_RESULT_CACHE_DIR,
+                        help=f"结果缓存目录，默认 {DEFAULT_RESULT_CACHE_DIR}")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="不使用结果缓存，已预测过的序列也重新提交")
+    parser.add_argument('--timings', action='store_true',
+                        help="记录每个步骤的耗时，结束后写出 timings/*.json 并打印 p50/p95 汇总表")
+    parser.add_argument('--trace-slow', type=float, metavar='SECONDS',
+                        help="为耗时超过 SECONDS 秒或失败的任务保存 Playwright trace 到 traces/")
+    parser.add_argument('--lean', action='store_true',
+                        help="精简模式：无头 Chromium，拦截非必要资源与第三方请求（需要登录状态缓存）")
+    parser.add_argument('--library',
+                        help="突变体文库文件（母本序列加突变描述，见 mutants.py），代替 JUNCE.txt")
+    parser.add_argument('--accounts', metavar='DIR',
+                        help="多账号模式：使用该目录中各账号的登录状态（见 accounts.py）并行提交，"
+                             "--daily-quota 为每个账号的配额")
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                        help=f"每个任务最多尝试的次数，失败后重置页面并按指数退避重试，默认 {MAX_ATTEMPTS}")
+    args = parser.parse_args()
+    submit_sequences(input_strategy=args.input_strategy, concurrency=max(1, args.concurrency),
+                     ledger_path=args.ledger, daily_quota=args.daily_quota or None,
+                     priorities_path=args.priorities, keep_running=args.keep_running,
+                     session_path=args.session, use_daemon=not args.no_daemon,
+                     result_cache_dir=None if args.no_result_cache else args.result_cache,
+                     timings=args.timings, trace_slow=args.trace_slow, lean=args.lean,
+                     max_attempts=max(1, args.max_attempts), library_path=args.library,
+                     accounts_dir=args.accounts)
@@ -0,0 +1,425 @@
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 本地模拟的 AlphaFold Server：只复现 main.py 与 download.py 依赖的页面结构，用于离线测量和回归测试
+DEFAULT_PORT = 8765
+# 每个请求在服务端额外等待的时间（秒），模拟网络与服务端延迟
+DEFAULT_LATENCY = 0.2
+# 任务提交后多久变为完成状态（秒）
+DEFAULT_JOB_DURATION = 5.0
+
+# 与真实网站一样在 JSON 前加防劫持前缀，job_feed 需要能够处理
+XSSI_PREFIX = ")]}'\n"
+
+PAGE_HTML = r'''<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>AlphaFold Server (mock)</title>
+<style>
+    body { font-family: sans-serif; margin: 24px; }
+    textarea.sequence-input { display: block; width: 600px; height: 48px; margin: 4px 0; }
+    gdm-af-preview-dialog { display: block; position: fixed; top: 80px; left: 80px; padding: 16px;
+                            background: #fff; border: 1px solid #888; z-index: 10; }
+    .mdc-evolution-chip { display: inline-block; padding: 4px 8px; margin: 4px; border: 1px solid #888;
+                          cursor: pointer; }
+    .mdc-evolution-chip--selected { background: #cde; }
+    .mat-mdc-menu-panel { position: fixed; top: 40px; right: 40px; padding: 8px; background: #fff;
+                          border: 1px solid #888; z-index: 20; }
+    table.mat-mdc-table td, table.mat-mdc-table th { padding: 2px 12px; text-align: left; }
+</style>
+</head>
+<body>
+<div id="form">
+    <div id="entities"></div>
+    <button id="add-entity" type="button"><span class="mdc-button__label">Add entity</span></button>
+    <button id="clear" type="button"><span class="mdc-button__label">Clear</span></button>
+    <button id="save-job" type="button" disabled><span class="mdc-button__label">Save job</span></button>
+    <button id="preview" type="button" disabled>
+        <span class="mdc-button__label"> Continue and preview job </span>
+    </button>
+</div>
+<div id="chips"></div>
+<table class="mat-mdc-table">
+    <thead><tr><th>Name</th><th>Status</th><th>Date</th><th></th></tr></thead>
+    <tbody id="rows"></tbody>
+</table>
+<div class="mat-mdc-paginator">
+    <button type="button" class="mat-mdc-paginator-navigation-first">&laquo;</button>
+    <button type="button" class="mat-mdc-paginator-navigation-previous">&lsaquo;</button>
+    <span id="range" class="mat-mdc-paginator-range-label"></span>
+    <button type="button" class="mat-mdc-paginator-navigation-next">&rsaquo;</button>
+</div>
+<div id="overlay"></div>
+<script>
+const PAGE_SIZE = 10;
+// 过滤按钮：选中时显示对应状态的任务，取消选中时隐藏
+const CHIPS = {
+    'Saved draft': ['Draft'],
+    'In progress': ['Running', 'Pending'],
+    'Examples': ['Example'],
+    'Failed': ['Failed'],
+};
+const hiddenStatuses = new Set();
+let jobs = [];
+let pageIndex = 0;
+
+const $ = (id) => document.getElementById(id);
+const escapeHtml = (text) => String(text).replace(/[&<>"]/g,
+    (c) => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+
+function validSequence(value) {
+    return /^[A-Za-z\s]+$/.test(value) && value.replace(/\s/g, '').length > 0;
+}
+
+function updateButtons() {
+    const inputs = Array.from(document.querySelectorAll('textarea.sequence-input'));
+    const ok = inputs.length > 0 && inputs.every((input) => validSequence(input.value));
+    $('save-job').disabled = !ok;
+    $('preview').disabled = !ok;
+}
+
+$('add-entity').addEventListener('click', () => {
+    const card = document.createElement('div');
+    card.className = 'entity';
+    card.innerHTML = `<textarea class="sequence-input"></textarea>
+        <label>Copies <input type="number" min="1" value="1"></label>`;
+    const input = card.querySelector('textarea');
+    input.addEventListener('input', updateButtons);
+    input.addEventListener('change', updateButtons);
+    $('entities').appendChild(card);
+    updateButtons();
+});
+
+$('clear').addEventListener('click', () => {
+    $('entities').innerHTML = '';
+    updateButtons();
+});
+
+$('preview').addEventListener('click', () => {
+    const dialog = document.createElement('gdm-af-preview-dialog');
+    dialog.innerHTML = `
+        <label>Job name <input required class="mat-mdc-input-element"></label>
+        <p>Seed <button type="button" class="mdc-switch" role="switch" aria-checked="false">auto</button></p>
+        <button type="button" class="confirm"><span class="mdc-button__label"> Confirm and submit job </span></button>`;
+    const seed = dialog.querySelector('button.mdc-switch');
+    seed.addEventListener('click', () => {
+        seed.setAttribute('aria-checked', seed.getAttribute('aria-checked') === 'true' ? 'false' : 'true');
+    });
+    dialog.querySelector('button.confirm').addEventListener('click', async () => {
+        // 每个实体按 Copies 重复，与多条链的任务一致
+        const sequences = Array.from(document.querySelectorAll('#entities .entity')).flatMap((card) => {
+            const sequence = card.querySelector('textarea').value.replace(/\s/g, '').toUpperCase();
+            const copies = Math.max(1, parseInt(card.querySelector('input[type="number"]').value, 10) || 1);
+            return Array(copies).fill(sequence);
+        });
+        await fetch('/api/jobs', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                name: dialog.querySelector('input[required]').value.trim(),
+                sequences,
+                seed: seed.getAttribute('aria-checked') === 'true',
+            }),
+        });
+        dialog.remove();
+        await loadJobs();
+    });
+    document.body.appendChild(dialog);
+});
+
+for (const [label, statuses] of Object.entries(CHIPS)) {
+    const chip = document.createElement('span');
+    chip.className = 'mdc-evolution-chip mdc-evolution-chip--selected';
+    chip.setAttribute('role', 'option');
+    chip.setAttribute('aria-selected', 'true');
+    chip.innerHTML = `<span class="mdc-evolution-chip__text-label">${label}</span>`;
+    chip.addEventListener('click', () => {
+        const selected = chip.getAttribute('aria-selected') !== 'true';
+        chip.setAttribute('aria-selected', String(selected));
+        chip.classList.toggle('mdc-evolution-chip--selected', selected);
+        for (const status of statuses) {
+            if (selected) hiddenStatuses.delete(status); else hiddenStatuses.add(status);
+        }
+        pageIndex = 0;
+        render();
+    });
+    $('chips').appendChild(chip);
+}
+
+function visibleJobs() {
+    return jobs.filter((job) => !hiddenStatuses.has(job.status));
+}
+
+function render() {
+    const visible = visibleJobs();
+    const pages = Math.max(1, Math.ceil(visible.length / PAGE_SIZE));
+    pageIndex = Math.min(pageIndex, pages - 1);
+    const shown = visible.slice(pageIndex * PAGE_SIZE, (pageIndex + 1) * PAGE_SIZE);
+    $('rows').innerHTML = shown.map((job) => `
+        <tr class="mat-mdc-row" data-id="${job.id}">
+            <td class="mat-mdc-cell mat-column-name">${escapeHtml(job.name)}</td>
+            <td class="mat-mdc-cell mat-column-status">${job.status}</td>
+            <td class="mat-mdc-cell mat-column-date">${job.created}</td>
+            <td class="mat-mdc-cell mat-column-actions">
+                <button type="button" class="mat-mdc-menu-trigger fold-actions" aria-label="More actions">&#8942;</button>
+            </td>
+        </tr>`).join('');
+    for (const button of document.querySelectorAll('button.fold-actions')) {
+        button.addEventListener('click', () => openMenu(button.closest('tr').dataset.id));
+    }
+    const first = document.querySelector('.mat-mdc-paginator-navigation-first');
+    const previous = document.querySelector('.mat-mdc-paginator-navigation-previous');
+    const next = document.querySelector('.mat-mdc-paginator-navigation-next');
+    first.disabled = previous.disabled = pageIndex === 0;
+    next.disabled = pageIndex >= pages - 1;
+    const start = pageIndex * PAGE_SIZE;
+    $('range').textContent = `${visible.length ? start + 1 : 0} – ${Math.min(start + PAGE_SIZE, visible.length)} of ${visible.length}`;
+}
+
+function openMenu(id) {
+    const job = jobs.find((item) => item.id === id);
+    if (!job) return;
+    // 与 Angular Material 一样，菜单渲染在表格之外的浮层中，同一时间只有一个
+    $('overlay').innerHTML = job.downloadUrl
+        ? `<div class="mat-mdc-menu-panel"><a class="mat-mdc-menu-item" download="${escapeHtml(job.name)}.zip"
+               href="${job.downloadUrl}">Download</a></div>`
+        : `<div class="mat-mdc-menu-panel"><span class="mat-mdc-menu-item">No results yet</span></div>`;
+    const anchor = $('overlay').querySelector('a');
+    if (anchor) anchor.addEventListener('click', () => setTimeout(() => { $('overlay').innerHTML = ''; }, 0));
+}
+
+document.addEventListener('keydown', (e) => {
+    if (e.key !== 'Escape') return;
+    $('overlay').innerHTML = '';
+    document.querySelector('gdm-af-preview-dialog')?.remove();
+});
+
+document.querySelector('.mat-mdc-paginator-navigation-first').addEventListener('click', () => { pageIndex = 0; render(); });
+document.querySelector('.mat-mdc-paginator-navigation-previous').addEventListener('click', () => { pageIndex -= 1; render(); });
+document.querySelector('.mat-mdc-paginator-navigation-next').addEventListener('click', () => { pageIndex += 1; render(); });
+
+async function loadJobs() {
+    const response = await fetch('/api/jobs');
+    const text = await response.text();
+    jobs = JSON.parse(text.slice(text.indexOf('\n') + 1)).jobs;
+    render();
+}
+
+loadJobs();
+</script>
+</body>
+</html>
+'''
+
+
+def _seeded_random(*parts):
+    digest = hashlib.sha256('\n'.join(parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def build_result_zip(name, sequence):
+    """生成与真实结果结构相同的压缩包：每个模型一个 CIF、一个 full_data 和一个 summary_confidences"""
+    slug = re.sub(r'[^a-z0-9_]+', '_', name.lower())
+    length = max(1, len(sequence))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"fold_{slug}_job_request.json", json.dumps([{'name': name, 'sequences': [sequence]}]))
+        for model in range(5):
+            rng = _seeded_random(sequence, str(model))
+            plddt = [round(rng.uniform(50, 95), 2) for _ in range(length)]
+            atoms = ['data_model', 'loop_', '_atom_site.group_PDB', '_atom_site.id',
+                     '_atom_site.label_atom_id', '_atom_site.label_comp_id',
+                     '_atom_site.label_seq_id', '_atom_site.B_iso_or_equiv']
+            for i, value in enumerate(plddt, 1):
+                atoms.append(f"ATOM {i} CA {sequence[i - 1] if i <= len(sequence) else 'X'} {i} {value}")
+            atoms.append('#')
+            archive.writestr(f"fold_{slug}_model_{model}.cif", '\n'.join(atoms) + '\n')
+            archive.writestr(f"fold_{slug}_full_data_{model}.json", json.dumps({
+                'atom_plddts': plddt,
+                'pae': [[round(abs(i - j) * 0.1 + rng.uniform(0, 2), 2) for j in range(length)]
+                        for i in range(length)],
+            }))
+            archive.writestr(f"fold_{slug}_summary_confidences_{model}.json", json.dumps({
+                'ptm': round(rng.uniform(0.5, 0.95), 2),
+                'iptm': None,
+                'ranking_score': round(rng.uniform(0.5, 0.95), 2),
+                'fraction_disordered': round(rng.uniform(0, 0.2), 2),
+                'has_clash': 0.0,
+            }))
+    return buffer.getvalue()
+
+
+class MockAlphaFoldServer:
+    """在后台线程中运行的模拟服务器，任务和结果只保存在内存中"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=DEFAULT_LATENCY, job_duration=DEFAULT_JOB_DURATION):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.job_duration = job_duration
+        self._jobs = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-alphafold', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def status_of(self, job, now=None):
+        now = now or time.time()
+        return 'Succeeded' if now - job['submitted_at'] >= self.job_duration else 'Running'
+
+    def submit(self, name, sequences, seed=False):
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'name': name,
+                'sequences': sequences,
+                'seed': seed,
+                'submitted_at': time.time(),
+            }
+        return job_id
+
+    def job_count(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def all_done(self):
+        now = time.time()
+        with self._lock:
+            return all(self.status_of(job, now) == 'Succeeded' for job in self._jobs.values())
+
+    def list_jobs(self, base_url):
+        now = time.time()
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job['submitted_at'], reverse=True)
+        records = []
+        for job in jobs:
+            status = self.status_of(job, now)
+            records.append({
+                'id': job['id'],
+                'name': job['name'],
+                'status': status,
+                'created': time.strftime('%Y-%m-%d %H:%M', time.localtime(job['submitted_at'])),
+                'downloadUrl': f"{base_url}results/{job['id']}.zip" if status == 'Succeeded' else None,
+            })
+        return records
+
+    def result(self, job_id):
+        """已完成任务的结果压缩包，任务不存在或未完成时返回 None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or self.status_of(job) != 'Succeeded':
+                return None
+            if job_id not in self._results:
+                self._results[job_id] = build_result_zip(job['name'], ''.join(job['sequences']))
+            return job['name'], self._results[job_id]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 与真实服务器一样保持连接，客户端可以复用
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, payload):
+                body = (XSSI_PREFIX + json.dumps(payload)).encode('utf-8')
+                self._send(200, body, 'application/json; charset=utf-8')
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                path = self.path.split('?', 1)[0]
+                if path == '/':
+                    self._send(200, PAGE_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+                elif path == '/api/jobs':
+                    base_url = f"http://{self.headers.get('Host', f'{server.host}:{server.port}')}/"
+                    self._send_json({'jobs': server.list_jobs(base_url)})
+                elif path.startswith('/results/') and path.endswith('.zip'):
+                    found = server.result(path[len('/results/'):-len('.zip')])
+                    if found is None:
+                        self._send(404, b'not found', 'text/plain')
+                        return
+                    name, body = found
+                    self._send(200, body, 'application/zip',
+                               {'Content-Disposition': f'attachment; filename="{name}.zip"'})
+                else:
+                    self._send(404, b'not found', 'text/plain')
+
+            def do_POST(self):
+                time.sleep(server.latency)
+                if self.path != '/api/jobs':
+                    self._send(404, b'not found', 'text/plain')
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    job_id = server.submit(payload['name'], payload['sequences'], payload.get('seed', False))
+                except (ValueError, KeyError) as e:
+                    self._send(400, str(e).encode('utf-8'), 'text/plain')
+                    return
+                self._send_json({'id': job_id})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动本地模拟的 AlphaFold Server")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"监听端口，默认 {DEFAULT_PORT}")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help=f"每个请求的服务端延迟（秒），默认 {DEFAULT_LATENCY}")
+    parser.add_argument('--job-duration', type=float, default=DEFAULT_JOB_DURATION,
+                        help=f"任务从提交到完成的时间（秒），默认 {DEFAULT_JOB_DURATION}")
+    args = parser.parse_args()
+    server = MockAlphaFoldServer(port=args.port, latency=args.latency, job_duration=args.job_duration).start()
+    print(f"模拟服务器已启动: {server.url}")
+    print(f"设置环境变量 ALPHAFOLD_URL={server.url} 后运行 main.py / download.py 即可连接，按 Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
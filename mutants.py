@@ -0,0 +1,176 @@
+import argparse
+import itertools
+import re
+from ledger import apply_diff
+from preflight import PROTEIN_ALPHABET, check_sequences
+
+# 文库文件示例：
+#
+#   # > 开头为母本名称，其后只含字母的行为母本序列（可分多行）
+#   >TadA9153
+#   MSEVEFSHEYWMRHALTLAKRA...
+#   # 其余每行是一组突变，空格分隔，按母本编号（从 1 开始）
+#   del59 A106W
+#   A106[WYF] D108N       # 方括号为可选残基，与同一行其他位置组合展开
+#   D108*                 # * 为饱和突变：除野生型以外的 19 种残基
+#
+# 变体名称为母本名称加上各突变，例如 TadA9153del59A106W；全部为野生型的组合不生成。
+MUTATION_PATTERN = re.compile(
+    r'^(?:del(?P<deleted>\d+)'
+    r'|(?P<wild>[A-Z])?(?P<position>\d+)(?P<target>[A-Z]|\[[A-Z]+\]|\*|del|-))$'
+)
+
+# 逐块登记文库时每块的变体数量
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _alternatives(token, parent, line_no):
+    """解析一个突变，返回 (位置, [(替换残基, 名称片段)])；删除的替换残基为空字符串"""
+    match = MUTATION_PATTERN.match(token)
+    if not match:
+        raise ValueError(f"第 {line_no} 行无法解析的突变: {token}")
+    position = int(match['deleted'] or match['position'])
+    if not 1 <= position <= len(parent):
+        raise ValueError(f"第 {line_no} 行突变 {token} 的位置超出母本长度 {len(parent)}")
+    wild = parent[position - 1]
+    if match['wild'] and match['wild'] != wild:
+        raise ValueError(f"第 {line_no} 行突变 {token} 与母本不符：第 {position} 位是 {wild}")
+    target = match['target']
+    if match['deleted'] or target in ('del', '-'):
+        return position, [('', f"del{position}")]
+
+    prefix = f"{match['wild'] or ''}{position}"
+    if target == '*':
+        residues = [residue for residue in PROTEIN_ALPHABET if residue != wild]
+    else:
+        residues = list(dict.fromkeys(target.strip('[]')))
+    invalid = [residue for residue in residues if residue not in PROTEIN_ALPHABET]
+    if invalid:
+        raise ValueError(f"第 {line_no} 行突变 {token} 含有非标准残基 {''.join(invalid)}")
+    # 与野生型相同的可选残基表示该位置不突变
+    return position, [(residue, '' if residue == wild else f"{prefix}{residue}") for residue in residues]
+
+
+class MutantFamily:
+    """一个母本及其突变组合；变体以相对母本的差异保存，需要时才生成完整序列"""
+
+    def __init__(self, parent_name, parent):
+        self.parent_name = parent_name
+        self.parent = parent
+        # 每一行突变：[(位置, [(替换残基, 名称片段)])]，按位置排序
+        self.lines = []
+
+    def add_line(self, tokens, line_no):
+        sites = sorted(_alternatives(token, self.parent, line_no) for token in tokens)
+        positions = [position for position, _ in sites]
+        if len(set(positions)) != len(positions):
+            raise ValueError(f"第 {line_no} 行同一位置出现了多个突变")
+        self.lines.append(sites)
+
+    def __len__(self):
+        """变体数量（不展开），不含全部为野生型的组合"""
+        total = 0
+        for sites in self.lines:
+            combinations = 1
+            all_wild = 1
+            for _, choices in sites:
+                combinations *= len(choices)
+                all_wild *= any(not label for _, label in choices)
+            total += combinations - all_wild
+        return total
+
+    def diffs(self):
+        """逐个生成 (名称, 差异)，差异为 ((位置, 替换残基), ...)，只包含真正突变的位置"""
+        for sites in self.lines:
+            positions = [position for position, _ in sites]
+            for combination in itertools.product(*(choices for _, choices in sites)):
+                name = ''.join(label for _, label in combination)
+                if not name:
+                    continue
+                diff = tuple((position, residue)
+                             for position, (residue, label) in zip(positions, combination) if label)
+                yield self.parent_name + name, diff
+
+    def __iter__(self):
+        """逐个生成 (名称, 序列)"""
+        for name, diff in self.diffs():
+            yield name, apply_diff(self.parent, diff)
+
+
+def read_library(file_path):
+    """读取文库文件，返回 [MutantFamily]；母本序列先经过预检（见 preflight）"""
+    families = []
+    family = None
+    sequence_lines = []
+
+    def close_parent():
+        if family is None or family.parent:
+            return
+        if not sequence_lines:
+            raise ValueError(f"母本 {family.parent_name} 没有序列")
+        family.parent = ''.join(sequence_lines).upper()
+        _, rejected = check_sequences([(family.parent_name, family.parent)])
+        if rejected:
+            _, _, _, reasons, detail = rejected[0]
+            raise ValueError(f"母本 {family.parent_name} 未通过预检: {', '.join(reasons)} {detail}")
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('>'):
+                close_parent()
+                family = MutantFamily(line[1:].strip(), '')
+                families.append(family)
+                sequence_lines = []
+            elif family is None:
+                raise ValueError(f"第 {line_no} 行之前没有母本（> 开头的行）")
+            elif line.isalpha() and not family.parent:
+                sequence_lines.append(line)
+            else:
+                close_parent()
+                family.add_line(line.split(), line_no)
+    close_parent()
+    return families
+
+
+def iter_library(families):
+    """依次生成文库中全部变体的 (名称, 序列)"""
+    for family in families:
+        yield from family
+
+
+def iter_variants(families):
+    """依次生成 (名称, 序列, (母本序列, 差异))；登记到台账时只保存母本与差异（见 ledger.register）"""
+    for family in families:
+        for name, diff in family.diffs():
+            yield name, apply_diff(family.parent, diff), (family.parent, diff)
+
+
+def chunked(pairs, size=DEFAULT_CHUNK_SIZE):
+    """把迭代器切成不超过 size 个元素的列表"""
+    iterator = iter(pairs)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由母本序列和突变描述生成突变体文库")
+    parser.add_argument('library', help="文库文件")
+    parser.add_argument('--output',
+                        help="把展开后的 名称/序列 逐行写入该文件（JUNCE.txt 格式），不指定时只统计数量")
+    args = parser.parse_args()
+    families = read_library(args.library)
+    for family in families:
+        print(f"{family.parent_name}: {len(family)} 个变体")
+    if args.output:
+        count = 0
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for name, sequence in iter_library(families):
+                f.write(f"{name}\n{sequence}\n")
+                count += 1
+        print(f"已写入 {count} 个变体到 {args.output}")
@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import os
+import time
+from playwright.async_api import async_playwright
+from waits import resolve_timeouts
+from sequence_entry import INPUT_STRATEGIES
+from ledger import (
+    DEFAULT_LEDGER_PATH,
+    PENDING,
+    SUBMITTED,
+    RUNNING,
+    DONE,
+    FAILED,
+    JobLedger,
+    sequence_hash,
+)
+from scheduler import DEFAULT_DAILY_QUOTA, QuotaScheduler, read_priorities
+from session import DEFAULT_SESSION_PATH
+from browser_daemon import daemon_endpoint
+from job_feed import JobFeed
+from submission import ALPHAFOLD_URL
+from result_cache import DEFAULT_RESULT_CACHE_DIR, ResultCache
+from selector_registry import save_registry
+from main import _enqueue, _submit_remaining
+from preflight import read_jobs
+from download import (
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+    JOB_SOURCES,
+    login,
+    filter_tasks,
+    get_task_names,
+    sync_statuses,
+    download_tasks,
+    fetch_links,
+)
+
+# 轮询任务状态的间隔（秒）：有状态变化或新提交时回到最短间隔，否则逐次拉长到最长间隔
+POLL_MIN_INTERVAL = 30
+POLL_MAX_INTERVAL = 600
+POLL_BACKOFF = 1.5
+
+# 仍需要关注的任务状态：已提交但结果尚未下载
+WATCHED_STATES = frozenset({SUBMITTED, RUNNING, DONE})
+
+# 已提交的任务最多等待的时间（小时）：网站上一直未完成或一直找不到的任务超时后在台账中记为失败，不再等待
+DEFAULT_JOB_TIMEOUT_HOURS = 24
+
+
+class Backoff:
+    """自适应轮询间隔"""
+
+    def __init__(self, minimum=POLL_MIN_INTERVAL, maximum=POLL_MAX_INTERVAL, factor=POLL_BACKOFF):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = minimum
+
+    def reset(self):
+        self.interval = self.minimum
+
+    def next(self, changed):
+        """本轮有变化时回到最短间隔，否则拉长间隔；返回本轮之后应等待的秒数"""
+        if changed:
+            self.reset()
+        else:
+            self.interval = min(self.maximum, self.interval * self.factor)
+        return self.interval
+
+
+def _outstanding(ledger, jobs, submitting):
+    """还没有结束的任务 {名称: 序列}；提交线程结束后，未提交的任务不再等待"""
+    states = ledger.states()
+    outstanding = {}
+    for name, sequence in jobs.items():
+        state = states.get((name, sequence_hash(sequence)))
+        if state in WATCHED_STATES or (submitting and state == PENDING):
+            outstanding[name] = sequence
+    return outstanding
+
+
+def _give_up_stale(ledger, submitted, first_seen, job_timeout, now=None):
+    """已提交超过 job_timeout 秒仍未下载的任务在台账中记为失败，返回这些任务的名称；
+    first_seen 记录每个任务第一次被轮询的时间，由调用方在各轮之间保留"""
+    now = time.monotonic() if now is None else now
+    expired = []
+    for name, sequence in submitted.items():
+        since = first_seen.setdefault(name, now)
+        if now - since >= job_timeout and ledger.state_of(name, sequence) in WATCHED_STATES:
+            ledger.set_state(name, sequence, FAILED, f"提交后 {job_timeout / 3600:g} 小时内未能下载结果")
+            expired.append(name)
+    if expired:
+        print(f"{len(expired)} 个任务超过 {job_timeout / 3600:g} 小时仍未完成，已在台账中记为失败: "
+              f"{', '.join(expired)}")
+    return expired
+
+
+def _submit_batch(scheduler, ledger, endpoint, timeouts, input_strategy, concurrency, session_path,
+                  sequences):
+    """在工作线程中提交本配额窗口内的一批任务，只提交 sequences 中的任务"""
+    batch = scheduler.next_batch(sequences=sequences)
+    if not batch:
+        print("没有需要提交的序列")
+        scheduler.report()
+        return True
+    print(f"本次提交 {len(batch)} 个任务")
+    ok = _submit_remaining(batch, timeouts, input_strategy, concurrency, ledger,
+                           session_path, wait_before_close=False, endpoint=endpoint)
+    scheduler.report()
+    return ok
+
+
+async def _poll(page, feed, watched, source):
+    """刷新任务列表并返回 {任务名称: 记录}"""
+    if source == 'network':
+        feed.reset()
+    await page.reload(wait_until='networkidle')
+    if source == 'network':
+        return dict(await feed.wait(watched))
+    await filter_tasks(page)
+    return await get_task_names(page)
+
+
+async def _download_done(page, index, done, downloads_dir, ledger, concurrency, aliases, source):
+    """下载已完成的任务：network 模式下带有结果地址的直接请求，其余通过界面下载"""
+    if source == 'network':
+        links = {name: index[name]['link'] for name in done if index.get(name, {}).get('link')}
+        if links:
+            done = await fetch_links(page, links, done, downloads_dir, ledger, concurrency, aliases)
+        if done:
+            # 界面下载需要表格，先按表格流程重新加载
+            await filter_tasks(page)
+    if done:
+        await download_tasks(page, done, downloads_dir, ledger, concurrency, aliases)
+
+
+async def _watch(endpoint, jobs, aliases, ledger, submitting, downloads_dir, concurrency, source,
+                 job_timeout):
+    """轮询任务状态，任务一完成就下载，直到提交结束且所有已提交的任务都有结果或已超时；
+    返回是否所有任务都有结果"""
+    backoff = Backoff()
+    first_seen = {}
+    gave_up = []
+    async with async_playwright() as p:
+        # 通过 CDP 连接常驻浏览器，close 时只断开连接
+        browser = await p.chromium.connect_over_cdp(endpoint)
+        page = await browser.contexts[0].new_page()
+        try:
+            feed = JobFeed()
+            feed.attach(page)
+            await page.goto(ALPHAFOLD_URL, wait_until='networkidle')
+            if not await login(page):
+                return False
+
+            known = ledger.states()
+            while True:
+                watched = _outstanding(ledger, jobs, not submitting.done())
+                if not watched:
+                    break
+                submitted = {name: seq for name, seq in watched.items()
+                             if ledger.state_of(name, seq) != PENDING}
+                if submitted:
+                    try:
+                        index = await _poll(page, feed, submitted, source)
+                        sync_statuses(index, submitted, ledger)
+                        done = {name: seq for name, seq in submitted.items()
+                                if ledger.state_of(name, seq) == DONE}
+                        if done:
+                            print(f"\n{len(done)} 个任务已完成，开始下载")
+                            await _download_done(page, index, done, downloads_dir,
+                                                 ledger, concurrency, aliases, source)
+                    except Exception as e:
+                        print(f"轮询任务状态时出错: {e}")
+                    gave_up += _give_up_stale(ledger, submitted, first_seen, job_timeout)
+
+                # 任务状态有变化（包括新提交）时缩短轮询间隔
+                states = ledger.states()
+                interval = backoff.next(states != known)
+                known = states
+                remaining = _outstanding(ledger, jobs, not submitting.done())
+                if not remaining:
+                    break
+                print(f"还有 {len(remaining)} 个任务未完成，{interval:.0f} 秒后再次检查")
+                # 提交线程结束时立即开始下一轮检查
+                await asyncio.wait({submitting}, timeout=interval)
+        finally:
+            await page.close()
+            await browser.close()
+    if gave_up:
+        print(f"\n{len(gave_up)} 个任务超时未完成，已记为失败，下次运行会重新提交: {', '.join(gave_up)}")
+    return not gave_up
+
+
+async def _run_pipeline(timeouts, input_strategy, concurrency, download_concurrency,
+                        ledger_path, daily_quota, priorities_path, session_path, source,
+                        result_cache_dir, job_timeout):
+    endpoint = daemon_endpoint()
+    if not endpoint:
+        print("错误：流水线需要常驻浏览器，请先运行 python browser_daemon.py")
+        return False
+    print(f"连接常驻浏览器: {endpoint}")
+
+    sequences, aliases = read_jobs('JUNCE.txt')
+    jobs = dict(sequences)
+    priorities = read_priorities(priorities_path) if priorities_path else None
+    downloads_dir = os.path.join(os.getcwd(), 'downloads')
+    os.makedirs(downloads_dir, exist_ok=True)
+    print(f"下载目录: {downloads_dir}")
+
+    started = time.monotonic()
+    with JobLedger(ledger_path) as ledger:
+        cache = ResultCache(result_cache_dir) if result_cache_dir else None
+        if cache:
+            # 先把已下载的结果存入缓存，之后相同的序列也能命中
+            cache.ingest(dict(ledger.downloaded()), downloads_dir, ledger)
+        scheduler = QuotaScheduler(ledger, daily_quota)
+        # 与 main.py 相同：跳过台账中已提交过的序列，缓存命中的直接使用缓存结果
+        _enqueue(sequences, ledger, scheduler, cache, priorities)
+
+        # 提交在工作线程中使用同步 API 进行，与状态轮询和下载同时进行；
+        # 只提交本次 JUNCE.txt 中的任务，台账中其他待提交的任务不会被提交后无人等待
+        submitting = asyncio.ensure_future(asyncio.to_thread(
+            _submit_batch, scheduler, ledger, endpoint, timeouts, input_strategy,
+            concurrency, session_path, sequences))
+        watched_ok = await _watch(endpoint, jobs, aliases, ledger, submitting,
+                                  downloads_dir, download_concurrency, source, job_timeout)
+        submitted = await submitting
+        if cache:
+            cache.ingest(jobs, downloads_dir, ledger)
+
+        counts = ledger.count_by_state()
+    print(f"\n流水线结束，用时 {(time.monotonic() - started) / 60:.1f} 分钟")
+    print("任务状态：" + "，".join(f"{state} {count}" for state, count in sorted(counts.items())))
+    return submitted and watched_ok
+
+
+def run_pipeline(timeouts=None, input_strategy='fill', concurrency=1,
+                 download_concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, ledger_path=DEFAULT_LEDGER_PATH,
+                 daily_quota=DEFAULT_DAILY_QUOTA, priorities_path=None,
+                 session_path=DEFAULT_SESSION_PATH, source='table',
+                 result_cache_dir=DEFAULT_RESULT_CACHE_DIR, job_timeout_hours=DEFAULT_JOB_TIMEOUT_HOURS):
+    """提交 JUNCE.txt 中的序列，同时轮询任务状态，任务一完成就下载结果
+
+    提交与下载共用常驻浏览器（browser_daemon.py）：提交在自己的标签页中进行，
+    轮询与下载在另一个标签页中进行；轮询间隔在 POLL_MIN_INTERVAL 到 POLL_MAX_INTERVAL 之间自适应。
+    source 为任务列表来源（见 download.JOB_SOURCES）；result_cache_dir 为结果缓存目录，
+    缓存中已有结果的序列不再提交，下载的结果也会存入缓存；
+    已提交超过 job_timeout_hours 小时仍没有结果的任务在台账中记为失败，不再等待。"""
+    if source not in JOB_SOURCES:
+        raise ValueError(f"未知的任务列表来源: {source}，可选: {', '.join(JOB_SOURCES)}")
+    timeouts = resolve_timeouts(timeouts)
+    try:
+        return asyncio.run(_run_pipeline(timeouts, input_strategy, concurrency, download_concurrency,
+                                         ledger_path, daily_quota, priorities_path, session_path, source,
+                                         result_cache_dir, job_timeout_hours * 3600))
+    finally:
+        save_registry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提交 JUNCE.txt 中的序列，并在任务完成后立即下载结果")
+    parser.add_argument('--input-strategy', choices=INPUT_STRATEGIES, default='fill',
+                        help="序列输入方式，默认 fill")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="同时提交的标签页数量，默认 1")
+    parser.add_argument('--download-concurrency', type=int, default=DEFAULT_DOWNLOAD_CONCURRENCY,
+                        help=f"同时进行中的下载数量上限，默认 {DEFAULT_DOWNLOAD_CONCURRENCY}")
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH,
+                        help=f"任务台账路径，默认 {DEFAULT_LEDGER_PATH}")
+    parser.add_argument('--daily-quota', type=int, default=DEFAULT_DAILY_QUOTA,
+                        help=f"每日可提交的任务数量，默认 {DEFAULT_DAILY_QUOTA}，0 表示不限制")
+    parser.add_argument('--priorities',
+                        help="优先级文件，每行 \"任务名称 优先级\"，数值越大越先提交")
+    parser.add_argument('--session', default=DEFAULT_SESSION_PATH,
+                        help=f"登录状态缓存路径，默认 {DEFAULT_SESSION_PATH}")
+    parser.add_argument('--source', choices=JOB_SOURCES, default='table',
+                        help="任务列表来源：table 解析页面表格（默认），network 解析前端接口返回的任务列表")
+    parser.add_argument('--result-cache', default=DEFAULT_RESULT_CACHE_DIR,
+                        help=f"结果缓存目录，默认 {DEFAULT_RESULT_CACHE_DIR}")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="不使用结果缓存")
+    parser.add_argument('--job-timeout', type=float, default=DEFAULT_JOB_TIMEOUT_HOURS,
+                        help=f"已提交的任务最多等待的小时数，超时记为失败，默认 {DEFAULT_JOB_TIMEOUT_HOURS}")
+    args = parser.parse_args()
+    run_pipeline(input_strategy=args.input_strategy, concurrency=max(1, args.concurrency),
+                 download_concurrency=max(1, args.download_concurrency), ledger_path=args.ledger,
+                 daily_quota=args.daily_quota or None, priorities_path=args.priorities,
+                 session_path=args.session, source=args.source,
+                 result_cache_dir=None if args.no_result_cache else args.result_cache,
+                 job_timeout_hours=args.job_timeout)
@@ -0,0 +1,227 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from ledger import canonical_sequence, dedupe_sequences
+from entities import ENTITY_SEPARATOR, COPIES_SEPARATOR, parse_entities, count_tokens
+
+# AlphaFold Server 接受的蛋白质残基（20 种标准氨基酸）
+PROTEIN_ALPHABET = 'ACDEFGHIKLMNPQRSTVWY'
+
+# 单个任务的 token 上限；蛋白质每个残基计 1 个 token，多实体任务按拷贝数累加
+MAX_JOB_TOKENS = 5000
+
+# 任务名称的长度上限，以及不能出现在名称中的字符（结果按 <任务名称>.zip 保存）
+MAX_JOB_NAME_LENGTH = 100
+FORBIDDEN_NAME_CHARS = '\\/:*?"<>|'
+
+# 名称行本身是一条合法序列且长度不少于此值时，认为名称行与序列行颠倒
+MIN_SWAPPED_LENGTH = 20
+
+# 被拒绝的任务写入的报告
+DEFAULT_REPORT_PATH = 'preflight_rejected.csv'
+
+# 拒绝原因
+EMPTY_SEQUENCE = 'empty_sequence'
+INVALID_RESIDUES = 'invalid_residues'
+MALFORMED_ENTITIES = 'malformed_entities'
+TOO_MANY_TOKENS = 'too_many_tokens'
+SWAPPED_LINES = 'swapped_lines'
+EMPTY_NAME = 'empty_name'
+NAME_TOO_LONG = 'name_too_long'
+INVALID_NAME = 'invalid_name'
+DUPLICATE_NAME = 'duplicate_name'
+
+
+def _lookup_table(chars):
+    """256 项的布尔查找表，chars 中的字节为 True"""
+    table = np.zeros(256, dtype=bool)
+    table[np.frombuffer(chars.encode('ascii'), dtype=np.uint8)] = True
+    return table
+
+
+VALID_RESIDUE = _lookup_table(PROTEIN_ALPHABET)
+# 多实体写法使用的分隔符与拷贝数（见 entities），出现时逐个解析该任务
+ENTITY_SYNTAX_CHARS = ENTITY_SEPARATOR + COPIES_SEPARATOR + '0123456789'
+ENTITY_SYNTAX = _lookup_table(ENTITY_SYNTAX_CHARS)
+# 规范化序列时去掉的空白字符，以及把小写字母转为大写的映射表（与 ledger.canonical_sequence 一致）
+WHITESPACE = _lookup_table(' \t\n\r\x0b\x0c')
+TO_UPPER = np.arange(256, dtype=np.uint8)
+TO_UPPER[ord('a'):ord('z') + 1] -= 32
+# 控制字符与 FORBIDDEN_NAME_CHARS 不能出现在任务名称中
+INVALID_NAME_BYTE = _lookup_table(FORBIDDEN_NAME_CHARS + ''.join(map(chr, range(32))) + '\x7f')
+
+
+def _pack(strings):
+    """把字符串拼接为一个 uint8 数组，返回 (字节数组, 每个字符串的字节长度)"""
+    encoded = [s.encode('utf-8') for s in strings]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), lengths
+
+
+def _count_per_entry(mask, lengths):
+    """统计每个字符串对应区段中 mask 为 True 的字节数（允许空字符串）；
+    mask 稀疏时只需处理为 True 的位置"""
+    boundaries = np.concatenate(([0], np.cumsum(lengths)))
+    return np.diff(np.searchsorted(np.flatnonzero(mask), boundaries))
+
+
+def _invalid_residues(sequence, limit=5):
+    """列出序列中前几个非法字符，用于报告"""
+    found = []
+    for char in sequence:
+        if char not in PROTEIN_ALPHABET and char not in ENTITY_SYNTAX_CHARS and char not in found:
+            found.append(char)
+            if len(found) == limit:
+                break
+    return ''.join(found)
+
+
+def check_sequences(sequences, max_tokens=MAX_JOB_TOKENS, max_name_length=MAX_JOB_NAME_LENGTH):
+    """检查 [(名称, 序列)]，返回 (accepted, rejected)
+
+    accepted 为通过检查的 (名称, 序列)，保持原有顺序；rejected 为
+    [(序号, 名称, 序列, [原因], 说明)]。所有检查都在拼接后的字节数组上用查找表整批完成，
+    不逐个字符循环。
+    """
+    names = [name for name, _ in sequences]
+
+    # 直接在原始字节上规范化：空白不计入长度，小写字母按大写检查
+    raw, raw_lengths = _pack([sequence for _, sequence in sequences])
+    whitespace = WHITESPACE[raw]
+    syntax = ENTITY_SYNTAX[raw]
+    sequence_lengths = raw_lengths - _count_per_entry(whitespace, raw_lengths)
+    invalid_counts = _count_per_entry(~(VALID_RESIDUE[TO_UPPER[raw]] | whitespace | syntax), raw_lengths)
+
+    # 单链任务的 token 数就是残基数；少数多实体任务逐个解析
+    tokens = sequence_lengths.copy()
+    malformed = np.zeros(len(sequences), dtype=bool)
+    for index in np.flatnonzero(_count_per_entry(syntax, raw_lengths)):
+        try:
+            tokens[index] = count_tokens(parse_entities(sequences[index][1]))
+        except ValueError:
+            malformed[index] = True
+    name_bytes, name_lengths = _pack(names)
+    # 名称长度按字符计算；其余检查在 UTF-8 字节上进行
+    name_chars = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    bad_name_counts = _count_per_entry(INVALID_NAME_BYTE[name_bytes], name_lengths)
+    name_residue_counts = _count_per_entry(VALID_RESIDUE[name_bytes], name_lengths)
+
+    reasons = {
+        EMPTY_SEQUENCE: sequence_lengths == 0,
+        INVALID_RESIDUES: invalid_counts > 0,
+        MALFORMED_ENTITIES: malformed,
+        TOO_MANY_TOKENS: tokens > max_tokens,
+        EMPTY_NAME: name_lengths == 0,
+        NAME_TOO_LONG: name_chars > max_name_length,
+        INVALID_NAME: bad_name_counts > 0,
+    }
+    # 序列行不合法而名称行全部由残基字母组成：多半是少了一行导致名称与序列错位
+    reasons[SWAPPED_LINES] = ((reasons[INVALID_RESIDUES] | malformed)
+                              & (name_lengths >= MIN_SWAPPED_LENGTH)
+                              & (name_residue_counts == name_lengths))
+
+    # 同名但序列不同的任务只保留第一个，其余会与它的结果文件冲突
+    duplicate = np.zeros(len(sequences), dtype=bool)
+    if sequences:
+        _, first_index, inverse = np.unique(np.array(names, dtype=object),
+                                            return_index=True, return_inverse=True)
+        first = first_index[inverse]
+        for index in np.flatnonzero(first != np.arange(len(sequences))):
+            duplicate[index] = (canonical_sequence(sequences[index][1])
+                                != canonical_sequence(sequences[first[index]][1]))
+    reasons[DUPLICATE_NAME] = duplicate
+
+    rejected_mask = np.zeros(len(sequences), dtype=bool)
+    for mask in reasons.values():
+        rejected_mask |= mask
+
+    accepted = [sequences[index] for index in np.flatnonzero(~rejected_mask)]
+    rejected = []
+    for index in np.flatnonzero(rejected_mask):
+        name, sequence = sequences[index]
+        entry_reasons = [reason for reason, mask in reasons.items() if mask[index]]
+        details = []
+        if reasons[SWAPPED_LINES][index]:
+            details.append("名称行像是序列，名称与序列可能错位")
+        elif reasons[INVALID_RESIDUES][index]:
+            details.append(f"非法字符 {_invalid_residues(canonical_sequence(sequence))!r}")
+        elif malformed[index]:
+            details.append("多实体写法有误，应为 序列A:2*序列B 的形式")
+        if reasons[TOO_MANY_TOKENS][index]:
+            details.append(f"{tokens[index]} 个 token，超过上限 {max_tokens}")
+        if reasons[DUPLICATE_NAME][index]:
+            details.append(f"与第 {first[index] + 1} 个任务同名但序列不同")
+        rejected.append((int(index), name, sequence, entry_reasons, '；'.join(details)))
+    return accepted, rejected
+
+
+def write_report(rejected, report_path=DEFAULT_REPORT_PATH):
+    """把被拒绝的任务写入 CSV 报告"""
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['index', 'name', 'reasons', 'detail', 'sequence'])
+        for index, name, sequence, reasons, detail in rejected:
+            writer.writerow([index + 1, name, ';'.join(reasons), detail, sequence])
+
+
+def preflight(sequences, report_path=DEFAULT_REPORT_PATH, max_tokens=MAX_JOB_TOKENS):
+    """启动浏览器之前检查全部序列，返回通过检查的 (名称, 序列)；
+    有任务被拒绝时写出 report_path，全部通过时删除上一次留下的报告"""
+    started = time.perf_counter()
+    accepted, rejected = check_sequences(sequences, max_tokens)
+    elapsed = time.perf_counter() - started
+    print(f"预检 {len(sequences)} 个任务，用时 {elapsed * 1000:.0f} 毫秒：通过 {len(accepted)} 个，拒绝 {len(rejected)} 个")
+    if rejected:
+        for index, name, _, reasons, detail in rejected[:10]:
+            print(f"- 第 {index + 1} 个 {name}: {', '.join(reasons)} {detail}")
+        if len(rejected) > 10:
+            print(f"- …… 其余 {len(rejected) - 10} 个")
+        if report_path:
+            write_report(rejected, report_path)
+            print(f"被拒绝的任务已写入 {report_path}")
+    elif report_path and os.path.exists(report_path):
+        os.remove(report_path)
+    return accepted
+
+
+def read_pairs(file_path):
+    """读取 名称/序列 交替的序列文件，不打印逐条信息，适合大型文库"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if len(lines) % 2:
+        print(f"警告：第 {len(lines)} 行没有对应的序列")
+    return list(zip(lines[0::2], lines[1::2]))
+
+
+def read_jobs(file_path, validate=True, dedupe=True, report_path=DEFAULT_REPORT_PATH):
+    """读取序列文件，依次预检、按序列去重，返回 (任务列表 [(名称, 序列)], 别名 {保留的名称: [其他名称]})
+
+    main.py、download.py 与 pipeline.py 都通过这里读取 JUNCE.txt：去重在预检之后进行，
+    被拒绝的任务不会成为保留的名称，提交和下载对同一个文件总是选出相同的名称。
+    """
+    sequences = read_pairs(file_path)
+    print(f"从 {file_path} 读取到 {len(sequences)} 个序列")
+    if validate:
+        sequences = preflight(sequences, report_path)
+    aliases = {}
+    if dedupe:
+        sequences, aliases = dedupe_sequences(sequences)
+        for primary, names in aliases.items():
+            print(f"序列相同，合并为一个任务: {primary} <- {', '.join(names)}")
+        if aliases:
+            print(f"去重后剩余 {len(sequences)} 个不同的序列")
+    return sequences, aliases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在启动浏览器之前检查序列文件，写出被拒绝任务的报告")
+    parser.add_argument('sequences', nargs='?', default='JUNCE.txt',
+                        help="序列文件，默认 JUNCE.txt")
+    parser.add_argument('--report', default=DEFAULT_REPORT_PATH,
+                        help=f"被拒绝任务的报告路径，默认 {DEFAULT_REPORT_PATH}")
+    parser.add_argument('--max-tokens', type=int, default=MAX_JOB_TOKENS,
+                        help=f"单个任务的 token 上限，默认 {MAX_JOB_TOKENS}")
+    args = parser.parse_args()
+    preflight(read_pairs(args.sequences), args.report, args.max_tokens)
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_TIMINGS_DIR = 'timings'
+DEFAULT_TRACES_DIR = 'traces'
+
+# 当前运行的计时器；未开启计时时为 None，span 和 event 不做任何记录
+_active = None
+# 每个线程当前正在提交的任务名称，多标签页提交时各工作线程互不影响
+_local = threading.local()
+
+
+def _percentile(sorted_values, fraction):
+    """最近秩法求分位数"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Profiler:
+    """记录一次提交运行中每个步骤的耗时（span）以及重试、回退等事件（event）"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = []
+        self.events = []
+
+    def add_span(self, step, start, end, ok):
+        with self._lock:
+            self.spans.append({
+                'step': step,
+                'job': getattr(_local, 'job', None),
+                'thread': threading.current_thread().name,
+                'start': round(start - self._origin, 4),
+                'duration': round(end - start, 4),
+                'ok': ok,
+            })
+
+    def add_event(self, kind, detail):
+        with self._lock:
+            self.events.append({
+                'event': kind,
+                'job': getattr(_local, 'job', None),
+                'thread': threading.current_thread().name,
+                'time': round(time.perf_counter() - self._origin, 4),
+                **detail,
+            })
+
+    def summary(self):
+        """按步骤汇总：次数、失败次数、p50、p95、最大值与总耗时（秒），按总耗时从大到小"""
+        durations = {}
+        failures = {}
+        for span in self.spans:
+            durations.setdefault(span['step'], []).append(span['duration'])
+            failures[span['step']] = failures.get(span['step'], 0) + (not span['ok'])
+        rows = []
+        for step, values in durations.items():
+            values.sort()
+            rows.append({
+                'step': step,
+                'count': len(values),
+                'failed': failures[step],
+                'p50': _percentile(values, 0.5),
+                'p95': _percentile(values, 0.95),
+                'max': values[-1],
+                'total': round(sum(values), 4),
+            })
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def event_counts(self):
+        counts = {}
+        for event in self.events:
+            counts[event['event']] = counts.get(event['event'], 0) + 1
+        return counts
+
+    def write_trace(self, directory=DEFAULT_TIMINGS_DIR):
+        """把本次运行的全部 span 和 event 写成一个 JSON 文件，返回文件路径"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at)) + '.json')
+        with self._lock:
+            trace = {
+                'started_at': self.started_at,
+                'spans': list(self.spans),
+                'events': list(self.events),
+                'summary': self.summary(),
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False, indent=1)
+        return path
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n各步骤耗时（秒）：")
+        print(f"{'step':<18}{'count':>6}{'failed':>7}{'p50':>9}{'p95':>9}{'max':>9}{'total':>10}")
+        for row in rows:
+            print(f"{row['step']:<18}{row['count']:>6}{row['failed']:>7}{row['p50']:>9.2f}"
+                  f"{row['p95']:>9.2f}{row['max']:>9.2f}{row['total']:>10.2f}")
+        counts = self.event_counts()
+        if counts:
+            print("重试与回退：" + "，".join(f"{kind} {count} 次" for kind, count in sorted(counts.items())))
+
+
+def start_profiling():
+    """开启计时，返回本次运行的 Profiler"""
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def stop_profiling(directory=DEFAULT_TIMINGS_DIR):
+    """结束计时，写出 JSON 记录并打印汇总表，返回记录文件路径；未开启计时时返回 None"""
+    global _active
+    profiler, _active = _active, None
+    if profiler is None:
+        return None
+    path = profiler.write_trace(directory)
+    profiler.print_summary()
+    print(f"计时记录已写入: {path}")
+    return path
+
+
+@contextmanager
+def span(step):
+    """记录一个步骤的耗时；步骤中抛出的异常照常向外传递，并把该 span 记为失败"""
+    if _active is None:
+        yield
+        return
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        if _active is not None:
+            _active.add_span(step, start, time.perf_counter(), ok)
+
+
+def event(kind, **detail):
+    """记录一次重试、回退等事件"""
+    if _active is not None:
+        _active.add_event(kind, detail)
+
+
+@contextmanager
+def job(name):
+    """标记当前线程正在提交的任务，期间记录的 span 和 event 都归属该任务"""
+    _local.job = name
+    try:
+        with span('job'):
+            yield
+    finally:
+        _local.job = None
+
+
+class JobTracer:
+    """只为耗时过长或失败的任务保存 Playwright trace
+
+    整个运行期间开启一次 tracing，每个任务单独一个 chunk；任务正常完成时丢弃该 chunk，
+    否则写出 traces/<任务名称>.zip，可用 playwright show-trace 查看。
+    同一个上下文同时只能录制一个 chunk，因此只用于单标签页提交。
+    """
+
+    def __init__(self, context, slow_seconds, directory=DEFAULT_TRACES_DIR):
+        self.context = context
+        self.slow_seconds = slow_seconds
+        self.directory = directory
+        self._started = None
+        os.makedirs(directory, exist_ok=True)
+        context.tracing.start(screenshots=True, snapshots=True)
+
+    def start_job(self):
+        self.context.tracing.start_chunk()
+        self._started = time.perf_counter()
+
+    def finish_job(self, name, ok):
+        elapsed = time.perf_counter() - self._started
+        if ok and elapsed < self.slow_seconds:
+            self.context.tracing.stop_chunk()
+            return None
+        path = os.path.join(self.directory, f"{name}.zip")
+        self.context.tracing.stop_chunk(path=path)
+        reason = "失败" if not ok else f"耗时 {elapsed:.1f} 秒"
+        print(f"任务 {name} {reason}，已保存 Playwright trace: {path}")
+        return path
+
+    def close(self):
+        try:
+            self.context.tracing.stop()
+        except Exception as e:
+            print(f"停止 Playwright tracing 时出错: {e}")
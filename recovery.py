@@ -0,0 +1,224 @@
+import heapq
+import threading
+import time
+from waits import wait_logged_in, wait_dialog_hidden, wait_job_row, wait_sequence_inputs_reset
+from ledger import SUBMITTED, FAILED
+from submission import SubmissionResult, click_clear, prepare_form, submit_job
+import profiling
+
+# 每个任务最多尝试的次数（含第一次）
+MAX_ATTEMPTS = 3
+
+# 重试前的等待时间：RETRY_BASE_DELAY * 2^(已失败次数 - 1)，不超过 RETRY_MAX_DELAY（秒）
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 300
+
+# 重试前检查任务是否其实已经提交（确认后才出错的情况）的等待时间（毫秒）
+ALREADY_LISTED_TIMEOUT = 3000
+
+# 任务在提交过程中的状态
+QUEUED = 'queued'          # 等待第一次提交
+SUBMITTING = 'submitting'  # 正在某个标签页中提交
+RETRY_WAIT = 'retry_wait'  # 失败后等待退避时间结束
+SUCCEEDED = 'succeeded'    # 提交成功
+GAVE_UP = 'gave_up'        # 达到重试上限，放弃
+
+# 允许的状态转换
+TRANSITIONS = {
+    QUEUED: {SUBMITTING},
+    SUBMITTING: {SUCCEEDED, RETRY_WAIT, GAVE_UP},
+    RETRY_WAIT: {SUBMITTING},
+    SUCCEEDED: set(),
+    GAVE_UP: set(),
+}
+
+
+def retry_delay(failures, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """第 failures 次失败后的退避时间（秒）"""
+    return min(max_delay, base_delay * 2 ** (failures - 1))
+
+
+class SubmissionTask:
+    """一个待提交的任务及其状态；index 为在输入中的位置，用于按原始顺序汇总结果"""
+
+    def __init__(self, index, name, sequence):
+        self.index = index
+        self.name = name
+        self.sequence = sequence
+        self.state = QUEUED
+        self.attempts = 0
+        self.error = None
+
+    def transition(self, state):
+        if state not in TRANSITIONS[self.state]:
+            raise RuntimeError(f"任务 {self.name} 不能从 {self.state} 转到 {state}")
+        self.state = state
+
+
+class RetryQueue:
+    """提交队列：失败的任务按指数退避放回队列，超过 max_attempts 次后放弃
+
+    多个标签页可以同时从同一个队列领取任务。队列为空但仍有任务在提交中时，
+    get 会等待，因为这些任务失败后还会回到队列。
+    """
+
+    def __init__(self, sequences, max_attempts=MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.tasks = [SubmissionTask(index, name, sequence)
+                      for index, (name, sequence) in enumerate(sequences)]
+        # 堆中的元素为 (可以开始的时间, 序号, 任务)
+        self._heap = [(0.0, task.index, task) for task in self.tasks]
+        self._running = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def get(self):
+        """领取下一个可以提交的任务，没有剩余任务时返回 None"""
+        with self._condition:
+            while True:
+                if self._closed or (not self._heap and not self._running):
+                    return None
+                if self._heap:
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        _, _, task = heapq.heappop(self._heap)
+                        task.transition(SUBMITTING)
+                        task.attempts += 1
+                        self._running += 1
+                        return task
+                else:
+                    wait = None
+                self._condition.wait(wait)
+
+    def finish(self, task, ok, error=None):
+        """记录一次提交的结果；失败且未达上限时放回队列，返回是否还会重试"""
+        with self._condition:
+            self._running -= 1
+            task.error = error
+            if ok:
+                task.transition(SUCCEEDED)
+                retrying = False
+            elif task.attempts < self.max_attempts:
+                task.transition(RETRY_WAIT)
+                delay = retry_delay(task.attempts, self.base_delay, self.max_delay)
+                heapq.heappush(self._heap, (time.monotonic() + delay, task.index, task))
+                print(f"任务 {task.name} 第 {task.attempts} 次提交失败，{delay:.0f} 秒后重试")
+                profiling.event('retry_scheduled', job=task.name, attempt=task.attempts, delay=delay)
+                retrying = True
+            else:
+                task.transition(GAVE_UP)
+                print(f"任务 {task.name} 已失败 {task.attempts} 次，放弃")
+                retrying = False
+            self._condition.notify_all()
+            return retrying
+
+
+def already_listed(page, name):
+    """任务是否已经出现在任务列表中；确认提交之后才出错时，重试前用它避免重复提交"""
+    try:
+        return wait_job_row(page, name, ALREADY_LISTED_TIMEOUT)
+    except Exception:
+        return False
+
+
+def reset_page(page, timeouts, baseline_inputs):
+    """把页面恢复到可以提交下一个任务的状态，返回输入框基准数量，无法恢复时返回 None
+
+    按代价从低到高逐级尝试：关闭残留的预览对话框并点击 Clear；
+    输入框仍未恢复初始状态时刷新页面并重新准备表单。
+    """
+    try:
+        dialog = page.locator('gdm-af-preview-dialog')
+        if dialog.is_visible():
+            print("关闭残留的预览对话框...")
+            profiling.event('reset_dialog')
+            page.keyboard.press('Escape')
+            if not wait_dialog_hidden(page, timeouts['dialog_hidden']):
+                raise RuntimeError("预览对话框未关闭")
+        profiling.event('reset_clear')
+        click_clear(page)
+        if wait_sequence_inputs_reset(page, baseline_inputs, timeouts['inputs_reset']):
+            return baseline_inputs
+        print("Clear 后序列输入框未恢复初始状态")
+    except Exception as e:
+        print(f"重置页面时出错: {e}")
+
+    print("刷新页面...")
+    profiling.event('page_reload')
+    try:
+        page.reload(timeout=60000)
+        if not wait_logged_in(page, timeouts['page_ready']):
+            return None
+        return prepare_form(page, timeouts)
+    except Exception as e:
+        print(f"刷新页面失败: {e}")
+        return None
+
+
+def process_queue(page, tasks, timeouts, baseline_inputs, input_strategy='fill', ledger=None,
+                  tag='', tracer=None, max_consecutive_failures=None, account=None):
+    """在一个标签页中依次领取并提交任务，每次失败后重置页面，直到队列为空
+
+    只有最终结果（成功或放弃）写入台账，account 为当前页面登录的账号，一并记入台账；
+    tracer 见 profiling.JobTracer。
+    连续失败 max_consecutive_failures 次或页面无法恢复时停止使用该标签页并返回 False。
+    """
+    prefix = f"{tag} " if tag else ""
+    failures = 0
+    while True:
+        task = tasks.get()
+        if task is None:
+            return True
+
+        retry_note = f"（第 {task.attempts} 次尝试）" if task.attempts > 1 else ""
+        print(f"\n{prefix}开始提交序列: {task.name}{retry_note}")
+        if tracer:
+            tracer.start_job()
+        try:
+            with profiling.job(task.name):
+                if task.attempts > 1 and already_listed(page, task.name):
+                    print(f"{prefix}任务 {task.name} 已在任务列表中，不再重复提交")
+                    ok, seed_settings = True, None
+                else:
+                    seed_settings = submit_job(page, task.name, task.sequence, timeouts,
+                                               baseline_inputs, input_strategy)
+                    ok = seed_settings is not None
+            error = None if ok else "提交失败"
+        except Exception as e:
+            print(f"{prefix}发生错误: {e}")
+            ok, error, seed_settings = False, str(e), None
+        if tracer:
+            tracer.finish_job(task.name, ok)
+        retrying = tasks.finish(task, ok, error)
+        if ledger is not None and not retrying:
+            ledger.set_state(task.name, task.sequence, SUBMITTED if ok else FAILED, error, account,
+                             seed_settings)
+
+        if ok:
+            failures = 0
+            continue
+        failures += 1
+        if max_consecutive_failures and failures >= max_consecutive_failures:
+            print(f"{prefix}连续失败 {failures} 次，停止使用该标签页")
+            return False
+        # 失败后把页面恢复到已知的初始状态，避免残留的输入或对话框影响后续任务
+        baseline_inputs = reset_page(page, timeouts, baseline_inputs)
+        if baseline_inputs is None:
+            print(f"{prefix}无法恢复页面，停止使用该标签页")
+            return False
+
+
+def collect_results(tasks):
+    """按原始顺序汇总 RetryQueue 中每个任务的最终结果"""
+    results = []
+    for task in tasks.tasks:
+        if task.state == SUCCEEDED:
+            results.append(SubmissionResult(task.name, True, None))
+        elif task.state == GAVE_UP:
+            results.append(SubmissionResult(task.name, False, f"{task.error}（已尝试 {task.attempts} 次）"))
+        else:
+            results.append(SubmissionResult(task.name, False, "没有可用的标签页，未执行"))
+    return results
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import shutil
+from ledger import DOWNLOADED, canonical_sequence, sequence_hash
+
+DEFAULT_RESULT_CACHE_DIR = 'result_cache'
+# 缓存总大小上限，超出时按最近使用时间淘汰最久未用的结果
+DEFAULT_RESULT_CACHE_LIMIT = 10 * 1024 ** 3
+
+# 预览对话框中的种子设置，由 submission.read_seed_settings 在提交时读取并记入台账。
+# 对话框中没有固定的种子值时为 seed:auto；提交前查找缓存时按 seed:auto 查找，
+# 因为 submit_job 不会指定种子值，固定了种子的结果只在种子相同时复用。
+DEFAULT_SEED_SETTINGS = 'seed:auto'
+
+
+def format_seed_settings(seed=None):
+    """种子设置的文本形式：没有固定的种子值时为 DEFAULT_SEED_SETTINGS"""
+    return f"seed:{seed}" if seed else DEFAULT_SEED_SETTINGS
+
+
+def cache_key(sequence, seed_settings=DEFAULT_SEED_SETTINGS):
+    """(规范化序列, 种子设置) 的 SHA-256 摘要"""
+    content = f"{canonical_sequence(sequence)}\n{seed_settings}"
+    return hashlib.sha256(content.encode('ascii')).hexdigest()
+
+
+class ResultCache:
+    """按内容寻址的结果缓存：以 (序列, 种子设置) 的摘要为文件名保存下载的结果压缩包
+
+    不同任务名称、不同批次中的相同序列共用一份结果。文件的修改时间即最近使用时间，
+    只在提交前查找命中（get / materialize）时更新，写入与整理不算使用；
+    写入后总大小超过 max_bytes 时从最久未用的结果开始删除。
+    """
+
+    def __init__(self, root=DEFAULT_RESULT_CACHE_DIR, max_bytes=DEFAULT_RESULT_CACHE_LIMIT):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        # 按摘要前两位分目录，避免单个目录中文件过多
+        return os.path.join(self.root, key[:2], f"{key}.zip")
+
+    def get(self, sequence, seed_settings=DEFAULT_SEED_SETTINGS):
+        """返回缓存的结果路径，未命中返回 None"""
+        path = self._path(cache_key(sequence, seed_settings))
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, sequence, result_path, seed_settings=DEFAULT_SEED_SETTINGS, evict=True):
+        """把结果压缩包存入缓存，已存在时不做任何事；批量写入时可传 evict=False，最后统一淘汰"""
+        path = self._path(cache_key(sequence, seed_settings))
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = path + '.part'
+        shutil.copyfile(result_path, partial_path)
+        os.replace(partial_path, path)
+        if evict:
+            self.evict()
+
+    def materialize(self, sequence, dest_path, seed_settings=DEFAULT_SEED_SETTINGS):
+        """命中时把缓存的结果复制到 dest_path，返回是否命中"""
+        path = self.get(sequence, seed_settings)
+        if path is None:
+            return False
+        if not os.path.exists(dest_path):
+            shutil.copyfile(path, dest_path)
+        return True
+
+    def evict(self):
+        """总大小超过上限时删除最久未用的结果，返回删除的文件数"""
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.zip'):
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(directory, name)))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"结果缓存超过上限，已淘汰 {removed} 个最久未用的结果")
+        return removed
+
+    def ingest(self, jobs, downloads_dir, ledger):
+        """把台账中已下载、且本地文件仍存在的结果按提交时的种子设置存入缓存；jobs 为 {名称: 序列}"""
+        states = ledger.states_of(jobs.items())
+        seeds = ledger.seed_settings_of(jobs.items())
+        for name, sequence in jobs.items():
+            key = (name, sequence_hash(sequence))
+            path = os.path.join(downloads_dir, f"{name}.zip")
+            if states.get(key) == DOWNLOADED and os.path.exists(path):
+                # 记录种子设置之前提交的任务按默认设置缓存
+                self.put(sequence, path, seeds.get(key) or DEFAULT_SEED_SETTINGS, evict=False)
+        self.evict()
@@ -0,0 +1,94 @@
+import datetime
+from ledger import sequence_hash
+
+# AlphaFold Server 每个账号每天可提交的任务数量
+DEFAULT_DAILY_QUOTA = 20
+
+# 配额每天在这个 UTC 小时重置
+DEFAULT_RESET_HOUR_UTC = 0
+
+
+def read_priorities(file_path):
+    """读取优先级文件：每行 "任务名称 优先级"，# 开头为注释，数值越大越先提交"""
+    priorities = {}
+    with open(file_path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.rsplit(None, 1)
+            if len(parts) != 2:
+                print(f"警告：优先级文件第 {line_no} 行格式不正确，已忽略: {line}")
+                continue
+            name, value = parts
+            try:
+                priorities[name] = int(value)
+            except ValueError:
+                print(f"警告：优先级文件第 {line_no} 行的优先级不是整数，已忽略: {line}")
+    return priorities
+
+
+class QuotaScheduler:
+    """按每日配额分批提交：记录当前配额窗口内已用的任务数，
+    每次只取出优先级最高、且不超过剩余配额的一批任务，其余任务留在台账中等待下一个窗口。
+    """
+
+    def __init__(self, ledger, daily_quota=DEFAULT_DAILY_QUOTA, reset_hour=DEFAULT_RESET_HOUR_UTC,
+                 account=None):
+        self.ledger = ledger
+        self.daily_quota = daily_quota
+        self.reset_hour = reset_hour
+        # 给出账号时只统计该账号的配额（见 accounts）
+        self.account = account
+
+    def window_start(self, now=None):
+        """当前配额窗口的起始时间（UTC）"""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        start = now.replace(hour=self.reset_hour, minute=0, second=0, microsecond=0)
+        if start > now:
+            start -= datetime.timedelta(days=1)
+        return start
+
+    def next_window(self, now=None):
+        """下一个配额窗口的起始时间（UTC）"""
+        return self.window_start(now) + datetime.timedelta(days=1)
+
+    def used(self, now=None):
+        """当前窗口内已提交的任务数量"""
+        return self.ledger.count_submitted_since(self.window_start(now).timestamp(), self.account)
+
+    def remaining_quota(self, now=None):
+        """当前窗口剩余的配额，daily_quota 为 None 时不限制"""
+        if self.daily_quota is None:
+            return None
+        return max(0, self.daily_quota - self.used(now))
+
+    def enqueue(self, sequences, priorities=None, origins=None):
+        """把序列加入台账中的待提交队列；origins 见 JobLedger.register"""
+        self.ledger.register(sequences, priorities, origins)
+
+    def next_batch(self, now=None, sequences=None, exclude=()):
+        """取出本窗口内可以提交的一批任务 (名称, 序列)，按优先级排序；
+        给出 sequences 时只从这些任务中取，台账中其他待提交的任务留在队列中；
+        exclude 中的任务名称本次不取（例如本窗口内已经尝试过、失败后回到队列的任务）"""
+        quota = self.remaining_quota(now)
+        if quota == 0:
+            return []
+        if sequences is None and not exclude:
+            return self.ledger.queued(limit=quota)
+        wanted = None if sequences is None else {(name, sequence_hash(sequence)) for name, sequence in sequences}
+        batch = [(name, sequence) for name, sequence in self.ledger.queued()
+                 if name not in exclude and (wanted is None or (name, sequence_hash(sequence)) in wanted)]
+        return batch[:quota] if quota is not None else batch
+
+    def report(self, now=None):
+        """打印配额使用情况"""
+        queued = self.ledger.count_queued()
+        if self.daily_quota is None:
+            print(f"未限制每日配额，待提交 {queued} 个任务")
+            return
+        print(f"当前配额窗口已使用 {self.used(now)}/{self.daily_quota}，"
+              f"待提交 {queued} 个任务")
+        if queued:
+            next_window = self.next_window(now).astimezone()
+            print(f"下一个配额窗口开始于 {next_window:%Y-%m-%d %H:%M}")
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+
+# 各界面元素定位方式的成功率与耗时统计，跨运行保存
+DEFAULT_REGISTRY_PATH = 'selector_stats.json'
+
+# 平均耗时的指数平滑系数，越大越偏向最近几次的表现
+SMOOTHING = 0.3
+
+# 成功率的先验（Beta(1, 1)，即拉普拉斯平滑）：相当于每种方式预先记有一次成功和一次失败，
+# 尝试次数少的方式不会因为一两次偶然的成败排到经过大量验证的方式前面或后面
+PRIOR_OK = 1
+PRIOR_FAIL = 1
+
+
+def success_rate(ok, fail):
+    """加上先验后的成功率：1 次中成功 1 次为 2/3，100 次中成功 95 次约为 0.94"""
+    return (ok + PRIOR_OK) / (ok + fail + PRIOR_OK + PRIOR_FAIL)
+
+
+class SelectorRegistry:
+    """为每个界面元素记录多种定位方式（strategy）的表现，之后优先尝试表现最好的方式
+
+    界面改版后原来的首选方式会失败，只需付出一次超时，之后的任务直接使用可用的方式。
+    统计保存在 JSON 文件中，下次运行沿用学到的顺序。
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._stats = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取定位方式统计失败，重新开始统计: {e}")
+
+    def order(self, element, names):
+        """按平滑后的成功率（见 success_rate）从高到低排序，相同时平均耗时短的在前，再相同时保持传入的顺序；
+        没有记录的方式按先验的成功率参与排序"""
+        with self._lock:
+            stats = self._stats.get(element, {})
+
+            def rank(item):
+                position, name = item
+                entry = stats.get(name)
+                if not entry:
+                    return (-success_rate(0, 0), 0.0, position)
+                return (-success_rate(entry['ok'], entry['fail']), entry['seconds'], position)
+
+            return [name for _, name in sorted(enumerate(names), key=rank)]
+
+    def record(self, element, name, ok, seconds):
+        with self._lock:
+            entry = self._stats.setdefault(element, {}).setdefault(name, {'ok': 0, 'fail': 0, 'seconds': 0.0})
+            if ok:
+                entry['seconds'] = (seconds if entry['ok'] == 0
+                                    else (1 - SMOOTHING) * entry['seconds'] + SMOOTHING * seconds)
+                entry['ok'] += 1
+            else:
+                entry['fail'] += 1
+
+    def _ordered(self, element, strategies):
+        strategies = dict(strategies)
+        return [(name, strategies[name]) for name in self.order(element, list(strategies))]
+
+    def attempt(self, element, strategies):
+        """按学到的顺序依次尝试 [(名称, 函数)]，函数返回 None 或 False 或抛出异常视为失败；
+        返回第一个成功的结果，全部失败时抛出最后一个异常（没有异常时返回 None）"""
+        error = None
+        for name, strategy in self._ordered(element, strategies):
+            started = time.perf_counter()
+            try:
+                result = strategy()
+            except Exception as e:
+                result, error = None, e
+            ok = result is not None and result is not False
+            self.record(element, name, ok, time.perf_counter() - started)
+            if ok:
+                return result
+            print(f"{element} 的定位方式 {name} 失败，尝试下一种")
+        if error is not None:
+            raise error
+        return None
+
+    async def attempt_async(self, element, strategies):
+        """attempt 的异步版本，strategies 中的函数返回协程"""
+        error = None
+        for name, strategy in self._ordered(element, strategies):
+            started = time.perf_counter()
+            try:
+                result = await strategy()
+            except Exception as e:
+                result, error = None, e
+            ok = result is not None and result is not False
+            self.record(element, name, ok, time.perf_counter() - started)
+            if ok:
+                return result
+            print(f"{element} 的定位方式 {name} 失败，尝试下一种")
+        if error is not None:
+            raise error
+        return None
+
+    def save(self):
+        """保存统计，先写临时文件再替换"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._stats, ensure_ascii=False, indent=1)
+        partial_path = self.path + '.tmp'
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(partial_path, self.path)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(path=DEFAULT_REGISTRY_PATH):
+    """进程内共用的定位方式统计，第一次使用时从文件加载"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SelectorRegistry(path)
+        return _registry
+
+
+def save_registry():
+    """保存进程内的定位方式统计（没有使用过时不写文件）"""
+    if _registry is not None:
+        _registry.save()
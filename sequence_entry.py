@@ -0,0 +1,113 @@
+import time
+from waits import wait_save_job_enabled
+from profiling import event
+
+# 可选的序列输入方式：
+#   fill   - 使用 Playwright fill 一次性写入
+#   paste  - 派发合成的 paste 事件
+#   assign - 直接赋值 value 后派发 input/change 事件
+#   type   - 原有的模拟手动逐字输入（最慢，仅作为兜底）
+INPUT_STRATEGIES = ('fill', 'paste', 'assign', 'type')
+
+
+def fill_sequence(page, sequence_input, sequence):
+    """使用 fill 一次性写入序列"""
+    sequence_input.fill(sequence)
+
+
+def paste_sequence(page, sequence_input, sequence):
+    """派发合成的 paste 事件写入序列"""
+    sequence_input.click()
+    sequence_input.evaluate('''(el, text) => {
+        el.focus();
+        const data = new DataTransfer();
+        data.setData('text/plain', text);
+        const event = new ClipboardEvent('paste', {
+            clipboardData: data, bubbles: true, cancelable: true
+        });
+        // 页面自己处理了粘贴（调用了 preventDefault）时不再重复写入
+        if (el.dispatchEvent(event)) {
+            el.setRangeText(text, el.selectionStart, el.selectionEnd, 'end');
+            el.dispatchEvent(new InputEvent('input', {
+                bubbles: true, inputType: 'insertFromPaste', data: text
+            }));
+        }
+    }''', sequence)
+
+
+def assign_sequence(page, sequence_input, sequence):
+    """直接给 value 赋值并派发 input/change 事件"""
+    sequence_input.evaluate('''(el, text) => {
+        const setter = Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set;
+        setter.call(el, text);
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+    }''', sequence)
+
+
+def type_sequence(page, sequence_input, sequence, timeouts, retry=False):
+    """模拟手动输入：前4个字符逐个输入，剩余部分分批输入"""
+    if retry:
+        print("重试：清空该输入框并重新输入序列...")
+        # 只清空当前输入框；Clear 按钮会清掉多实体任务中已经添加的其他实体
+        sequence_input.fill('')
+
+    # 先输入前4个字符，模拟手动输入
+    print("输入前4个字符...")
+    sequence_input.click()  # 确保焦点在正确的输入框上
+
+    # 一个一个字符输入，模拟真实输入速度
+    for i in range(4):
+        sequence_input.type(sequence[i], delay=200)  # 每个字符输入延迟200ms
+        print(f"已输入: {sequence[i]}")
+        time.sleep(0.3)  # 字符之间额外等待0.3秒
+
+    # 等待序列验证，检查 Save job 按钮状态
+    if not wait_save_job_enabled(page, timeouts['save_enabled']):
+        if not retry:  # 如果是第一次尝试，就重试一次
+            event('sequence_type_retry')
+            return type_sequence(page, sequence_input, sequence, timeouts, retry=True)
+        return False
+
+    # 输入剩余序列，也模拟手动输入
+    print("输入剩余序列...")
+    sequence_input.click()  # 再次确保焦点
+    remaining_sequence = sequence[4:]
+
+    # 分批输入剩余序列，每批10个字符
+    chunk_size = 10
+    for i in range(0, len(remaining_sequence), chunk_size):
+        chunk = remaining_sequence[i:i+chunk_size]
+        sequence_input.type(chunk)
+
+    # 等待序列验证
+    return wait_save_job_enabled(page, timeouts['save_enabled'])
+
+
+_FAST_INPUTS = {
+    'fill': fill_sequence,
+    'paste': paste_sequence,
+    'assign': assign_sequence,
+}
+
+
+def enter_sequence(page, sequence_input, sequence, timeouts, strategy='fill'):
+    """按指定方式输入序列，Save job 未能启用时回退到模拟手动输入"""
+    if strategy not in INPUT_STRATEGIES:
+        raise ValueError(f"未知的输入方式: {strategy}，可选: {', '.join(INPUT_STRATEGIES)}")
+
+    if strategy != 'type':
+        print(f"使用 {strategy} 方式输入序列...")
+        try:
+            _FAST_INPUTS[strategy](page, sequence_input, sequence)
+            if (wait_save_job_enabled(page, timeouts['save_enabled'])
+                    and ''.join(sequence_input.input_value().split()).upper() == sequence.upper()):
+                return True
+            print(f"{strategy} 方式输入后 Save job 未启用，回退到模拟手动输入")
+            event('sequence_type_fallback', strategy=strategy)
+        except Exception as e:
+            print(f"{strategy} 方式输入失败: {e}，回退到模拟手动输入")
+            event('sequence_type_fallback', strategy=strategy, error=str(e))
+        sequence_input.fill('')
+
+    return type_sequence(page, sequence_input, sequence, timeouts)
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+
+# 登录状态缓存文件（Playwright storage_state 格式：cookies + localStorage）
+DEFAULT_SESSION_PATH = 'session_state.json'
+
+# 表示 Google 账号已登录的 cookie；AlphaFold Server 通过 Google 登录，这些 cookie 失效后必须重新登录。
+# 其他 cookie（偏好设置、统计等）有效期很长或是会话 cookie，不能说明登录状态
+AUTH_COOKIES = {
+    'google.com': ('SID', '__Secure-1PSID', '__Secure-3PSID'),
+}
+
+
+def _auth_cookies(state):
+    """登录状态缓存中的登录凭据 cookie"""
+    return [
+        cookie for cookie in state.get('cookies', [])
+        if any(cookie.get('domain', '').lstrip('.').endswith(domain) and cookie.get('name') in names
+               for domain, names in AUTH_COOKIES.items())
+    ]
+
+
+def load_session(path=DEFAULT_SESSION_PATH, now=None):
+    """读取并离线校验登录状态缓存，可用时返回 storage_state，否则返回 None
+
+    只检查文件能否解析以及登录凭据 cookie（AUTH_COOKIES）是否存在且未过期，不访问网络；
+    服务端是否仍认可该登录状态由打开页面后是否出现登录按钮来确认，
+    不认可时调用方应使用 discard_session 删除缓存。
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取登录状态缓存失败: {e}")
+        return None
+
+    cookies = _auth_cookies(state)
+    if not cookies:
+        print("登录状态缓存中没有登录凭据 cookie")
+        return None
+    now = now or time.time()
+    # expires 为 -1 表示会话 cookie，没有过期时间；任何一个登录凭据过期都需要重新登录
+    expired = [c['name'] for c in cookies if c.get('expires', -1) != -1 and c['expires'] <= now]
+    if expired:
+        print(f"登录状态缓存已过期: {', '.join(expired)}")
+        return None
+    return state
+
+
+def save_session(state, path=DEFAULT_SESSION_PATH):
+    """保存 storage_state，先写临时文件再替换，避免中途中断损坏缓存"""
+    partial_path = path + '.tmp'
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(partial_path, path)
+    print(f"已保存登录状态: {path}")
+
+
+def discard_session(path=DEFAULT_SESSION_PATH):
+    """删除服务端已不认可的登录状态缓存，之后的无人值守运行不会继续使用它"""
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"登录状态缓存已失效，已删除: {path}")
+
+
+def session_cookies(state):
+    """可直接传给 context.add_cookies 的 cookie 列表"""
+    return state.get('cookies', [])
+
+
+def local_storage_script(state):
+    """生成恢复 localStorage 的初始化脚本
+
+    持久化上下文不支持 storage_state 参数，因此在每个页面加载前按来源写回缓存的条目；
+    页面自己已经写过的键不会被覆盖。
+    """
+    origins = {
+        origin['origin']: {item['name']: item['value'] for item in origin.get('localStorage', [])}
+        for origin in state.get('origins', [])
+    }
+    return f'''(() => {{
+        const items = {json.dumps(origins)}[window.location.origin];
+        if (!items) return;
+        for (const [key, value] of Object.entries(items)) {{
+            if (window.localStorage.getItem(key) === null) {{
+                window.localStorage.setItem(key, value);
+            }}
+        }}
+    }})();'''
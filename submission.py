@@ -0,0 +1,358 @@
+import os
+import sys
+from collections import namedtuple
+from waits import (
+    wait_page_ready,
+    wait_logged_in,
+    count_sequence_inputs,
+    wait_sequence_input_added,
+    wait_switch_checked,
+    wait_dialog_hidden,
+    wait_job_row,
+    wait_sequence_inputs_reset,
+)
+from sequence_entry import enter_sequence
+from entities import parse_entities
+from profiling import span, event
+from selector_registry import get_registry
+from lean_mode import chrome_executable, browser_args, block_resources
+from session import session_cookies, local_storage_script
+from result_cache import format_seed_settings
+
+# 可通过环境变量指向 mock_server.py 启动的本地模拟服务器
+ALPHAFOLD_URL = os.environ.get('ALPHAFOLD_URL', "https://alphafoldserver.com/")
+
+# Seed 开关所在的区域：包含数字输入框的最近一层祖先，且不超出预览对话框
+SEED_FIELD_XPATH = ('xpath=ancestor::*[.//input[@type="number"]]'
+                    '[ancestor-or-self::gdm-af-preview-dialog][1]')
+
+# 单个任务的提交结果，error 为 None 表示成功
+SubmissionResult = namedtuple('SubmissionResult', ['name', 'ok', 'error'])
+
+# 修改 navigator.webdriver
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
+
+CLEAR_BUTTON_SCRIPT = '''() => {
+    const buttons = Array.from(document.querySelectorAll('button'));
+    const clearButton = buttons.find(button =>
+        button.querySelector('.mdc-button__label')?.textContent.trim() === 'Clear'
+    );
+    if (!clearButton) return false;
+    clearButton.click();
+    return true;
+}'''
+
+# 在对话框中找到必填的 Job name 输入框并让它获得焦点，找不到时返回 false
+FOCUS_JOB_NAME_SCRIPT = '''() => {
+    const inputs = Array.from(document.querySelectorAll('input'));
+    const jobInput = inputs.find(input =>
+        input.hasAttribute('required') &&
+        input.classList.contains('mat-mdc-input-element')
+    );
+    if (!jobInput) return false;
+    jobInput.scrollIntoView();
+    jobInput.focus();
+    return true;
+}'''
+
+
+def launch_browser(p, user_data_dir, debug_port=None, lean=False):
+    """启动 Chrome 浏览器；指定 debug_port 时开放 CDP 端口，供其他线程连接同一个浏览器。
+
+    lean 为 True 时使用精简模式：无头的 Playwright 自带 Chromium，关闭无关的后台功能；
+    请求拦截由各标签页在 open_page 中自行安装（见 lean_mode.block_resources）。"""
+    print("启动无头 Chromium（精简模式）..." if lean else "启动 Chrome 浏览器...")
+    extra = [f'--remote-debugging-port={debug_port}'] if debug_port else []
+    context = p.chromium.launch_persistent_context(
+        user_data_dir=user_data_dir,
+        executable_path=None if lean else chrome_executable(),
+        headless=lean,
+        ignore_default_args=["--enable-automation"],
+        args=browser_args(lean, extra)
+    )
+    return context
+
+
+def restore_session(context, state):
+    """把缓存的登录状态（cookies 与 localStorage）写回浏览器上下文"""
+    context.add_cookies(session_cookies(state))
+    context.add_init_script(local_storage_script(state))
+
+
+def open_page(context, lean=False, url=ALPHAFOLD_URL):
+    """新建标签页并隐藏自动化特征；lean 为 True 时在该标签页上拦截 url 站点以外的非必要请求（见 lean_mode）"""
+    page = context.new_page()
+    page.add_init_script(STEALTH_SCRIPT)
+    if lean:
+        block_resources(page, url)
+    return page
+
+
+def open_alphafold(page, timeouts, url=ALPHAFOLD_URL):
+    """访问 AlphaFold Server 并等待页面加载"""
+    print("正在访问 AlphaFold Server...")
+    with span('goto'):
+        page.goto(url, timeout=60000)
+        wait_page_ready(page, timeouts['page_ready'])
+
+
+def login(page, timeouts):
+    """需要时等待手动完成 Google 登录，返回是否已登录"""
+    print("等待登录...")
+    login_button = page.locator('span:has-text("Continue with Google")')
+    if login_button.is_visible():
+        if not sys.stdin.isatty():
+            print("错误：需要重新登录，但当前没有可交互的终端")
+            return False
+        login_button.click()
+        print("\n请在浏览器中完成 Google 登录。")
+        print("完成后请按回车键继续...")
+        input()
+
+    # 等待页面加载完成
+    print("等待页面加载完成...")
+    return wait_logged_in(page, timeouts['page_ready'])
+
+
+def click_clear(page):
+    """点击 Clear 按钮：常规点击与 JavaScript 点击按以往的成功率和耗时排序，
+    首选方式失败时再尝试另一种（见 selector_registry）"""
+    def click_locator():
+        clear_button = page.locator('button:has-text("Clear")')
+        clear_button.wait_for(state='visible', timeout=5000)
+        clear_button.click()
+        return True
+
+    def click_script():
+        event('clear_js_fallback')
+        return page.evaluate(CLEAR_BUTTON_SCRIPT)
+
+    with span('clear'):
+        try:
+            if get_registry().attempt('clear_button', [('locator', click_locator), ('script', click_script)]):
+                print("已点击 Clear 按钮")
+            else:
+                print("未找到 Clear 按钮")
+        except Exception as e:
+            print(f"点击 Clear 按钮时出错: {e}")
+
+
+def prepare_form(page, timeouts):
+    """清除现有序列并确认 Add entity 按钮可用，返回清空后的输入框数量，失败返回 None"""
+    # 先点击 Clear 按钮清除可能存在的序列
+    print("尝试清除现有序列...")
+    click_clear(page)
+    # 记录清空后的输入框数量，作为之后每次 Clear 的目标状态
+    wait_sequence_inputs_reset(page, count_sequence_inputs(page), timeouts['inputs_reset'])
+    baseline_inputs = count_sequence_inputs(page)
+
+    # 检查 Add entity 按钮
+    print("检查 Add entity 按钮...")
+    add_button = page.locator('button:has-text("Add entity")')
+    try:
+        add_button.wait_for(state='visible', timeout=5000)
+    except Exception as e:
+        print(f"错误：无法找到 Add entity 按钮 - {e}")
+        return None
+
+    print("找到 Add entity 按钮！")
+    return baseline_inputs
+
+
+def add_entity(page, sequence, timeouts, input_strategy='fill'):
+    """点击 Add entity 并在新出现的输入框中输入序列，返回该输入框，失败返回 None"""
+    add_button = page.locator('button:has-text("Add entity")')
+    if not add_button.is_visible(timeout=5000):
+        print(f"错误：无法找到 Add entity 按钮")
+        return None
+
+    with span('add_entity'):
+        inputs_before = count_sequence_inputs(page)
+        add_button.click()
+        wait_sequence_input_added(page, inputs_before, timeouts['input_added'])
+
+    # 输入序列
+    print(f"正在输入序列...")
+
+    # 等待新的序列输入框出现并定位到最后一个
+    sequence_input = page.locator('textarea.sequence-input').last
+    if not sequence_input.is_visible(timeout=5000):
+        print(f"错误：无法找到序列输入框")
+        return None
+
+    # 尝试输入序列
+    with span('enter_sequence'):
+        entered = enter_sequence(page, sequence_input, sequence, timeouts, strategy=input_strategy)
+    if not entered:
+        print("错误：无法启用 Save job 按钮")
+        return None
+    return sequence_input
+
+
+def set_copies(page, sequence_input, entity, timeouts, input_strategy='fill'):
+    """把实体的拷贝数设为 entity.copies：优先填写实体卡片中的 Copies 输入框，
+    找不到时把同一序列再添加 copies - 1 次（两种方式按以往的表现排序，见 selector_registry）"""
+    if entity.copies == 1:
+        return True
+
+    def copies_field():
+        card = sequence_input.locator('xpath=ancestor::*[.//input[@type="number"]][1]')
+        field = card.locator('input[type="number"]').first
+        field.fill(str(entity.copies), timeout=2000)
+        return field.input_value() == str(entity.copies)
+
+    def repeat_entity():
+        event('copies_repeat_entity', copies=entity.copies)
+        return all(add_entity(page, entity.sequence, timeouts, input_strategy)
+                   for _ in range(entity.copies - 1))
+
+    with span('copies'):
+        return bool(get_registry().attempt(
+            'entity_copies', [('copies_field', copies_field), ('repeat_entity', repeat_entity)]))
+
+
+def read_seed_settings(seed_toggle):
+    """读取 Seed 开关旁的种子值：有可见且可编辑的种子输入框并填写了数值时为 seed:<种子>，
+    输入框不存在、隐藏或被禁用时为 seed:auto（见 result_cache）"""
+    seed_inputs = seed_toggle.locator(SEED_FIELD_XPATH).locator('input[type="number"]')
+    for index in range(seed_inputs.count()):
+        seed_input = seed_inputs.nth(index)
+        if seed_input.is_visible() and seed_input.is_editable():
+            return format_seed_settings(seed_input.input_value().strip())
+    return format_seed_settings()
+
+
+def submit_job(page, name, sequence, timeouts, baseline_inputs, input_strategy='fill'):
+    """在当前页面提交一个任务，成功时返回预览对话框中的种子设置（见 read_seed_settings），
+    失败返回 None；意外错误直接抛出由调用方处理
+
+    sequence 可以是多实体写法（见 entities），所有实体在同一个表单中依次添加，
+    然后只预览和确认一次。"""
+    for entity in parse_entities(sequence):
+        sequence_input = add_entity(page, entity.sequence, timeouts, input_strategy)
+        if sequence_input is None:
+            print(f"错误：添加实体失败 - {name}")
+            return None
+        if not set_copies(page, sequence_input, entity, timeouts, input_strategy):
+            print(f"错误：无法设置拷贝数 {entity.copies} - {name}")
+            return None
+
+    print("Save job 按钮已可用")
+
+    try:
+        with span('preview_dialog'):
+            continue_button = page.locator('span:has-text(" Continue and preview job ")')
+            continue_button.click()
+
+            # 等待对话框出现
+            dialog = page.locator('gdm-af-preview-dialog')
+            dialog.wait_for(state='visible', timeout=timeouts['dialog_visible'])
+            print("对话框已出现")
+
+        # 等待对话框中的输入框加载完成
+        print("等待输入框加载...")
+
+        def find_required():
+            # 简单的选择器
+            job_name_input = dialog.locator('input[required]')
+            job_name_input.wait_for(state='visible', timeout=10000)
+            return job_name_input
+
+        def find_focused():
+            # 使用JavaScript定位并聚焦，再定位已聚焦的输入框
+            event('job_name_js_fallback')
+            if not page.evaluate(FOCUS_JOB_NAME_SCRIPT):
+                return None
+            job_name_input = dialog.locator('input:focus')
+            job_name_input.wait_for(state='visible', timeout=5000)
+            return job_name_input
+
+        job_name_input = get_registry().attempt(
+            'job_name_input', [('required', find_required), ('focus_script', find_focused)])
+        if job_name_input is None:
+            raise RuntimeError("找不到 Job name 输入框")
+        print("找到 Job name 输入框")
+
+        # 生成作业名称（使用序列名称）
+        job_name = name
+        print(f"使用作业名称: {job_name}")
+
+        with span('job_name'):
+            # 先清除输入框
+            job_name_input.clear()
+
+            # 输入作业名称，仅在模拟手动输入模式下逐字输入
+            if input_strategy == 'type':
+                job_name_input.type(job_name, delay=100)
+            else:
+                job_name_input.fill(job_name)
+            print(f"已输入作业名称: {job_name}")
+
+        with span('seed_toggle'):
+            # 点击 Seed 滑动开关
+            seed_toggle = dialog.locator('button.mdc-switch[role="switch"]')
+            seed_toggle.wait_for(state='visible', timeout=5000)
+            print("找到 Seed 滑动开关")
+
+            # 检查当前状态
+            is_checked = seed_toggle.get_attribute('aria-checked') == 'true'
+            if not is_checked:
+                seed_toggle.click()
+                wait_switch_checked(dialog, timeouts['switch_checked'])
+                print("已启用 Seed 开关")
+            seed_settings = read_seed_settings(seed_toggle)
+
+        confirm_button = page.locator('span:has-text(" Confirm and submit job ")')
+        print("找到确认按钮")
+
+        # 尝试直接点击
+        try:
+            confirm_button.click()
+            print("已点击确认按钮")
+        except Exception as e:
+            print(f"直接点击失败: {e}")
+            event('confirm_click_failed', error=str(e))
+
+    except Exception as e:
+        print(f"保存作业过程中出错: {e}")
+        return None
+
+    # 等待对话框消失
+    with span('confirm'):
+        hidden = wait_dialog_hidden(page, timeouts['dialog_hidden'])
+    if not hidden:
+        print(f"错误：确认后对话框未关闭 - {name}")
+        return None
+    print("对话框已消失")
+
+    print(f"序列 {name} 已保存")
+
+    # 等待任务出现在任务列表中
+    with span('job_row'):
+        listed = wait_job_row(page, name, timeouts['job_row'])
+    if not listed:
+        print(f"警告：任务列表中暂未出现 {name}，继续执行")
+
+    # 点击 Clear 按钮
+    print("点击 Clear 按钮...")
+    click_clear(page)
+
+    # 等待清除完成
+    with span('inputs_reset'):
+        reset = wait_sequence_inputs_reset(page, baseline_inputs, timeouts['inputs_reset'])
+    if not reset:
+        print("警告：序列输入框未恢复初始状态")
+    return seed_settings
+
+
+def print_results(results):
+    """按原始文件顺序打印提交结果"""
+    succeeded = sum(1 for result in results if result.ok)
+    print(f"\n提交结果：成功 {succeeded} 个，失败 {len(results) - succeeded} 个")
+    for result in results:
+        status = "成功" if result.ok else f"失败（{result.error}）"
+        print(f"- {result.name}: {status}")
@@ -0,0 +1,79 @@
+import socket
+import threading
+from playwright.sync_api import sync_playwright
+from waits import wait_logged_in
+from submission import ALPHAFOLD_URL, open_page, open_alphafold, prepare_form
+from recovery import MAX_ATTEMPTS, RetryQueue, process_queue, collect_results
+
+# 同一个标签页连续失败多少次后放弃该标签页，剩余任务交给其他标签页
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def find_free_port():
+    """获取一个本机空闲端口，用于开放 CDP 调试端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _worker(worker_id, endpoint, tasks, timeouts, input_strategy, ledger, url, account, lean):
+    """工作线程：连接到同一个浏览器，在自己的标签页中从共用的重试队列领取并提交任务
+
+    Playwright 的同步 API 不能跨线程共享，因此每个线程启动自己的 Playwright
+    并通过 CDP 连接到主线程启动的浏览器，共用同一个登录上下文；
+    精简模式的请求拦截也安装在本线程自己的标签页上。
+    """
+    tag = f"[标签页 {worker_id}]"
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.connect_over_cdp(endpoint)
+            context = browser.contexts[0]
+            page = open_page(context, lean, url)
+            open_alphafold(page, timeouts, url)
+            if not wait_logged_in(page, timeouts['page_ready']):
+                print(f"{tag} 错误：未检测到登录状态，退出")
+                return
+            baseline_inputs = prepare_form(page, timeouts)
+            if baseline_inputs is None:
+                print(f"{tag} 错误：表单初始化失败，退出")
+                return
+        except Exception as e:
+            print(f"{tag} 初始化失败: {e}")
+            return
+
+        try:
+            process_queue(page, tasks, timeouts, baseline_inputs, input_strategy, ledger,
+                          tag=tag, max_consecutive_failures=MAX_CONSECUTIVE_FAILURES, account=account)
+        finally:
+            try:
+                page.close()
+            except Exception:
+                pass
+
+
+def run_pool(endpoint, sequences, concurrency, timeouts, input_strategy='fill', ledger=None,
+             url=ALPHAFOLD_URL, max_attempts=MAX_ATTEMPTS, account=None, lean=False):
+    """在同一浏览器上下文中打开多个标签页并发提交，结果按原始顺序返回；
+    失败的任务放回共用的重试队列，可能由其他标签页重试，最多尝试 max_attempts 次；
+    传入 ledger 时每个任务有最终结果后立即写入台账，url 为要打开的站点地址，
+    account 为浏览器登录的账号（见 accounts），lean 为 True 时各标签页拦截非必要请求"""
+    tasks = RetryQueue(sequences, max_attempts)
+
+    workers = min(concurrency, len(sequences))
+    print(f"使用 {workers} 个标签页并发提交 {len(sequences)} 个序列")
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(worker_id, endpoint, tasks, timeouts, input_strategy, ledger, url, account, lean),
+            name=f"submit-worker-{worker_id}",
+            daemon=True,
+        )
+        for worker_id in range(1, workers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 所有标签页都已退出但仍有剩余任务时，这些任务记为未执行
+    return collect_results(tasks)
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_DOWNLOADS_DIR = 'downloads'
+DEFAULT_SUMMARY_PATH = 'summary.csv'
+
+# 结果压缩包中每个模型对应的 JSON 文件，如 fold_xxx_summary_confidences_0.json、fold_xxx_full_data_0.json
+MEMBER_PATTERN = re.compile(r'_(summary_confidences|full_data)_(\d+)\.json$')
+
+# 汇总表的列，每个模型一行
+SUMMARY_COLUMNS = (
+    'job', 'model', 'mean_plddt', 'ptm', 'iptm', 'ranking_score',
+    'fraction_disordered', 'has_clash',
+)
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def summarize_zip(path):
+    """逐个读取压缩包中的 JSON 成员（不解压到磁盘），返回每个模型一行的记录列表"""
+    job = os.path.splitext(os.path.basename(path))[0]
+    models = {}
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.namelist():
+            match = MEMBER_PATTERN.search(member)
+            if not match:
+                continue
+            kind, model = match.group(1), int(match.group(2))
+            with archive.open(member) as f:
+                data = json.load(f)
+            row = models.setdefault(model, {'job': job, 'model': model})
+            if kind == 'summary_confidences':
+                for key in ('ptm', 'iptm', 'ranking_score', 'fraction_disordered', 'has_clash'):
+                    row[key] = data.get(key)
+            else:
+                # 原子级 pLDDT 的平均值作为模型整体的 pLDDT
+                row['mean_plddt'] = _mean(data.get('atom_plddts') or [])
+    return [models[model] for model in sorted(models)]
+
+
+def _summarize_safe(path):
+    """进程池中执行的任务：出错时返回错误信息而不是抛出，避免一个坏文件中断整批汇总"""
+    try:
+        return path, summarize_zip(path), None
+    except Exception as e:
+        return path, [], str(e)
+
+
+def _summarized_jobs(summary_path):
+    """汇总表中已有的任务名称"""
+    if not os.path.exists(summary_path):
+        return set()
+    with open(summary_path, 'r', newline='', encoding='utf-8') as f:
+        return {row['job'] for row in csv.DictReader(f)}
+
+
+def summarize_results(downloads_dir=DEFAULT_DOWNLOADS_DIR, summary_path=DEFAULT_SUMMARY_PATH,
+                      workers=None, rebuild=False):
+    """用进程池并行汇总 downloads_dir 中所有结果压缩包的置信度指标，追加到 summary_path
+
+    汇总表中已有的任务会跳过；rebuild 为 True 时重新生成整个汇总表。返回新增的行数。
+    """
+    if rebuild and os.path.exists(summary_path):
+        os.remove(summary_path)
+    done = _summarized_jobs(summary_path)
+    paths = sorted(
+        os.path.join(downloads_dir, name) for name in os.listdir(downloads_dir)
+        if name.endswith('.zip') and os.path.splitext(name)[0] not in done
+    )
+    if not paths:
+        print("没有需要汇总的结果")
+        return 0
+    print(f"汇总 {len(paths)} 个结果压缩包...")
+
+    write_header = not os.path.exists(summary_path)
+    written = 0
+    failed = 0
+    with open(summary_path, 'a', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        # 每个压缩包解析完就写入，不在内存中累积全部结果
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        for path, rows, error in executor.map(_summarize_safe, paths, chunksize=chunksize):
+            if error:
+                print(f"解析 {path} 时出错: {error}")
+                failed += 1
+                continue
+            if not rows:
+                print(f"警告：{path} 中没有找到置信度文件")
+            writer.writerows(rows)
+            written += len(rows)
+
+    print(f"已写入 {written} 行到 {summary_path}，失败 {failed} 个")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="汇总下载结果中每个模型的 pLDDT、pTM、ipTM 和排序分数")
+    parser.add_argument('--downloads', default=DEFAULT_DOWNLOADS_DIR,
+                        help=f"结果压缩包所在目录，默认 {DEFAULT_DOWNLOADS_DIR}")
+    parser.add_argument('--output', default=DEFAULT_SUMMARY_PATH,
+                        help=f"汇总表路径，默认 {DEFAULT_SUMMARY_PATH}")
+    parser.add_argument('--workers', type=int,
+                        help="并行进程数，默认等于 CPU 核数")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="重新生成整个汇总表，而不是只追加新的结果")
+    args = parser.parse_args()
+    summarize_results(args.downloads, args.output, args.workers, args.rebuild)
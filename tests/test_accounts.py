@@ -0,0 +1,20 @@
+from accounts import Account, AccountShards
+from ledger import SUBMITTED, JobLedger
+
+
+def test_assign_prefers_most_remaining_quota(tmp_path):
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.register([(f'job{i}', 'MKT' + 'A' * i) for i in range(5)])
+        ledger.set_state('old', 'GGS', SUBMITTED, account='x')
+        shards = AccountShards([Account('x', None), Account('y', None)], ledger, daily_quota=3)
+        assignments = {account.name: [name for name, _ in batch] for account, batch in shards.assign()}
+        # x 已用 1 个配额，y 剩余更多，先分给 y
+        assert assignments == {'x': ['job1', 'job3'], 'y': ['job0', 'job2', 'job4']}
+
+
+def test_assign_stops_when_quota_is_used(tmp_path):
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.register([('a', 'MKT'), ('b', 'GGS')])
+        ledger.set_state('old', 'AAA', SUBMITTED, account='x')
+        shards = AccountShards([Account('x', None)], ledger, daily_quota=1)
+        assert shards.assign() == []
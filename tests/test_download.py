@@ -0,0 +1,43 @@
+import urllib.request
+
+from download import ResultFetcher, classify_status
+from ledger import DONE, FAILED, RUNNING
+from mock_server import MockAlphaFoldServer
+
+
+def test_classify_status():
+    assert classify_status('Succeeded') == DONE
+    assert classify_status('Running') == RUNNING
+    assert classify_status('Failed to run') == FAILED
+    assert classify_status('Draft') is None
+
+
+def test_cookies_follow_browser_scoping():
+    fetcher = ResultFetcher([
+        {'name': 'sid', 'value': '1', 'domain': '.example.com', 'path': '/', 'expires': -1, 'secure': True},
+        {'name': 'host', 'value': '2', 'domain': 'www.example.com', 'path': '/', 'expires': -1},
+        {'name': 'private', 'value': '3', 'domain': 'files.example.com', 'path': '/private', 'expires': -1},
+    ], 'test-agent')
+
+    def cookie_header(url):
+        request = urllib.request.Request(url)
+        fetcher.jar.add_cookie_header(request)
+        return request.get_header('Cookie')
+
+    assert cookie_header('https://files.example.com/results/a.zip') == 'sid=1'
+    assert cookie_header('https://files.example.com/private/a.zip') == 'private=3; sid=1'
+    assert cookie_header('http://files.example.com/results/a.zip') is None
+
+
+def test_fetches_reuse_one_connection(tmp_path):
+    with MockAlphaFoldServer(latency=0, job_duration=0) as server:
+        ids = [server.submit(f'job{i}', ['MKT']) for i in range(3)]
+        fetcher = ResultFetcher([], 'test-agent')
+        try:
+            for job_id in ids:
+                fetcher.stream_to_file(f"{server.url}results/{job_id}.zip", str(tmp_path / f'{job_id}.part'))
+            assert [len(idle) for idle in fetcher._idle.values()] == [1]
+        finally:
+            fetcher.close()
+        for job_id in ids:
+            assert (tmp_path / f'{job_id}.part').read_bytes() == server.result(job_id)[1]
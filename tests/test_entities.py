@@ -0,0 +1,34 @@
+import pytest
+from entities import Entity, count_tokens, format_entities, is_multi_entity, parse_entities
+from ledger import JobLedger, sequence_hash
+
+
+def test_single_chain():
+    assert not is_multi_entity('MKTAY')
+    assert parse_entities(' mkt ay ') == [Entity('MKTAY', 1)]
+
+
+def test_copies_and_merging():
+    entities = parse_entities('AAA:2*BBB:aaa')
+    assert entities == [Entity('AAA', 2), Entity('BBB', 2)]
+    assert count_tokens(entities) == 12
+
+
+def test_format_is_order_independent():
+    assert format_entities(parse_entities('BBB:3*AAA')) == format_entities(parse_entities('3*AAA:BBB'))
+    assert format_entities(parse_entities('BBB:3*AAA')) == '3*AAA:BBB'
+
+
+@pytest.mark.parametrize('text', ['AAA::BBB', '0*AAA', 'x*AAA', 'AAA:2*', 'A1A'])
+def test_malformed(text):
+    with pytest.raises(ValueError):
+        parse_entities(text)
+
+
+def test_ledger_hashes_sorted_but_keeps_written_order(tmp_path):
+    assert sequence_hash('BBB:2*AAA') == sequence_hash('2*aaa:bbb')
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.register([('complex', 'zzzzmkt : 2*AAAAGGS')])
+        assert ledger.queued() == [('complex', 'ZZZZMKT:2*AAAAGGS')]
+        # 书写顺序不同的同一复合物仍是同一个任务
+        assert ledger.state_of('complex', '2*AAAAGGS:ZZZZMKT') is not None
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from job_feed import JobFeed, parse_json_payload, extract_job_records
+
+
+@pytest.mark.parametrize('prefix', [")]}',", ")]}'"])
+def test_parse_json_payload_strips_xssi_prefix(prefix):
+    assert parse_json_payload(prefix + '\n{"a": 1}') == {'a': 1}
+
+
+def test_parse_json_payload_plain_and_invalid():
+    assert parse_json_payload('  [1, 2]') == [1, 2]
+    assert parse_json_payload('<html>') is None
+
+
+def test_extract_job_records_nested():
+    payload = {'data': {'jobs': [
+        {'jobName': 'A', 'status': 'SUCCEEDED', 'id': 7,
+         'files': {'download': 'https://storage.googleapis.com/x/A.zip'}},
+        {'display_name': 'B', 'state': 'RUNNING'},
+        {'name': 'not a job'},
+    ]}}
+    records = {record['name']: record for record in extract_job_records(payload)}
+    assert set(records) == {'A', 'B'}
+    assert records['A']['link'] == 'https://storage.googleapis.com/x/A.zip'
+    assert records['A']['id'] == 7
+    assert records['B']['status'] == 'RUNNING'
+    assert records['B']['link'] is None
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.request = type('Request', (), {'resource_type': 'fetch'})()
+        self.headers = {'content-type': 'application/json'}
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+
+def test_job_feed_reset_waits_for_new_response():
+    feed = JobFeed()
+    asyncio.run(feed._on_response(FakeResponse('{"name": "A", "status": "RUNNING"}')))
+    assert feed.jobs['A']['status'] == 'RUNNING'
+
+    feed.reset()
+    assert asyncio.run(feed.wait(['A'], timeout=0.3, quiet=0.1)) == {}
+
+    asyncio.run(feed._on_response(FakeResponse(")]}',\n[{\"name\": \"A\", \"status\": \"SUCCEEDED\"}]")))
+    assert asyncio.run(feed.wait(['A'], timeout=0.3))['A']['status'] == 'SUCCEEDED'
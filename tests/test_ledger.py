@@ -0,0 +1,38 @@
+from ledger import FAILED, PENDING, SUBMITTED, JobLedger, canonical_sequence, dedupe_sequences, sequence_hash
+
+
+def _ledger(tmp_path):
+    return JobLedger(str(tmp_path / 'ledger.sqlite3'))
+
+
+def test_canonical_sequence():
+    assert canonical_sequence(' mkt\nay ') == 'MKTAY'
+    assert sequence_hash('mkt ay') == sequence_hash('MKTAY')
+
+
+def test_dedupe_keeps_first_name():
+    unique, aliases = dedupe_sequences([('a', 'MKT'), ('b', 'mkt'), ('c', 'GGS'), ('a', 'MKT')])
+    assert unique == [('a', 'MKT'), ('c', 'GGS')]
+    assert aliases == {'a': ['b']}
+
+
+def test_register_and_remaining(tmp_path):
+    jobs = [('a', 'MKT'), ('b', 'GGS'), ('c', 'AAA')]
+    with _ledger(tmp_path) as ledger:
+        ledger.register(jobs, priorities={'c': 5})
+        ledger.set_state('a', 'MKT', SUBMITTED)
+        ledger.set_state('b', 'GGS', FAILED, error='超时')
+        assert ledger.states_of(jobs) == {
+            ('a', sequence_hash('MKT')): SUBMITTED,
+            ('b', sequence_hash('GGS')): FAILED,
+            ('c', sequence_hash('AAA')): PENDING,
+        }
+        assert ledger.remaining(jobs) == [('b', 'GGS'), ('c', 'AAA')]
+        # 高优先级先出，失败的任务重新排队
+        assert ledger.queued() == [('c', 'AAA'), ('b', 'GGS')]
+        assert ledger.count_queued() == 2
+
+    # 重启后状态仍在
+    with _ledger(tmp_path) as ledger:
+        assert ledger.state_of('a', 'mkt') == SUBMITTED
+        assert ledger.state_of('d', 'MKT') is None
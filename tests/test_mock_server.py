@@ -0,0 +1,130 @@
+import asyncio
+import io
+import json
+import os
+import time
+import urllib.request
+import zipfile
+
+import pytest
+from playwright.async_api import async_playwright
+from playwright.sync_api import Error as PlaywrightError, sync_playwright
+
+from benchmark import run_benchmark
+from download import download_tasks, filter_tasks, get_task_names
+from job_feed import extract_job_records, parse_json_payload
+from ledger import DOWNLOADED, JobLedger
+from mock_server import MockAlphaFoldServer
+from submission import prepare_form, submit_job
+from waits import resolve_timeouts, wait_logged_in
+
+
+@pytest.fixture
+def server():
+    with MockAlphaFoldServer(latency=0, job_duration=0.2) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def chromium():
+    """未安装 Chromium 时跳过需要浏览器的测试"""
+    with sync_playwright() as p:
+        try:
+            p.chromium.launch(headless=True).close()
+        except PlaywrightError as e:
+            pytest.skip(f"无法启动 Chromium: {e}")
+
+
+def _wait_all_done(server):
+    while not server.all_done():
+        time.sleep(0.05)
+
+
+def test_http_api(server):
+    request = urllib.request.Request(
+        server.url + 'api/jobs', data=json.dumps({'name': 'job1', 'sequences': ['MKT']}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request) as response:
+        job_id = parse_json_payload(response.read().decode('utf-8'))['id']
+    _wait_all_done(server)
+
+    with urllib.request.urlopen(server.url + 'api/jobs') as response:
+        payload = parse_json_payload(response.read().decode('utf-8'))
+    [record] = extract_job_records(payload)
+    assert record['name'] == 'job1'
+
+    with urllib.request.urlopen(f"{server.url}results/{job_id}.zip") as response:
+        assert zipfile.ZipFile(io.BytesIO(response.read())).namelist()
+
+
+def test_submit_job_smoke(chromium, server):
+    timeouts = resolve_timeouts()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            page = browser.new_page()
+            page.goto(server.url)
+            assert wait_logged_in(page, timeouts['page_ready'])
+            baseline_inputs = prepare_form(page, timeouts)
+            assert baseline_inputs is not None
+            assert submit_job(page, 'job1', 'MKTAYIAKQR', timeouts, baseline_inputs) == 'seed:auto'
+            assert submit_job(page, 'job2', '2*MKTAYIAKQR:GGS', timeouts, baseline_inputs) == 'seed:auto'
+        finally:
+            browser.close()
+    assert server.job_count() == 2
+
+
+async def _download(url, jobs, downloads_dir, ledger):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context(accept_downloads=True)
+            page = await context.new_page()
+            await page.goto(url, wait_until='networkidle')
+            await filter_tasks(page)
+            await download_tasks(page, jobs, downloads_dir, ledger)
+        finally:
+            await browser.close()
+
+
+async def _task_names(url):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            await page.goto(url, wait_until='networkidle')
+            await filter_tasks(page)
+            return await get_task_names(page)
+        finally:
+            await browser.close()
+
+
+def test_pagination_with_repeated_first_name(chromium, server):
+    # 每页 10 行，按提交时间倒序显示：第 1、2 页的第一行同名，第 3 页只有一行
+    for i in range(21):
+        server.submit('repeat' if i in (10, 20) else f'job{i}', ['MKT'])
+        time.sleep(0.01)
+    _wait_all_done(server)
+    index = asyncio.run(_task_names(server.url))
+    assert len(index) == 20
+    assert index['job0']['page'] == 3
+
+
+def test_download_tasks_smoke(chromium, server, tmp_path):
+    jobs = {'job1': 'MKTAYIAKQR', 'job2': 'GGSGGS'}
+    for name, sequence in jobs.items():
+        server.submit(name, [sequence])
+    _wait_all_done(server)
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.register(list(jobs.items()))
+        asyncio.run(_download(server.url, jobs, str(tmp_path), ledger))
+        for name, sequence in jobs.items():
+            assert os.path.exists(tmp_path / f"{name}.zip")
+            assert ledger.state_of(name, sequence) == DOWNLOADED
+
+
+def test_lean_pool_benchmark(chromium):
+    # 精简模式下多个标签页各自处理请求拦截，不会因为主线程在等待而卡住
+    report = run_benchmark(jobs=4, length=30, concurrency=2, latency=0, job_duration=0.2,
+                           results_path=None, lean=True)
+    assert report['submitted'] == report['downloaded'] == 4
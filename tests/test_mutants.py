@@ -0,0 +1,51 @@
+import pytest
+from ledger import JobLedger, apply_diff, decode_diff, encode_diff
+from mutants import iter_library, iter_variants, read_library
+
+PARENT = 'MSEVEFSHEYWMRHALTLAKRA'
+
+
+def _library(tmp_path, body):
+    path = tmp_path / 'library.txt'
+    path.write_text(f">Tad\n{PARENT[:11]}\n{PARENT[11:]}\n{body}", encoding='utf-8')
+    return read_library(str(path))
+
+
+def test_expands_lines(tmp_path):
+    families = _library(tmp_path, 'del3 E5W  # 注释\nS2[SAT] V4*\n')
+    family = families[0]
+    assert family.parent == PARENT
+    variants = dict(iter_library(families))
+    # 第一行 1 个；第二行 3 × 19 个组合，其中 S2S 为野生型、不出现在名称中
+    assert len(family) == len(variants) == 1 + 3 * 19
+    assert variants['Taddel3E5W'] == PARENT[:2] + 'V' + 'W' + PARENT[5:]
+    assert variants['TadS2AV4D'] == 'MAEDEF' + PARENT[6:]
+    assert variants['TadV4D'] == PARENT[:3] + 'D' + PARENT[4:]
+
+
+def test_all_wild_combination_is_skipped(tmp_path):
+    family = _library(tmp_path, 'S2[SA] E3[EK]\n')[0]
+    assert len(family) == len(list(family)) == 3
+
+
+def test_variants_carry_parent_and_diff(tmp_path):
+    families = _library(tmp_path, 'E3K V4-\n')
+    [(name, sequence, (parent, diff))] = list(iter_variants(families))
+    assert name == 'TadE3Kdel4'
+    assert parent == PARENT
+    assert apply_diff(parent, decode_diff(encode_diff(diff))) == sequence == 'MSK' + PARENT[4:]
+
+
+@pytest.mark.parametrize('line', ['A3K', '99K', 'E3B', 'E3K E3W', 'foo'])
+def test_invalid_mutations(tmp_path, line):
+    with pytest.raises(ValueError):
+        _library(tmp_path, line + '\n')
+
+
+def test_ledger_stores_variants_as_diffs(tmp_path):
+    families = _library(tmp_path, 'E3K V4-\n')
+    [(name, sequence, origin)] = list(iter_variants(families))
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.register([(name, sequence)], origins={name: origin})
+        assert ledger._conn.execute('SELECT sequence FROM jobs').fetchone()[0] is None
+        assert ledger.queued() == [(name, sequence)]
@@ -0,0 +1,21 @@
+from ledger import DONE, DOWNLOADED, FAILED, SUBMITTED, JobLedger
+from pipeline import Backoff, _give_up_stale
+
+
+def test_backoff():
+    backoff = Backoff(minimum=10, maximum=30, factor=2)
+    assert [backoff.next(False), backoff.next(False), backoff.next(False)] == [20, 30, 30]
+    assert backoff.next(True) == 10
+
+
+def test_give_up_stale_jobs(tmp_path):
+    jobs = {'stuck': 'MKT', 'done': 'GGS'}
+    first_seen = {}
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.set_state('stuck', 'MKT', SUBMITTED)
+        ledger.set_state('done', 'GGS', DONE)
+        assert _give_up_stale(ledger, jobs, first_seen, 3600, now=0) == []
+        ledger.set_state('done', 'GGS', DOWNLOADED)
+        assert _give_up_stale(ledger, jobs, first_seen, 3600, now=3599) == []
+        assert _give_up_stale(ledger, jobs, first_seen, 3600, now=3600) == ['stuck']
+        assert ledger.state_of('stuck', 'MKT') == FAILED
@@ -0,0 +1,68 @@
+from preflight import (
+    DUPLICATE_NAME,
+    INVALID_NAME,
+    INVALID_RESIDUES,
+    MALFORMED_ENTITIES,
+    NAME_TOO_LONG,
+    SWAPPED_LINES,
+    TOO_MANY_TOKENS,
+    check_sequences,
+    read_jobs,
+    read_pairs,
+)
+
+
+def _reasons(sequences, **kwargs):
+    _, rejected = check_sequences(sequences, **kwargs)
+    return {name: reasons for _, name, _, reasons, _ in rejected}
+
+
+def test_accepts_valid_sequences_in_order():
+    sequences = [('a', 'mktay iakqr'), ('b', 'MKTAYIAKQR:2*GGS'), ('a', 'MKTAYIAKQR')]
+    accepted, rejected = check_sequences(sequences)
+    assert accepted == sequences
+    assert rejected == []
+
+
+def test_rejection_reasons():
+    reasons = _reasons([
+        ('bad/name', 'MKT'),
+        ('x', 'MKTBZ'),
+        ('y', 'MKT::A'),
+        ('z', 'A' * 11),
+        ('MKTAYIAKQRMKTAYIAKQR', 'name_line'),
+        ('dup', 'MKT'),
+        ('dup', 'MKA'),
+    ], max_tokens=10)
+    assert reasons == {
+        'bad/name': [INVALID_NAME],
+        'x': [INVALID_RESIDUES],
+        'y': [MALFORMED_ENTITIES],
+        'z': [TOO_MANY_TOKENS],
+        'MKTAYIAKQRMKTAYIAKQR': [INVALID_RESIDUES, SWAPPED_LINES],
+        'dup': [DUPLICATE_NAME],
+    }
+
+
+def test_copies_count_towards_tokens():
+    assert _reasons([('a', '3*AAAA')], max_tokens=10) == {'a': [TOO_MANY_TOKENS]}
+
+
+def test_name_length_counts_characters():
+    assert _reasons([('é' * 60, 'MKT')], max_name_length=100) == {}
+    assert _reasons([('é' * 101, 'MKT')], max_name_length=100) == {'é' * 101: [NAME_TOO_LONG]}
+
+
+def test_non_ascii_residue_is_reported():
+    _, rejected = check_sequences([('a', 'MKĺT')])
+    assert rejected[0][3] == [INVALID_RESIDUES]
+    assert 'Ĺ' in rejected[0][4]
+
+
+def test_read_jobs_keeps_first_valid_name(tmp_path):
+    path = tmp_path / 'JUNCE.txt'
+    path.write_text('bad/name\nMKTAYIAKQR\ngood\nMKTAYIAKQR\n\nthird\nmktayiakqr\norphan\n', encoding='utf-8')
+    assert len(read_pairs(path)) == 3
+    sequences, aliases = read_jobs(path, report_path=None)
+    assert sequences == [('good', 'MKTAYIAKQR')]
+    assert aliases == {'good': ['third']}
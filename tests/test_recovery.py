@@ -0,0 +1,57 @@
+import recovery
+from ledger import FAILED, SUBMITTED, JobLedger
+from submission import SubmissionResult
+from recovery import GAVE_UP, SUCCEEDED, RetryQueue, collect_results, process_queue, retry_delay
+
+JOBS = [('a', 'MKT'), ('b', 'GGS')]
+
+
+def test_retry_delay_is_capped():
+    assert [retry_delay(n, 10, 60) for n in range(1, 6)] == [10, 20, 40, 60, 60]
+
+
+def test_retry_then_give_up():
+    tasks = RetryQueue(JOBS, max_attempts=2, base_delay=0)
+    a = tasks.get()
+    b = tasks.get()
+    assert (a.name, b.name) == ('a', 'b')
+    assert tasks.finish(a, False, '超时')
+    assert not tasks.finish(b, True)
+    retried = tasks.get()
+    assert retried is a and a.attempts == 2
+    assert not tasks.finish(a, False, '超时')
+    assert tasks.get() is None
+    assert (a.state, b.state) == (GAVE_UP, SUCCEEDED)
+    assert collect_results(tasks) == [
+        SubmissionResult('a', False, '超时（已尝试 2 次）'),
+        SubmissionResult('b', True, None),
+    ]
+
+
+def test_process_queue_records_final_states(tmp_path, monkeypatch):
+    attempts = []
+
+    def submit_job(page, name, sequence, *args):
+        attempts.append(name)
+        return 'seed:auto' if name == 'b' or attempts.count(name) > 1 else None
+
+    monkeypatch.setattr(recovery, 'submit_job', submit_job)
+    monkeypatch.setattr(recovery, 'already_listed', lambda page, name: False)
+    monkeypatch.setattr(recovery, 'reset_page', lambda page, timeouts, baseline: baseline)
+    tasks = RetryQueue(JOBS, max_attempts=3, base_delay=0)
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        assert process_queue(None, tasks, {}, 1, ledger=ledger)
+        assert attempts == ['a', 'b', 'a']
+        assert ledger.state_of('a', 'MKT') == ledger.state_of('b', 'GGS') == SUBMITTED
+        assert ledger.seed_settings_of(JOBS) == {key: 'seed:auto' for key in ledger.states_of(JOBS)}
+
+
+def test_process_queue_stops_when_page_cannot_recover(tmp_path, monkeypatch):
+    monkeypatch.setattr(recovery, 'submit_job', lambda *args: None)
+    monkeypatch.setattr(recovery, 'reset_page', lambda page, timeouts, baseline: None)
+    tasks = RetryQueue(JOBS, max_attempts=1, base_delay=0)
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        assert not process_queue(None, tasks, {}, 1, ledger=ledger)
+        assert ledger.state_of('a', 'MKT') == FAILED
+        assert ledger.state_of('b', 'GGS') is None
+    assert collect_results(tasks)[1].error == '没有可用的标签页，未执行'
@@ -0,0 +1,47 @@
+import os
+
+from ledger import DOWNLOADED, JobLedger, SUBMITTED
+from result_cache import DEFAULT_SEED_SETTINGS, ResultCache, cache_key, format_seed_settings
+
+
+def test_cache_key_depends_on_canonical_sequence_and_seed():
+    assert cache_key('mkt ay') == cache_key('MKTAY')
+    assert cache_key('A:2*B') == cache_key('2*B:A')
+    assert cache_key('MKTAY') != cache_key('MKTAY', format_seed_settings(42))
+    assert format_seed_settings('') == DEFAULT_SEED_SETTINGS
+
+
+def test_ingest_uses_recorded_seed_settings(tmp_path):
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    jobs = {'auto': 'MKTAY', 'fixed': 'MKTAW'}
+    for name in jobs:
+        (downloads / f'{name}.zip').write_bytes(name.encode())
+    cache = ResultCache(str(tmp_path / 'cache'))
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        ledger.set_state('auto', jobs['auto'], SUBMITTED, seed_settings=DEFAULT_SEED_SETTINGS)
+        ledger.set_state('fixed', jobs['fixed'], SUBMITTED, seed_settings=format_seed_settings(7))
+        for name, sequence in jobs.items():
+            ledger.set_state(name, sequence, DOWNLOADED)
+        cache.ingest(jobs, str(downloads), ledger)
+
+    assert cache.get('MKTAY') is not None
+    assert cache.get('MKTAW') is None
+    assert cache.get('MKTAW', format_seed_settings(7)) is not None
+    dest = tmp_path / 'copy.zip'
+    assert cache.materialize('mktay', str(dest))
+    assert dest.read_bytes() == b'auto'
+
+
+def test_only_lookups_refresh_last_use(tmp_path):
+    source = tmp_path / 'result.zip'
+    source.write_bytes(b'zip')
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cache.put('MKTAY', str(source))
+    path = cache.get('MKTAY')
+    os.utime(path, (1000, 1000))
+    # 再次写入（例如每次运行整理已下载的结果）不算使用
+    cache.put('MKTAY', str(source))
+    assert os.path.getmtime(path) == 1000
+    cache.get('MKTAY')
+    assert os.path.getmtime(path) > 1000
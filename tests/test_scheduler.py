@@ -0,0 +1,46 @@
+import datetime
+
+from ledger import FAILED, SUBMITTED, JobLedger
+from scheduler import QuotaScheduler
+
+NOW = datetime.datetime(2026, 1, 2, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def test_window_start():
+    scheduler = QuotaScheduler(None, daily_quota=2, reset_hour=6)
+    assert scheduler.window_start(NOW) == NOW.replace(hour=6)
+    assert scheduler.window_start(NOW.replace(hour=3)) == NOW.replace(day=1, hour=6)
+    assert scheduler.next_window(NOW) == NOW.replace(day=3, hour=6)
+
+
+def test_next_batch_respects_quota(tmp_path):
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        scheduler = QuotaScheduler(ledger, daily_quota=2)
+        scheduler.enqueue([('a', 'MKT'), ('b', 'GGS'), ('c', 'AAA')], priorities={'b': 1})
+        assert scheduler.next_batch() == [('b', 'GGS'), ('a', 'MKT')]
+        ledger.set_state('b', 'GGS', SUBMITTED)
+        assert scheduler.remaining_quota() == 1
+        assert scheduler.next_batch() == [('a', 'MKT')]
+        ledger.set_state('a', 'MKT', SUBMITTED)
+        assert scheduler.next_batch() == []
+        assert QuotaScheduler(ledger, daily_quota=None).next_batch() == [('c', 'AAA')]
+
+
+def test_next_batch_only_from_given_sequences(tmp_path):
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        scheduler = QuotaScheduler(ledger, daily_quota=2)
+        scheduler.enqueue([('old', 'AAA')], priorities={'old': 9})
+        current = [('a', 'MKT'), ('b', 'GGS'), ('c', 'CCC')]
+        scheduler.enqueue(current)
+        assert scheduler.next_batch(sequences=current) == [('a', 'MKT'), ('b', 'GGS')]
+        assert scheduler.next_batch() == [('old', 'AAA'), ('a', 'MKT')]
+
+
+def test_next_batch_skips_excluded(tmp_path):
+    with JobLedger(str(tmp_path / 'ledger.sqlite3')) as ledger:
+        scheduler = QuotaScheduler(ledger, daily_quota=2)
+        scheduler.enqueue([('a', 'MKT'), ('b', 'GGS'), ('c', 'AAA')])
+        ledger.set_state('a', 'MKT', FAILED)
+        # a 本窗口内已失败过一次，剩余的配额先给尚未尝试的任务
+        assert scheduler.next_batch(exclude={'a'}) == [('b', 'GGS'), ('c', 'AAA')]
+        assert scheduler.next_batch(exclude={'a', 'b', 'c'}) == []
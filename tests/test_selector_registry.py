@@ -0,0 +1,38 @@
+from selector_registry import SelectorRegistry, success_rate
+
+
+def _registry(stats):
+    registry = SelectorRegistry(path=None)
+    for name, (ok, fail) in stats.items():
+        for _ in range(ok):
+            registry.record('clear', name, True, 0.1)
+        for _ in range(fail):
+            registry.record('clear', name, False, 0.1)
+    return registry
+
+
+def test_success_rate_is_smoothed():
+    assert success_rate(0, 0) == 0.5
+    assert success_rate(1, 0) < success_rate(95, 5)
+
+
+def test_one_lucky_success_does_not_outrank_a_proven_strategy():
+    registry = _registry({'primary': (95, 5), 'fallback': (1, 0)})
+    assert registry.order('clear', ['fallback', 'primary']) == ['primary', 'fallback']
+
+
+def test_one_early_failure_does_not_bury_a_proven_strategy():
+    registry = _registry({'primary': (20, 1), 'fallback': (1, 0)})
+    assert registry.order('clear', ['primary', 'fallback']) == ['primary', 'fallback']
+
+
+def test_failing_strategy_is_eventually_replaced():
+    registry = _registry({'primary': (3, 6), 'fallback': (6, 0)})
+    assert registry.order('clear', ['primary', 'fallback']) == ['fallback', 'primary']
+
+
+def test_latency_breaks_ties_then_given_order():
+    registry = SelectorRegistry(path=None)
+    registry.record('clear', 'slow', True, 2.0)
+    registry.record('clear', 'fast', True, 0.5)
+    assert registry.order('clear', ['slow', 'fast', 'new']) == ['fast', 'slow', 'new']
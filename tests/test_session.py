@@ -0,0 +1,37 @@
+import json
+from session import load_session, discard_session
+
+NOW = 1_700_000_000
+
+
+def _write_state(path, cookies):
+    path.write_text(json.dumps({'cookies': cookies, 'origins': []}), encoding='utf-8')
+    return str(path)
+
+
+def _cookie(name, domain='.google.com', expires=NOW + 3600):
+    return {'name': name, 'value': 'x', 'domain': domain, 'expires': expires}
+
+
+def test_valid_auth_cookies(tmp_path):
+    path = _write_state(tmp_path / 'state.json', [_cookie('SID'), _cookie('__Secure-1PSID', expires=-1)])
+    assert load_session(path, now=NOW) is not None
+
+
+def test_long_lived_non_auth_cookies_are_not_a_login(tmp_path):
+    path = _write_state(tmp_path / 'state.json', [
+        _cookie('NID', expires=NOW + 10 ** 8),
+        _cookie('prefs', domain='alphafoldserver.com', expires=-1),
+    ])
+    assert load_session(path, now=NOW) is None
+
+
+def test_expired_auth_cookie(tmp_path):
+    path = _write_state(tmp_path / 'state.json', [_cookie('SID'), _cookie('__Secure-3PSID', expires=NOW - 1)])
+    assert load_session(path, now=NOW) is None
+
+
+def test_missing_and_discarded(tmp_path):
+    path = _write_state(tmp_path / 'state.json', [_cookie('SID')])
+    discard_session(path)
+    assert load_session(path, now=NOW) is None
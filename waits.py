@@ -0,0 +1,197 @@
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# 各类等待条件的上限（毫秒），条件一旦满足立即返回，不会等满上限
+DEFAULT_TIMEOUTS = {
+    'page_ready': 30000,      # 页面加载完成（出现登录按钮或 Add entity 按钮）
+    'input_added': 5000,      # 点击 Add entity 后出现新的序列输入框
+    'save_enabled': 10000,    # 序列验证通过，Save job 按钮可用
+    'dialog_visible': 10000,  # 预览对话框出现
+    'switch_checked': 5000,   # Seed 开关切换完成
+    'dialog_hidden': 30000,   # 确认提交后对话框关闭
+    'job_row': 15000,         # 新任务出现在任务列表中
+    'inputs_reset': 10000,    # 点击 Clear 后序列输入框恢复初始状态
+    'job_table': 15000,       # 任务列表表格出现
+    'chip_toggled': 5000,     # 点击过滤按钮后按钮变为未选中
+    'page_changed': 10000,    # 点击下一页后分页范围切换
+}
+
+# 任务列表当前显示的范围：分页器的范围标签（例如 "11 – 20 of 57"），没有标签时用整页各行的文字代替。
+# 翻页前后的值不同即表示已经切换到下一页；不依赖第一行的任务名称，同名任务排在页首时也能识别
+TABLE_PAGE_STATE_SCRIPT = '''() => {
+    const label = document.querySelector('.mat-mdc-paginator-range-label');
+    if (label) return label.textContent.trim();
+    return Array.from(document.querySelectorAll('table.mat-mdc-table tbody tr'))
+        .map(row => row.textContent.trim()).join('\\n');
+}'''
+
+# 过滤按钮所在的 chip 元素，选中状态记录在 aria-selected 属性或 class 上
+CHIP_SELECTOR = '.mdc-evolution-chip, [role="option"], mat-chip-option'
+
+
+def resolve_timeouts(overrides=None):
+    """合并默认等待上限与调用方传入的配置"""
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    if overrides:
+        unknown = set(overrides) - set(DEFAULT_TIMEOUTS)
+        if unknown:
+            raise ValueError(f"未知的等待类型: {', '.join(sorted(unknown))}")
+        timeouts.update(overrides)
+    return timeouts
+
+
+def _wait_for_function(page, script, arg=None, timeout=5000):
+    """等待页面中的 JavaScript 条件成立，超时返回 False"""
+    try:
+        page.wait_for_function(script, arg=arg, timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def wait_page_ready(page, timeout):
+    """等待页面加载完成：出现登录按钮或 Add entity 按钮"""
+    marker = page.locator('span:has-text("Continue with Google"), button:has-text("Add entity")')
+    try:
+        marker.first.wait_for(state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def wait_logged_in(page, timeout):
+    """等待登录完成后 Add entity 按钮出现"""
+    try:
+        page.locator('button:has-text("Add entity")').first.wait_for(state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def count_sequence_inputs(page):
+    """当前页面上的序列输入框数量"""
+    return page.locator('textarea.sequence-input').count()
+
+
+def wait_sequence_input_added(page, previous_count, timeout):
+    """等待序列输入框数量超过点击 Add entity 之前的数量"""
+    return _wait_for_function(
+        page,
+        '''(previous) => document.querySelectorAll('textarea.sequence-input').length > previous''',
+        arg=previous_count,
+        timeout=timeout,
+    )
+
+
+def wait_save_job_enabled(page, timeout):
+    """等待序列验证通过、Save job 按钮变为可用"""
+    return _wait_for_function(
+        page,
+        '''() => {
+            const button = Array.from(document.querySelectorAll('button'))
+                .find(b => b.textContent.includes('Save job'));
+            return !!button && !button.disabled && !button.hasAttribute('disabled');
+        }''',
+        timeout=timeout,
+    )
+
+
+def wait_switch_checked(dialog, timeout):
+    """等待对话框中的 Seed 开关切换为开启状态"""
+    try:
+        dialog.locator('button.mdc-switch[role="switch"][aria-checked="true"]').wait_for(
+            state='visible', timeout=timeout
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def wait_dialog_hidden(page, timeout):
+    """等待预览对话框关闭"""
+    try:
+        page.locator('gdm-af-preview-dialog').wait_for(state='hidden', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def wait_job_row(page, job_name, timeout):
+    """等待任务列表中出现指定名称的任务"""
+    return _wait_for_function(
+        page,
+        '''(name) => Array.from(document.querySelectorAll('td.mat-column-name'))
+            .some(cell => cell.textContent.trim() === name)''',
+        arg=job_name,
+        timeout=timeout,
+    )
+
+
+def wait_sequence_inputs_reset(page, max_count, timeout):
+    """等待 Clear 生效：输入框数量不超过 max_count 且全部为空"""
+    return _wait_for_function(
+        page,
+        '''(maxCount) => {
+            const inputs = Array.from(document.querySelectorAll('textarea.sequence-input'));
+            return inputs.length <= maxCount && inputs.every(input => !input.value);
+        }''',
+        arg=max_count,
+        timeout=timeout,
+    )
+
+
+# 以下为 download.py 与 pipeline.py 使用的异步版本
+
+async def _wait_for_function_async(page, script, arg=None, timeout=5000):
+    try:
+        await page.wait_for_function(script, arg=arg, timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_page_ready_async(page, timeout):
+    marker = page.locator('span:has-text("Continue with Google"), button:has-text("Add entity")')
+    try:
+        await marker.first.wait_for(state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_logged_in_async(page, timeout):
+    try:
+        await page.locator('button:has-text("Add entity")').first.wait_for(state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_job_table_async(page, timeout):
+    """等待任务列表表格出现"""
+    try:
+        await page.locator('table.mat-mdc-table').first.wait_for(state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_chip_deselected_async(page, label, timeout):
+    """等待文字为 label 的过滤按钮变为未选中，即点击已经生效"""
+    return await _wait_for_function_async(
+        page,
+        '''([label, selector]) => {
+            const text = Array.from(document.querySelectorAll('span.mdc-evolution-chip__text-label'))
+                .find(span => span.textContent.trim().includes(label));
+            const chip = text && text.closest(selector);
+            return !!chip && chip.getAttribute('aria-selected') !== 'true'
+                && !chip.classList.contains('mdc-evolution-chip--selected');
+        }''',
+        arg=[label, CHIP_SELECTOR],
+        timeout=timeout,
+    )
+
+
+async def wait_table_page_changed_async(page, previous, timeout):
+    """等待任务列表的分页范围（见 TABLE_PAGE_STATE_SCRIPT）不再是 previous，即翻页已经生效"""
+    return await _wait_for_function_async(
+        page, f'(previous) => ({TABLE_PAGE_STATE_SCRIPT})() !== previous', arg=previous, timeout=timeout)